@@ -0,0 +1,56 @@
+"""Add unique active api key per application
+
+Revision ID: 3f7a9c2d1e84
+Revises: 04f3acc7b179
+Create Date: 2026-10-16 10:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7a9c2d1e84'
+down_revision: Union[str, Sequence[str], None] = '04f3acc7b179'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. 애플리케이션당 활성 키가 여러 개인 기존 데이터는 가장 최근 키만 남기고 비활성화합니다.
+    op.execute(
+        """
+        UPDATE api_key AS k
+        JOIN api_key AS newer
+          ON newer.application_id = k.application_id
+         AND newer.is_active = 1
+         AND newer.deleted_at IS NULL
+         AND newer.id > k.id
+        SET k.is_active = 0
+        WHERE k.is_active = 1 AND k.deleted_at IS NULL
+        """
+    )
+
+    # 2. 활성 키에만 application_id가 채워지는 생성 컬럼을 추가합니다. (MySQL은 부분 인덱스 미지원)
+    #    application_id의 ON DELETE CASCADE 외래 키 때문에 STORED가 아닌 VIRTUAL 생성 컬럼으로 만듭니다.
+    op.add_column('api_key', sa.Column(
+        'active_application_id',
+        sa.Integer(),
+        sa.Computed(
+            'CASE WHEN is_active = 1 AND deleted_at IS NULL THEN application_id END', persisted=False),
+        nullable=True,
+        comment='활성 키의 애플리케이션 ID (애플리케이션당 활성 키 1개 보장용)'
+    ))
+
+    # 3. 생성 컬럼에 UNIQUE 인덱스를 만들어 애플리케이션당 활성 키를 1개로 제한합니다.
+    op.create_index(op.f('ix_api_key_active_application_id'), 'api_key',
+                    ['active_application_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_api_key_active_application_id'), table_name='api_key')
+    op.drop_column('api_key', 'active_application_id')
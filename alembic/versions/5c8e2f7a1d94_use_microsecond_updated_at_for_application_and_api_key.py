@@ -0,0 +1,41 @@
+"""Use microsecond updated_at for application and api_key
+
+Revision ID: 5c8e2f7a1d94
+Revises: b7e4a2c9f1d3
+Create Date: 2026-10-16 18:05:42.318264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c8e2f7a1d94'
+down_revision: Union[str, Sequence[str], None] = 'b7e4a2c9f1d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. 애플리케이션/API 키 목록 캐시의 버전으로 쓰는 updated_at을 마이크로초 단위(DATETIME(6))로 바꿔,
+    #    같은 초 안에 연속으로 수정되어도 다른 워커 프로세스가 변경을 알아챌 수 있도록 합니다.
+    for table in ('application', 'api_key'):
+        op.alter_column(table, 'updated_at',
+                        existing_type=mysql.DATETIME(),
+                        type_=mysql.DATETIME(fsp=6),
+                        existing_nullable=False,
+                        existing_comment='수정 시각')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('application', 'api_key'):
+        op.alter_column(table, 'updated_at',
+                        existing_type=mysql.DATETIME(fsp=6),
+                        type_=mysql.DATETIME(),
+                        existing_nullable=False,
+                        existing_comment='수정 시각')
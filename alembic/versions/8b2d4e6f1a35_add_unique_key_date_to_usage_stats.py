@@ -0,0 +1,72 @@
+"""Add unique api key and date to usage stats
+
+Revision ID: 8b2d4e6f1a35
+Revises: 3f7a9c2d1e84
+Create Date: 2026-10-16 14:03:47.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d4e6f1a35'
+down_revision: Union[str, Sequence[str], None] = '3f7a9c2d1e84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. 같은 API 키와 날짜의 통계 행이 여러 개인 기존 데이터는 가장 오래된 행에 합산합니다.
+    op.execute(
+        """
+        UPDATE usage_stats AS s
+        JOIN (
+            SELECT MIN(id) AS keep_id,
+                   SUM(captcha_total_requests) AS captcha_total_requests,
+                   SUM(captcha_success_count) AS captcha_success_count,
+                   SUM(captcha_fail_count) AS captcha_fail_count,
+                   SUM(captcha_timeout_count) AS captcha_timeout_count,
+                   SUM(total_latency_ms) AS total_latency_ms,
+                   SUM(verification_count) AS verification_count
+            FROM usage_stats
+            WHERE api_key_id IS NOT NULL
+            GROUP BY api_key_id, date
+            HAVING COUNT(*) > 1
+        ) AS d ON s.id = d.keep_id
+        SET s.captcha_total_requests = d.captcha_total_requests,
+            s.captcha_success_count = d.captcha_success_count,
+            s.captcha_fail_count = d.captcha_fail_count,
+            s.captcha_timeout_count = d.captcha_timeout_count,
+            s.total_latency_ms = d.total_latency_ms,
+            s.verification_count = d.verification_count,
+            s.avg_response_time_ms = CASE WHEN d.verification_count > 0
+                THEN d.total_latency_ms / d.verification_count ELSE 0 END
+        """
+    )
+
+    # 2. 합산된 나머지 중복 행을 삭제합니다.
+    op.execute(
+        """
+        DELETE s FROM usage_stats AS s
+        JOIN usage_stats AS older
+          ON older.api_key_id = s.api_key_id
+         AND older.date = s.date
+         AND older.id < s.id
+        """
+    )
+
+    # 3. (api_key_id, date) UNIQUE 제약을 추가합니다.
+    op.create_unique_constraint('uq_usage_stats_api_key_id_date', 'usage_stats',
+                                ['api_key_id', 'date'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # MySQL은 외래 키 컬럼에 인덱스가 필요하므로, UNIQUE 제약을 지우기 전에 api_key_id 인덱스를 만듭니다.
+    op.create_index('ix_usage_stats_api_key_id', 'usage_stats', ['api_key_id'])
+    op.drop_constraint('uq_usage_stats_api_key_id_date',
+                       'usage_stats', type_='unique')
@@ -0,0 +1,33 @@
+"""Add api key and created at index to captcha log
+
+Revision ID: a6d3f1e8c2b4
+Revises: e2b8c5d3f9a7
+Create Date: 2026-10-16 16:47:13.602815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d3f1e8c2b4'
+down_revision: Union[str, Sequence[str], None] = 'e2b8c5d3f9a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. 일간(시간별) 통계 집계가 키별 기간 범위만 읽도록 (api_key_id, created_at) 복합 인덱스를 추가합니다.
+    op.create_index('ix_captcha_log_api_key_id_created_at', 'captcha_log',
+                    ['api_key_id', 'created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # MySQL은 외래 키 컬럼에 인덱스가 필요하므로, 복합 인덱스를 지우기 전에 api_key_id 인덱스를 만듭니다.
+    op.create_index('ix_captcha_log_api_key_id', 'captcha_log', ['api_key_id'])
+    op.drop_index('ix_captcha_log_api_key_id_created_at',
+                  table_name='captcha_log')
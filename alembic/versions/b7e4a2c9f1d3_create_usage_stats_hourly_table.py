@@ -0,0 +1,57 @@
+"""Create usage stats hourly table
+
+Revision ID: b7e4a2c9f1d3
+Revises: a6d3f1e8c2b4
+Create Date: 2026-10-16 17:32:55.418260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4a2c9f1d3'
+down_revision: Union[str, Sequence[str], None] = 'a6d3f1e8c2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. API 키별 시간당 검증 결과 수를 저장할 테이블을 생성합니다.
+    op.create_table('usage_stats_hourly',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False, comment='시간별 사용량 통계 ID'),
+    sa.Column('api_key_id', sa.Integer(), nullable=True, comment='통계의 기준이되는 API 키'),
+    sa.Column('date', sa.Date(), nullable=False, comment='통계 기준 날짜 (예: 2025-07-01)'),
+    sa.Column('hour', sa.Integer(), nullable=False, comment='통계 기준 시간 (0 ~ 23)'),
+    sa.Column('total_count', sa.Integer(), nullable=False, comment='기록된 검증 결과 수 (성공 + 실패 + 타임아웃)'),
+    sa.Column('success_count', sa.Integer(), nullable=False, comment='성공 응답 수'),
+    sa.Column('fail_count', sa.Integer(), nullable=False, comment='실패 응답 수'),
+    sa.Column('timeout_count', sa.Integer(), nullable=False, comment='타임아웃 응답 수'),
+    sa.ForeignKeyConstraint(['api_key_id'], ['api_key.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('api_key_id', 'date', 'hour', name='uq_usage_stats_hourly_api_key_id_date_hour')
+    )
+
+    # 2. 기존 캡챠 로그를 API 키, 날짜, 시간별로 집계하여 채웁니다.
+    op.execute(
+        """
+        INSERT INTO usage_stats_hourly
+            (api_key_id, date, hour, total_count, success_count, fail_count, timeout_count)
+        SELECT api_key_id, DATE(created_at), HOUR(created_at),
+               COUNT(*),
+               SUM(result = 'SUCCESS'),
+               SUM(result = 'FAIL'),
+               SUM(result = 'TIMEOUT')
+        FROM captcha_log
+        WHERE api_key_id IS NOT NULL
+        GROUP BY api_key_id, DATE(created_at), HOUR(created_at)
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('usage_stats_hourly')
@@ -0,0 +1,44 @@
+"""Add correct answer to captcha session
+
+Revision ID: c4e1a7b9d2f6
+Revises: 8b2d4e6f1a35
+Create Date: 2026-10-16 15:21:09.734512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e1a7b9d2f6'
+down_revision: Union[str, Sequence[str], None] = '8b2d4e6f1a35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. 세션에 문제 정답을 저장할 컬럼을 추가합니다.
+    op.add_column('captcha_session', sa.Column(
+        'correct_answer',
+        sa.String(length=20),
+        nullable=True,
+        comment='세션 생성 시 복사해 둔 문제 정답 (검증 시 문제 테이블 조회를 생략하기 위함)'
+    ))
+
+    # 2. 아직 검증되지 않은 기존 세션도 문제 테이블 조회 없이 검증되도록 정답을 채웁니다.
+    op.execute(
+        """
+        UPDATE captcha_session AS s
+        JOIN captcha_problem AS p ON p.id = s.captcha_problem_id
+        SET s.correct_answer = p.answer
+        WHERE s.correct_answer IS NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('captcha_session', 'correct_answer')
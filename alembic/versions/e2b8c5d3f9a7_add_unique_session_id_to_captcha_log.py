@@ -0,0 +1,43 @@
+"""Add unique session id to captcha log
+
+Revision ID: e2b8c5d3f9a7
+Revises: c4e1a7b9d2f6
+Create Date: 2026-10-16 16:08:42.190327
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b8c5d3f9a7'
+down_revision: Union[str, Sequence[str], None] = 'c4e1a7b9d2f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. 같은 세션에 로그가 여러 개인 기존 데이터는 가장 먼저 기록된 로그만 남기고 삭제합니다.
+    op.execute(
+        """
+        DELETE l FROM captcha_log AS l
+        JOIN captcha_log AS older
+          ON older.session_id = l.session_id
+         AND older.id < l.id
+        """
+    )
+
+    # 2. 세션당 로그가 하나만 기록되도록 session_id UNIQUE 제약을 추가합니다.
+    op.create_unique_constraint('uq_captcha_log_session_id', 'captcha_log',
+                                ['session_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # MySQL은 외래 키 컬럼에 인덱스가 필요하므로, UNIQUE 제약을 지우기 전에 session_id 인덱스를 만듭니다.
+    op.create_index('ix_captcha_log_session_id', 'captcha_log', ['session_id'])
+    op.drop_constraint('uq_captcha_log_session_id',
+                       'captcha_log', type_='unique')
@@ -9,6 +9,7 @@ from app.models.captcha_problem import CaptchaProblem
 from app.models.captcha_session import CaptchaSession
 from app.models.usage_stats import UsageStats
 from app.models.payment import Payment
+from app.services.captcha_service import activeProblemsCache
 
 
 class UserAdmin(ModelView, model=User):
@@ -159,6 +160,14 @@ class CaptchaProblemAdmin(ModelView, model=CaptchaProblem):
         CaptchaProblem.expiresAt: "expires_at",
     }
 
+    async def after_model_change(self, data, model, is_created, request):
+        # 문제 추가/수정 시 활성 문제 캐시를 비워 바로 반영되도록 합니다.
+        activeProblemsCache.clear()
+
+    async def after_model_delete(self, model, request):
+        # 문제 삭제 시 활성 문제 캐시를 비웁니다.
+        activeProblemsCache.clear()
+
 
 class CaptchaSessionAdmin(ModelView, model=CaptchaSession):
     column_list = [
@@ -1,8 +1,25 @@
 # app/celery_app.py
 
+import logging
+import threading
+import orjson
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+from kombu.serialization import register
 from app.core.config import settings
 
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 행동 이벤트처럼 큰 JSON 인자를 빠르게 직렬화하기 위해 orjson 직렬화기를 등록합니다.
+register(
+    "orjson",
+    orjson.dumps,
+    orjson.loads,
+    content_type="application/x-orjson",
+    content_encoding="binary",
+)
+
 # Celery 애플리케이션 인스턴스를 생성합니다.
 # 첫 번째 인자는 현재 모듈의 이름이며, Celery가 작업을 자동으로 찾을 수 있도록 돕습니다.
 celery_app = Celery(
@@ -21,6 +38,11 @@ celery_app = Celery(
 celery_app.conf.update(
     # 작업이 워커에 의해 실행 시작될 때 상태를 'STARTED'로 보고하도록 설정합니다.
     task_track_started=True,
+    # 작업 인자는 orjson으로 직렬화합니다. (배포 중 이전 버전이 보낸 json 메시지도 처리할 수 있도록 json도 허용)
+    task_serializer="orjson",
+    accept_content=["orjson", "json"],
+    # 검증 결과도 같은 orjson 직렬화기로 주고받습니다.
+    result_serializer="orjson",
 )
 
 # Celery Beat를 사용한 주기적 작업 스케줄을 정의합니다.
@@ -32,4 +54,48 @@ celery_app.conf.beat_schedule = {
         # 실행 주기를 초 단위로 설정합니다. (60.0초 = 1분)
         'schedule': 60.0,  
     },
-}
\ No newline at end of file
+}
+
+
+@worker_process_init.connect
+def resetDbPool(**kwargs):
+    """
+    prefork 워커의 각 자식 프로세스가 시작될 때 부모 프로세스에서 물려받은 DB 커넥션 풀을 버립니다.
+    부모의 소켓을 닫지 않고(close=False) 풀만 새로 만들어, 자식 프로세스마다 자신의 커넥션을 열고
+    작업(SessionLocal() ... close()) 사이에서 그 커넥션을 계속 재사용하도록 합니다.
+    """
+    from db.session import engine
+    engine.dispose(close=False)
+
+
+def _warmupBehaviorModel():
+    # torch 임포트 비용이 크므로 워커 프로세스에서만 지연 임포트합니다.
+    from app.services import behavior_service
+    try:
+        behavior_service.warmup()
+    except Exception as e:
+        # 미리 로드하지 못해도 첫 검증 요청에서 다시 로드를 시도하므로 경고만 남깁니다.
+        logger.warning(f"행동 검증 모델 미리 로드 실패: {e}")
+
+
+@worker_process_init.connect
+def warmupBehaviorModel(**kwargs):
+    """
+    prefork 워커의 각 자식 프로세스가 시작될 때 행동 검증 모델을 미리 로드합니다.
+    행동 추론은 워커 프로세스마다 독립적으로 실행되므로(GIL 비공유) 코어 수만큼 병렬로 처리되며,
+    첫 검증 요청에서 모델 로딩 지연이 발생하지 않습니다.
+    자식 프로세스가 worker_proc_alive_timeout(기본 4초) 안에 초기화를 마치지 못하면 Celery가 종료시키므로,
+    모델 로드는 백그라운드 스레드에서 진행하고 초기화는 바로 반환합니다.
+    (로드가 끝나기 전에 들어온 작업은 behavior_service의 로드 락에서 로드 완료를 기다립니다.)
+    """
+    threading.Thread(target=_warmupBehaviorModel,
+                     name="behavior-model-warmup", daemon=True).start()
+
+
+@worker_process_shutdown.connect
+def flushUsageStats(**kwargs):
+    """
+    워커 프로세스가 종료될 때 버퍼에 남아 있는 사용량 통계 증가분을 반영합니다.
+    """
+    from app.services.usage_stats_buffer import usageStatsBuffer
+    usageStatsBuffer.flush()
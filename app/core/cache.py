@@ -0,0 +1,62 @@
+# app/core/cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    프로세스 내부에서 사용하는 간단한 TTL + LRU 캐시입니다.
+    각 항목은 ttlSeconds가 지나면 만료되며, maxSize를 넘으면 가장 오래 사용되지 않은 항목부터 제거됩니다.
+    여러 스레드(동기 엔드포인트 스레드풀)에서 동시에 접근할 수 있도록 락으로 보호합니다.
+    """
+
+    def __init__(self, ttlSeconds: float, maxSize: int = 1024):
+        self.ttlSeconds = ttlSeconds
+        self.maxSize = maxSize
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        캐시된 값을 반환합니다. 없거나 만료된 경우 None을 반환합니다.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expiresAt, value = item
+            # 1. 만료된 항목은 제거하고 None을 반환합니다.
+            if expiresAt < time.monotonic():
+                del self._data[key]
+                return None
+            # 2. 최근 사용 항목으로 표시합니다.
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        값을 캐시에 저장합니다.
+        """
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttlSeconds, value)
+            self._data.move_to_end(key)
+            # 1. 최대 크기를 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다.
+            while len(self._data) > self.maxSize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """
+        캐시에서 항목을 제거합니다.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        캐시의 모든 항목을 제거합니다.
+        """
+        with self._lock:
+            self._data.clear()
@@ -31,9 +31,30 @@ class Settings:
     # 캡챠 타임아웃 설정 (분)
     CAPTCHA_TIMEOUT_MINUTES: int = 3
 
+    # 사용량 통계 일괄 반영 설정 (증가분을 모아 두었다가 주기(초) 또는 건수 기준으로 한 번에 반영)
+    USAGE_STATS_FLUSH_INTERVAL_SECONDS: float = float(
+        os.getenv("USAGE_STATS_FLUSH_INTERVAL_SECONDS", "1.0"))
+    USAGE_STATS_FLUSH_MAX_EVENTS: int = int(
+        os.getenv("USAGE_STATS_FLUSH_MAX_EVENTS", "100"))
+
     # 데이터베이스 URL
     DATABASE_URL: str = os.getenv("DATABASE_URL")
 
+    # 데이터베이스 커넥션 풀 설정
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # MySQL wait_timeout이나 중간 프록시의 유휴 연결 종료보다 먼저 커넥션을 교체합니다.
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "900"))
+    # 커넥션을 꺼낼 때마다 SELECT 1로 확인할지 여부 (기본은 pool_recycle로 교체하고 확인 왕복은 생략)
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "0") == "1"
+    DB_CONNECT_TIMEOUT: int = int(os.getenv("DB_CONNECT_TIMEOUT", "3"))
+
+    # 동기 엔드포인트를 실행할 스레드풀 크기
+    # DB 커넥션 풀(pool_size + max_overflow)과 맞춰 스레드풀이 먼저 포화되지 않도록 합니다.
+    THREADPOOL_MAX_WORKERS: int = int(os.getenv(
+        "THREADPOOL_MAX_WORKERS", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+
     # 사용자 이름 정규식 패턴
     USER_NAME_REGEX_PATTERN: str = r"^[가-힣a-zA-Z0-9._-]+$"
 
@@ -0,0 +1,62 @@
+# app/core/gzip_route.py
+
+import zlib
+from typing import Callable
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+
+# 압축을 푼 요청 본문의 최대 크기 (압축 폭탄 방지)
+MAX_DECOMPRESSED_BODY_BYTES = 32 * 1024 * 1024
+
+
+def _decompressGzipBody(body: bytes) -> bytes:
+    """
+    gzip으로 압축된 요청 본문을 풉니다. 최대 크기를 넘거나 올바른 gzip 데이터가 아니면 오류를 발생시킵니다.
+    """
+    # 1. 최대 크기 + 1바이트까지만 풀어서, 그보다 크면 나머지를 풀지 않고 거부합니다.
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(body, MAX_DECOMPRESSED_BODY_BYTES + 1)
+    except zlib.error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="gzip 요청 본문의 압축을 풀 수 없습니다."
+        )
+    if len(data) > MAX_DECOMPRESSED_BODY_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="요청 본문이 너무 큽니다."
+        )
+    return data
+
+
+class GzipRequest(Request):
+    """
+    Content-Encoding: gzip 요청 본문을 읽을 때 압축을 풀어 주는 Request입니다.
+    """
+
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            body = await super().body()
+            # 1. gzip 본문이면 이벤트 루프를 막지 않도록 스레드풀에서 압축을 풉니다.
+            if self.headers.get("content-encoding", "").lower() == "gzip":
+                body = await run_in_threadpool(_decompressGzipBody, body)
+            self._body = body
+        return self._body
+
+
+class GzipRoute(APIRoute):
+    """
+    gzip으로 압축된 요청 본문을 받을 수 있는 라우트입니다. APIRouter(route_class=GzipRoute)로 사용합니다.
+    """
+
+    def get_route_handler(self) -> Callable:
+        originalRouteHandler = super().get_route_handler()
+
+        async def customRouteHandler(request: Request) -> Response:
+            request = GzipRequest(request.scope, request.receive)
+            return await originalRouteHandler(request)
+
+        return customRouteHandler
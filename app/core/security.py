@@ -1,7 +1,11 @@
 # app/core/security.py
+import hashlib
+import secrets
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer
 from fastapi import HTTPException, status, Depends, Header
-from passlib.context import CryptContext
+import bcrypt
+from argon2 import PasswordHasher, Type
+from argon2.exceptions import InvalidHashError, VerificationError
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
@@ -12,10 +16,17 @@ from app.models.user import User, UserRole
 from app.repositories.api_key_repo import ApiKeyRepository
 from app.repositories.user_repo import UserRepository
 from app.core.config import settings  # settings 객체 임포트
+from app.core.cache import TTLCache
 
 
-# 비밀번호 해싱 및 검증을 위한 bcrypt 컨텍스트
-pwdContext = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 비밀번호 해싱에 사용할 Argon2id 해셔 (OWASP 권장 파라미터: 반복 3회, 메모리 46MiB, 병렬도 1)
+_passwordHasher = PasswordHasher(
+    time_cost=3, memory_cost=46 * 1024, parallelism=1, type=Type.ID)
+
+# 비밀번호 검증 성공 결과 캐시 (짧은 시간 내 반복 로그인 시 해시 연산을 생략하기 위함)
+# 키는 프로세스마다 새로 생성되는 비밀 키로 만든 keyed BLAKE2b 다이제스트이므로, 평문 비밀번호는 메모리에 남지 않습니다.
+_PASSWORD_CACHE_SECRET = secrets.token_bytes(32)
+_verifiedPasswordCache = TTLCache(ttlSeconds=30, maxSize=4096)
 
 # OAuth2 및 Bearer 인증 스키마 정의 (FastAPI 의존성 주입용)
 oauth2Scheme = OAuth2PasswordBearer(tokenUrl="/api/dashboard/auth/login")
@@ -122,7 +133,8 @@ def getEmailFromPayload(payload: dict) -> str:
 
 
 # User 객체가 필요한 라우터에서 사용: JWT 토큰에서 사용자 이메일을 추출하고 DB에서 User 객체를 반환합니다.
-async def getAuthenticatedUser(
+# 동기 DB 조회를 하므로 일반 함수로 선언하여 FastAPI가 스레드풀에서 실행하도록 합니다. (이벤트 루프 블로킹 방지)
+def getAuthenticatedUser(
     token_object: HTTPBearer = Depends(httpBearerScheme), # HTTPBearer를 통해 토큰 객체 주입
     db: Session = Depends(get_db)
 ) -> User:
@@ -165,11 +177,34 @@ def verifyPassword(plainPassword: str, hashedPassword: str) -> bool:
     Returns:
         bool: 비밀번호가 일치하면 True, 그렇지 않으면 False를 반환합니다.
     """
-    # 1. passlib의 CryptContext를 사용하여 평문 비밀번호와 해시를 안전하게 비교합니다.
-    return pwdContext.verify(plainPassword, hashedPassword)
+    # 1. (저장된 해시, 평문 비밀번호) 쌍의 keyed 다이제스트로 최근 검증 성공 여부를 확인합니다.
+    #    저장된 해시가 키에 포함되므로 비밀번호가 변경되면 기존 캐시 항목은 자동으로 무효화됩니다.
+    cacheKey = hashlib.blake2b(
+        f"{hashedPassword}\0{plainPassword}".encode("utf-8"),
+        key=_PASSWORD_CACHE_SECRET,
+        digest_size=16
+    ).digest()
+    if _verifiedPasswordCache.get(cacheKey):
+        return True
+
+    # 2. Argon2id 해시는 argon2로, 전환 이전에 만든 bcrypt($2b$) 해시는 bcrypt로 비교합니다.
+    if hashedPassword.startswith("$argon2"):
+        try:
+            verified = _passwordHasher.verify(hashedPassword, plainPassword)
+        except (VerificationError, InvalidHashError):
+            verified = False
+    else:
+        verified = bcrypt.checkpw(plainPassword.encode(
+            "utf-8"), hashedPassword.encode("utf-8"))
+
+    # 3. 검증에 성공한 경우에만 캐시합니다. (실패한 시도는 매번 해시 비용을 치르도록 합니다.)
+    if verified:
+        _verifiedPasswordCache.set(cacheKey, True)
+    return verified
+
 def getPasswordHash(password: str) -> str:
     """
-    평문 비밀번호를 bcrypt 알고리즘을 사용하여 해시합니다.
+    평문 비밀번호를 Argon2id 알고리즘을 사용하여 해시합니다.
 
     Args:
         password (str): 해시할 평문 비밀번호.
@@ -177,12 +212,13 @@ def getPasswordHash(password: str) -> str:
     Returns:
         str: 해시된 비밀번호 문자열.
     """
-    # 1. passlib의 CryptContext를 사용하여 비밀번호를 해시합니다.
-    return pwdContext.hash(password)
+    # 1. Argon2id로 새 솔트를 생성하여 비밀번호를 해시합니다.
+    return _passwordHasher.hash(password)
 
 
 # API Key 인증이 필요한 라우터에서 사용: X-Api-Key 헤더의 유효성 검증
-async def getValidApiKey(
+# 동기 DB 조회를 하므로 일반 함수로 선언하여 FastAPI가 스레드풀에서 실행하도록 합니다. (이벤트 루프 블로킹 방지)
+def getValidApiKey(
     xApiKey: str = Header(..., alias="X-Api-Key"),
     db: Session = Depends(get_db)
 ) -> ApiKey:
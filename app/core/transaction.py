@@ -0,0 +1,38 @@
+# app/core/transaction.py
+
+from functools import wraps
+from fastapi import HTTPException, status
+
+
+def transactional(action: str):
+    """
+    서비스 메서드를 하나의 트랜잭션으로 감싸는 데코레이터입니다.
+    메서드가 정상 종료되면 커밋하고, 예외가 발생하면 롤백합니다.
+    HTTPException은 그대로 다시 발생시키고, 그 외 예외는 500 오류로 변환합니다.
+
+    Args:
+        action (str): 오류 메시지에 사용할 작업 이름 (예: "API 키 생성").
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            try:
+                # 1. 서비스 메서드를 실행하고 변경사항을 커밋합니다.
+                result = fn(self, *args, **kwargs)
+                self.db.commit()
+                return result
+            except HTTPException:
+                # 2. HTTP 예외 발생 시 롤백하고 예외를 다시 발생시킵니다.
+                #    (DB 작업 전에 발생한 404 등은 열린 트랜잭션이 없으므로 롤백을 생략합니다.)
+                if self.db.in_transaction():
+                    self.db.rollback()
+                raise
+            except Exception as e:
+                # 3. 그 외 모든 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
+                self.db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"{action} 중 오류가 발생했습니다: {e}"
+                )
+        return wrapper
+    return decorator
@@ -2,8 +2,9 @@ from fastapi import FastAPI, Request, status, HTTPException
 import logging.config
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
+from anyio import to_thread
 from starlette.middleware.sessions import SessionMiddleware
 from prometheus_fastapi_instrumentator import Instrumentator
 
@@ -13,6 +14,8 @@ from app.routers import payment_router, users_router, auth_router, application_r
 from app.admin.admin import setup_admin
 from app.admin.auth import AdminAuth
 from app.core.config import settings
+from app.services._http import closeTossClient
+from app.services.usage_stats_buffer import usageStatsBuffer
 
 
 @asynccontextmanager
@@ -20,8 +23,14 @@ async def lifespan(app: FastAPI):
     # Startup event
     print("로깅 설정 적용...")
     logging.config.fileConfig('logging.ini', disable_existing_loggers=False)
+    # 동기 DB 작업을 수행하는 엔드포인트가 기본 스레드풀(40)에서 대기하지 않도록 크기를 늘립니다.
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_MAX_WORKERS
     yield
     # Shutdown event
+    print("외부 API 클라이언트 해제...")
+    await closeTossClient()
+    print("사용량 통계 반영...")
+    usageStatsBuffer.flush()
     print("데이터베이스 연결 풀 해제...")
     engine.dispose()
     print("애플리케이션 종료.")
@@ -29,7 +38,8 @@ async def lifespan(app: FastAPI):
 app = FastAPI(
     title="Dashboard API",
     description="scratCHA API 서버",
-    lifespan=lifespan  # Add lifespan to FastAPI app
+    lifespan=lifespan,  # Add lifespan to FastAPI app
+    default_response_class=ORJSONResponse  # 응답 직렬화에 orjson을 사용합니다.
 )
 
 # Prometheus 메트릭을 설정합니다.
@@ -5,5 +5,6 @@ from .captcha_problem import CaptchaProblem
 from .captcha_session import CaptchaSession
 from .captcha_log import CaptchaLog
 from .usage_stats import UsageStats
+from .usage_stats_hourly import UsageStatsHourly
 from .payment import Payment
 from .contact import Contact
@@ -1,10 +1,11 @@
 # backend/models/api_key.py
 
-from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, Integer, Enum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, Integer, Enum, Computed
 from sqlalchemy.orm import relationship
 
 from datetime import datetime
 from app.core.config import settings
+from db.types import MicrosecondDateTime
 import enum
 
 from db.base import Base
@@ -92,7 +93,7 @@ class ApiKey(Base):
 
     updatedAt = Column(
         "updated_at",
-        DateTime(timezone=True),
+        MicrosecondDateTime,  # 캐시 버전 비교에 사용하므로 마이크로초까지 저장
         default=lambda: datetime.now(settings.TIMEZONE),
         onupdate=lambda: datetime.now(settings.TIMEZONE),
         nullable=False,
@@ -106,6 +107,23 @@ class ApiKey(Base):
         comment="삭제 시각 (soft-delete)"
     )
 
+    # 활성 키의 애플리케이션 ID (생성 컬럼)
+    # 활성 상태이고 삭제되지 않은 키에만 application_id 값이 채워지고, 그 외에는 NULL입니다.
+    # MySQL은 부분 인덱스를 지원하지 않으므로, 이 컬럼의 UNIQUE 인덱스로 "애플리케이션당 활성 키 1개"를 보장합니다.
+    # application_id에 ON DELETE CASCADE 외래 키가 있어 STORED 생성 컬럼은 만들 수 없으므로 VIRTUAL로 둡니다.
+    # (MySQL 8.0은 VIRTUAL 생성 컬럼에도 인덱스를 지원합니다.)
+    activeAppId = Column(
+        "active_application_id",
+        Integer,
+        Computed(
+            "CASE WHEN is_active = 1 AND deleted_at IS NULL THEN application_id END",
+            persisted=False
+        ),
+        unique=True,
+        index=True,
+        comment="활성 키의 애플리케이션 ID (애플리케이션당 활성 키 1개 보장용)"
+    )
+
     # N:1 관계
     user = relationship("User")
     application = relationship("Application", back_populates="apiKey")
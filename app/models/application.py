@@ -5,6 +5,7 @@ from sqlalchemy.orm import relationship
 
 from datetime import datetime
 from app.core.config import settings
+from db.types import MicrosecondDateTime
 
 from db.base import Base
 
@@ -52,7 +53,7 @@ class Application(Base):
 
     updatedAt = Column(
         "updated_at",
-        DateTime(timezone=True),
+        MicrosecondDateTime,  # 캐시 버전 비교에 사용하므로 마이크로초까지 저장
         default=lambda: datetime.now(settings.TIMEZONE),
         onupdate=lambda: datetime.now(settings.TIMEZONE),
         nullable=False,
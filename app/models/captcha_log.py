@@ -1,6 +1,6 @@
 # backend/models/captcha_log.py
 
-from sqlalchemy import Column, Enum, Integer, String, TEXT, DateTime, ForeignKey, func, Float, Boolean
+from sqlalchemy import Column, Enum, Integer, String, TEXT, DateTime, ForeignKey, func, Float, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 import enum
 from datetime import datetime
@@ -18,6 +18,12 @@ class CaptchaResult(enum.Enum):
 
 class CaptchaLog(Base):
     __tablename__ = "captcha_log"
+    # 세션당 1개의 로그만 존재하도록 보장합니다. (중복 검증은 로그 INSERT 시 이 제약으로 판단)
+    __table_args__ = (
+        UniqueConstraint("session_id", name="uq_captcha_log_session_id"),
+        # 일간(시간별) 통계는 원본 로그를 집계하므로, 키별 기간 조회가 해당 기간의 로그만 읽도록 합니다.
+        Index("ix_captcha_log_api_key_id_created_at", "api_key_id", "created_at"),
+    )
 
     id = Column(
         Integer,
@@ -6,6 +6,7 @@ from datetime import datetime
 from app.core.config import settings
 
 from db.base import Base
+from db.types import AwareDateTime
 
 
 class CaptchaProblem(Base):
@@ -73,7 +74,7 @@ class CaptchaProblem(Base):
     )
     expiresAt = Column(
         "expires_at",
-        DateTime(timezone=True),
+        AwareDateTime(),  # 조회 시 항상 타임존 정보가 포함된 datetime으로 반환
         nullable=False,
         comment="문제 교체 시각 (만료일)"
 
@@ -1,12 +1,13 @@
 # backend/models/captcha_session.py
 
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, ForeignKey, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.config import settings
 
 from db.base import Base
+from db.types import AwareDateTime
 
 
 class CaptchaSession(Base):
@@ -41,6 +42,13 @@ class CaptchaSession(Base):
         comment="클라이언트에 전달할 고유 토큰 (1회용)"
     )
 
+    correctAnswer = Column(
+        "correct_answer",
+        String(20),
+        nullable=True,
+        comment="세션 생성 시 복사해 둔 문제 정답 (검증 시 문제 테이블 조회를 생략하기 위함)"
+    )
+
     ipAddress = Column(
         "ip_address",
         String(50),
@@ -57,7 +65,7 @@ class CaptchaSession(Base):
 
     createdAt = Column(
         "created_at",
-        DateTime(timezone=True),
+        AwareDateTime(),  # 조회 시 항상 타임존 정보가 포함된 datetime으로 반환
         nullable=False,
         default=lambda: datetime.now(settings.TIMEZONE),
         comment="생성 시각"
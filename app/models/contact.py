@@ -1,5 +1,7 @@
 from sqlalchemy import Column, Integer, String, Text, DateTime
 from sqlalchemy.sql import func
+from datetime import datetime
+from app.core.config import settings
 
 from db.base import Base
 
@@ -40,6 +42,8 @@ class Contact(Base):
     createdAt = Column(
         "created_at",
         DateTime(timezone=True),
+        # Python 측 기본값으로 생성 시각을 채워, 커밋 후 새로고침 없이 응답에 사용할 수 있도록 합니다.
+        default=lambda: datetime.now(settings.TIMEZONE),
         server_default=func.now(),
         comment="생성 시각"
     )
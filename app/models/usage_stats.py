@@ -1,6 +1,6 @@
 # backend/models/usage_stats.py
 
-from sqlalchemy import Column, Date, Integer, String, TEXT, DateTime, ForeignKey, func, Float
+from sqlalchemy import Column, Date, Integer, String, TEXT, DateTime, ForeignKey, func, Float, UniqueConstraint
 from sqlalchemy.orm import relationship
 import enum
 from datetime import datetime
@@ -12,6 +12,10 @@ from db.base import Base
 
 class UsageStats(Base):
     __tablename__ = "usage_stats"
+    # API 키별 하루 1개의 통계 행만 존재하도록 보장합니다. (통계 증가분을 INSERT ... ON DUPLICATE KEY UPDATE로 반영)
+    __table_args__ = (
+        UniqueConstraint("api_key_id", "date", name="uq_usage_stats_api_key_id_date"),
+    )
 
     id = Column(
         Integer,
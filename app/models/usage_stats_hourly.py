@@ -0,0 +1,69 @@
+# backend/models/usage_stats_hourly.py
+
+from sqlalchemy import Column, Date, Integer, ForeignKey, UniqueConstraint
+
+
+from db.base import Base
+
+
+class UsageStatsHourly(Base):
+    __tablename__ = "usage_stats_hourly"
+    # API 키별 시간당 1개의 통계 행만 존재하도록 보장합니다. (통계 증가분을 INSERT ... ON DUPLICATE KEY UPDATE로 반영)
+    __table_args__ = (
+        UniqueConstraint("api_key_id", "date", "hour",
+                         name="uq_usage_stats_hourly_api_key_id_date_hour"),
+    )
+
+    id = Column(
+        Integer,
+        primary_key=True,
+        autoincrement=True,
+        comment="시간별 사용량 통계 ID"
+    )
+    keyId = Column(
+        "api_key_id",
+        Integer,
+        ForeignKey("api_key.id", ondelete="SET NULL"),
+        nullable=True,
+        comment="통계의 기준이되는 API 키"
+    )
+    date = Column(
+        "date",
+        Date,
+        nullable=False,
+        comment="통계 기준 날짜 (예: 2025-07-01)"
+    )
+    hour = Column(
+        "hour",
+        Integer,
+        nullable=False,
+        comment="통계 기준 시간 (0 ~ 23)"
+    )
+    totalCount = Column(
+        "total_count",
+        Integer,
+        nullable=False,
+        default=0,
+        comment="기록된 검증 결과 수 (성공 + 실패 + 타임아웃)"
+    )
+    successCount = Column(
+        "success_count",
+        Integer,
+        nullable=False,
+        default=0,
+        comment="성공 응답 수"
+    )
+    failCount = Column(
+        "fail_count",
+        Integer,
+        nullable=False,
+        default=0,
+        comment="실패 응답 수"
+    )
+    timeoutCount = Column(
+        "timeout_count",
+        Integer,
+        nullable=False,
+        default=0,
+        comment="타임아웃 응답 수"
+    )
@@ -3,7 +3,7 @@
 from typing import List, Optional
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select, update
 from datetime import datetime, timedelta
 import secrets
 
@@ -11,33 +11,34 @@ from app.models.application import Application
 
 from app.models.api_key import ApiKey, Difficulty
 from app.schemas.api_key import ApiKeyUpdate
+from app.core.config import settings
 
 
 class ApiKeyRepository:
     def __init__(self, db: Session):
         self.db = db
+        # 요청 단위 조회 캐시 (리포지토리는 요청마다 생성되므로 요청이 끝나면 함께 사라집니다.)
+        self._cache: dict = {}
 
-    def createKey(self, userId: int, appId: int, expiresPolicy: int = 0, difficulty: Difficulty = Difficulty.MIDDLE) -> ApiKey:
+    def createKey(self, userId: int, appId: int, expiresPolicy: int = 0, difficulty: Difficulty = Difficulty.MIDDLE, verifyApp: bool = True) -> ApiKey:
         """
         특정 애플리케이션에 대한 새로운 API 키를 생성하고 데이터베이스에 저장합니다.
+        같은 트랜잭션에서 방금 생성한 애플리케이션처럼 존재가 보장된 경우 verifyApp=False로 존재 확인 쿼리를 생략합니다.
         """
         # 1. API 키를 발급할 대상 애플리케이션이 존재하는지 확인합니다.
-        application = self.db.query(Application).filter(
-            Application.id == appId,
-            Application.deletedAt.is_(None) # <--- Add this condition
-        ).first()
-        if not application:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="해당 ID의 애플리케이션을 찾을 수 없습니다."
-            )
-
-        # 2. 해당 애플리케이션에 이미 활성화된 API 키가 있는지 확인합니다.
-        if self.getKeyByAppId(appId):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="이미 해당 애플리케이션에 대한 활성화된 API 키가 존재합니다."
-            )
+        if verifyApp:
+            application = self.db.query(Application).filter(
+                Application.id == appId,
+                Application.deletedAt.is_(None) # <--- Add this condition
+            ).first()
+            if not application:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="해당 ID의 애플리케이션을 찾을 수 없습니다."
+                )
+
+        # 2. 애플리케이션당 활성 키 1개 제약은 active_application_id UNIQUE 인덱스가 보장합니다.
+        #    (중복 시 flush 단계에서 IntegrityError가 발생하며, 호출하는 서비스에서 처리합니다.)
 
         # 3. `secrets` 모듈을 사용하여 암호학적으로 안전한 새 API 키 문자열을 생성합니다.
         new_key_str = secrets.token_hex(32)
@@ -59,37 +60,31 @@ class ApiKeyRepository:
         self.db.add(new_key)
         return new_key
 
-    def deleteKeyByAppId(self, appId: int):
-        """
-        특정 애플리케이션에 연결된 활성 API 키를 비활성화(소프트 삭제)합니다.
-        """
-        # 1. 주어진 애플리케이션 ID(appId)에 연결된, 아직 삭제되지 않은 API 키를 조회합니다.
-        key = self.db.query(ApiKey).filter(
-            ApiKey.appId == appId,
-            ApiKey.deletedAt.is_(None)
-        ).first()
-
-        # 2. 비활성화할 키가 없으면 오류를 발생시킵니다.
-        if not key:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="해당 애플리케이션에 연결된 활성화된 API 키가 없습니다."
-            )
-
-        key.isActive = False
-        key.deletedAt = datetime.now()
-        self.db.add(key)
-
     def getKeysByUserId(self, userId: int) -> List[ApiKey]:
         """
         특정 사용자가 소유한 모든 활성 API 키 목록을 조회합니다.
         """
         # 1. 사용자 ID(userId)를 기준으로, 아직 삭제되지 않은 모든 API 키를 조회하여 리스트로 반환합니다.
-        return self.db.query(ApiKey).filter(
-            ApiKey.userId == userId,
-            ApiKey.deletedAt.is_(None)
+        return self.db.scalars(
+            select(ApiKey)
+            .where(
+                ApiKey.userId == userId,
+                ApiKey.deletedAt.is_(None)
+            )
         ).all()
 
+    def getKeyIdsByUserId(self, userId: int) -> List[int]:
+        """
+        특정 사용자가 소유한 모든 활성 API 키의 ID 목록만 조회합니다.
+        """
+        # 1. 통계 조회처럼 키 ID만 필요한 경우 ORM 객체를 만들지 않고 ID 컬럼만 조회합니다.
+        return list(self.db.scalars(
+            select(ApiKey.id).where(
+                ApiKey.userId == userId,
+                ApiKey.deletedAt.is_(None)
+            )
+        ))
+
     def getKeyByAppId(self, appId: int) -> Optional[ApiKey]:
         """
         애플리케이션 ID(appId)에 해당하는 현재 활성화된 API 키를 조회합니다.
@@ -110,57 +105,57 @@ class ApiKeyRepository:
         """
         API 키의 고유 ID(keyId)로 단일 API 키를 조회합니다.
         """
-        # 1. API 키 ID(id)와 삭제되지 않음 조건을 만족하는 키를 조회하여 반환합니다.
-        return self.db.query(ApiKey).filter(
+        # 1. 같은 요청에서 이미 조회한 키라면 캐시된 결과를 반환합니다.
+        cacheKey = ("ApiKey", keyId)
+        if cacheKey in self._cache:
+            return self._cache[cacheKey]
+
+        # 2. API 키 ID(id)와 삭제되지 않음 조건을 만족하는 키를 조회하고 캐시에 저장합니다.
+        key = self.db.query(ApiKey).filter(
             ApiKey.id == keyId,
             ApiKey.deletedAt.is_(None)
         ).first()
-
-    def deleteKey(self, keyId: int) -> Optional[ApiKey]:
-        """
-        API 키 ID(keyId)를 사용하여 API 키를 비활성화(소프트 삭제)합니다.
-        """
-        # 1. 주어진 ID로 API 키를 조회합니다.
-        key = self.getKeyByKeyId(keyId)
-        # 2. 키가 존재하지 않으면 아무 작업도 하지 않고 None을 반환합니다.
-        if not key:
-            return None
-
-        # 3. 키의 삭제 시각을 기록하고 비활성 상태로 변경합니다.
-        key.deletedAt = datetime.now()
-        key.isActive = False
-        self.db.add(key)
+        self._cache[cacheKey] = key
         return key
 
-    def activateKey(self, keyId: int) -> Optional[ApiKey]:
+    def lockOwnedKey(self, keyId: int, userId: int) -> Optional[ApiKey]:
         """
-        API 키 ID(keyId)를 사용하여 API 키를 활성화합니다.
+        사용자가 소유한 API 키를 SELECT ... FOR UPDATE SKIP LOCKED로 잠그고 조회합니다.
+        다른 트랜잭션이 이미 잠근 행은 기다리지 않고 건너뛰므로, 키가 없거나 잠겨 있으면 None을 반환합니다.
         """
-        # 1. 주어진 ID로 API 키를 조회합니다.
-        key = self.getKeyByKeyId(keyId)
-        # 2. 키가 존재하지 않으면 아무 작업도 하지 않고 None을 반환합니다.
-        if not key:
-            return None
-
-        # 3. 키를 활성 상태(isActive=True)로 변경합니다.
-        key.isActive = True
-        self.db.add(key)
-        return key
+        # 1. 키 ID, 소유자 ID, 삭제되지 않음 조건으로 행 잠금을 시도합니다.
+        return self.db.execute(
+            select(ApiKey)
+            .where(
+                ApiKey.id == keyId,
+                ApiKey.userId == userId,
+                ApiKey.deletedAt.is_(None)
+            )
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
 
-    def deactivateKey(self, keyId: int) -> Optional[ApiKey]:
+    def updateKeyOwned(self, keyId: int, userId: int, values: dict) -> int:
         """
-        API 키 ID(keyId)를 사용하여 API 키를 비활성화합니다.
+        소유권 조건(userId)을 포함한 단일 UPDATE 문으로 API 키를 수정하고, 영향을 받은 행 수를 반환합니다.
         """
-        # 1. 주어진 ID로 API 키를 조회합니다.
-        key = self.getKeyByKeyId(keyId)
-        # 2. 키가 존재하지 않으면 아무 작업도 하지 않고 None을 반환합니다.
-        if not key:
-            return None
+        # 1. 세션에 로드된 객체에도 수정 시각이 반영되도록 updatedAt을 명시적으로 설정합니다.
+        values = {"updatedAt": datetime.now(settings.TIMEZONE), **values}
 
-        # 3. 키를 비활성 상태(isActive=False)로 변경합니다.
-        key.isActive = False
-        self.db.add(key)
-        return key
+        # 2. 키 ID, 소유자 ID, 삭제되지 않음 조건을 WHERE 절에 함께 걸어 조회 없이 바로 갱신합니다.
+        result = self.db.execute(
+            update(ApiKey)
+            .where(
+                ApiKey.id == keyId,
+                ApiKey.userId == userId,
+                ApiKey.deletedAt.is_(None)
+            )
+            .values(**values)
+        )
+        # 3. 변경된 키가 캐시된 이전 상태로 조회되지 않도록 캐시에서 제거합니다.
+        self._cache.pop(("ApiKey", keyId), None)
+
+        # 4. 조건에 일치한 행 수를 반환합니다. (0이면 키가 없거나 소유자가 아님)
+        return result.rowcount
 
     def getActiveApiKeyByTargetKey(self, targetKey: str) -> Optional[ApiKey]:
         """
@@ -175,18 +170,17 @@ class ApiKeyRepository:
             )
         ).first()
 
-    def updateKey(self, key: ApiKey, keyUpdate: "ApiKeyUpdate") -> ApiKey:
+    def buildUpdateValues(self, keyUpdate: "ApiKeyUpdate") -> dict:
         """
-        API 키 정보를 업데이트합니다.
+        API 키 업데이트 스키마를 UPDATE 문에 사용할 컬럼 값 딕셔너리로 변환합니다.
         """
+        values = {}
         if keyUpdate.expiresPolicy is not None:
-            expiresAt = datetime.now() + \
+            values["expiresAt"] = datetime.now() + \
                 timedelta(
                     days=keyUpdate.expiresPolicy) if keyUpdate.expiresPolicy > 0 else None
-            key.expiresAt = expiresAt
 
         if keyUpdate.difficulty is not None:
-            key.difficulty = keyUpdate.difficulty
+            values["difficulty"] = keyUpdate.difficulty
 
-        self.db.add(key)
-        return key
+        return values
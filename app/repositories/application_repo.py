@@ -1,17 +1,22 @@
 # app/repositories/application_repo.py
 
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, literal, select, text, String, Text
+from sqlalchemy.orm import Session, aliased, selectinload, raiseload
 
 from app.models.application import Application
+from app.models.api_key import ApiKey
+from app.core.config import settings
 from app.schemas.application import ApplicationCreate, ApplicationUpdate
 
 
 class ApplicationRepository:
     def __init__(self, db: Session):
         self.db = db
+        # 요청 단위 조회 캐시 (리포지토리는 요청마다 생성되므로 요청이 끝나면 함께 사라집니다.)
+        self._cache: dict = {}
 
     def createApplication(self, userId: int,  appCreate: ApplicationCreate) -> Application:
         """
@@ -23,21 +28,109 @@ class ApplicationRepository:
             appName=appCreate.appName,
             description=appCreate.description
         )
+        # 2. flush로 기본 키만 발급받습니다. (나머지 기본값은 커밋 후 필요할 때 로드됩니다.)
         self.db.add(app)
         self.db.flush()
-        self.db.refresh(app)
         return app
 
-    def getApplicationsByUserId(self, userId: int) -> List[Application]:
+    def createApplicationWithinLimit(self, userId: int, appCreate: ApplicationCreate, maxApps: int) -> Optional[Application]:
         """
-        특정 사용자가 소유한 모든 활성 애플리케이션 목록을 조회합니다.
+        사용자의 활성 애플리케이션 수가 최대 개수(maxApps) 미만일 때만 새 애플리케이션을 생성합니다.
+        개수 확인과 INSERT를 하나의 INSERT ... SELECT 문으로 처리하며, 한도를 초과하면 None을 반환합니다.
+        """
+        # 1. 현재 사용자의 활성 애플리케이션 수를 세는 스칼라 서브쿼리를 만듭니다.
+        existingApp = aliased(Application)
+        activeCount = select(func.count(existingApp.id)).where(
+            existingApp.userId == userId,
+            existingApp.deletedAt.is_(None)
+        ).scalar_subquery()
+
+        # 2. 활성 애플리케이션 수가 한도 미만일 때만 한 행을 반환하는 SELECT를 구성합니다.
+        source = select(
+            literal(userId),
+            literal(appCreate.appName, String),
+            literal(appCreate.description, Text)
+        ).where(activeCount < maxApps)
+
+        # 3. INSERT ... SELECT 문을 실행합니다.
+        result = self.db.execute(
+            insert(Application).from_select(
+                [Application.userId, Application.appName, Application.description],
+                source
+            )
+        )
+
+        # 4. 삽입된 행이 없으면 한도를 초과한 것이므로 None을 반환합니다.
+        if result.rowcount == 0:
+            return None
+
+        # 5. 생성된 애플리케이션을 기본 키로 조회하여 반환합니다.
+        return self.db.get(Application, result.lastrowid)
+
+    def getApplicationsWithKeysByUserId(self, userId: int) -> List[Application]:
+        """
+        특정 사용자가 소유한 모든 활성 애플리케이션 목록을 삭제되지 않은 API 키와 함께 조회합니다.
         """
         # 1. 사용자 ID(userId)를 기준으로, 아직 삭제되지 않은(deletedAt is None) 모든 애플리케이션을 조회하여 리스트로 반환합니다.
-        return self.db.query(Application).filter(
-            Application.userId == userId,
-            Application.deletedAt.is_(None)
+        # 2. 삭제되지 않은 API 키만 selectinload로 한 번에 로드하여, 각 애플리케이션의 apiKey 컬렉션에 바로 채웁니다.
+        #    그 외 관계의 지연 로딩은 raiseload로 막아 N+1 쿼리를 방지합니다.
+        return self.db.scalars(
+            select(Application)
+            .options(
+                selectinload(Application.apiKey.and_(
+                    ApiKey.deletedAt.is_(None))),
+                raiseload("*")
+            )
+            .where(
+                Application.userId == userId,
+                Application.deletedAt.is_(None)
+            )
         ).all()
 
+    def getApplicationsVersionByUserId(self, userId: int) -> tuple:
+        """
+        사용자의 애플리케이션/API 키 목록이 변경되었는지 판단하기 위한 버전 값을 한 번의 쿼리로 조회합니다.
+        (애플리케이션 최종 수정 시각, 애플리케이션 수, API 키 최종 수정 시각, API 키 수)
+        updated_at은 DATETIME(6)이므로 같은 초 안에 연속으로 수정되어도 버전이 바뀝니다.
+        """
+        # 1. 소프트 삭제된 행도 포함하여 집계합니다. (삭제 시에도 updatedAt이 갱신되므로 버전이 바뀝니다.)
+        appStats = select(
+            func.max(Application.updatedAt), func.count(Application.id)
+        ).where(Application.userId == userId).subquery()
+        keyStats = select(
+            func.max(ApiKey.updatedAt), func.count(ApiKey.id)
+        ).where(ApiKey.userId == userId).subquery()
+
+        # 2. 두 집계 결과를 하나의 행으로 조회하여 튜플로 반환합니다.
+        row = self.db.execute(select(appStats, keyStats)).one()
+        return tuple(row)
+
+    def getApplicationVersion(self, appId: int) -> Optional[tuple]:
+        """
+        단일 애플리케이션 응답이 변경되었는지 판단하기 위한 버전 값을 한 번의 쿼리로 조회합니다.
+        (소유자 ID, 애플리케이션 수정 시각, API 키 최종 수정 시각, API 키 수) 활성 애플리케이션이 없으면 None을 반환합니다.
+        updated_at은 DATETIME(6)이므로 같은 초 안에 연속으로 수정되어도 버전이 바뀝니다.
+        """
+        # 1. 애플리케이션에 연결된 API 키를 LEFT JOIN하여 소프트 삭제된 키까지 집계합니다.
+        row = self.db.execute(
+            select(
+                Application.userId,
+                Application.updatedAt,
+                func.max(ApiKey.updatedAt),
+                func.count(ApiKey.id)
+            )
+            .select_from(Application)
+            .outerjoin(ApiKey, ApiKey.appId == Application.id)
+            .where(
+                Application.id == appId,
+                Application.deletedAt.is_(None)
+            )
+            .group_by(Application.id)
+        ).first()
+
+        # 2. 조회 결과를 튜플로 반환합니다.
+        return tuple(row) if row is not None else None
+
     def getApplicationsCountByUserId(self, userId: int) -> int:
         """
         특정 사용자가 소유한 활성 애플리케이션의 총 개수를 조회합니다.
@@ -52,11 +145,22 @@ class ApplicationRepository:
         """
         애플리케이션의 고유 ID(appId)로 단일 활성 애플리케이션을 조회합니다.
         """
-        # 1. 애플리케이션 ID(id)와 삭제되지 않음 조건을 만족하는 애플리케이션을 조회하여 반환합니다.
-        return self.db.query(Application).filter(
+        # 1. 같은 요청에서 이미 조회한 애플리케이션이라면 캐시된 결과를 반환합니다.
+        cacheKey = ("Application", appId)
+        if cacheKey in self._cache:
+            return self._cache[cacheKey]
+
+        # 2. 애플리케이션 ID(id)와 삭제되지 않음 조건을 만족하는 애플리케이션을 조회하고 캐시에 저장합니다.
+        # 3. API 키는 selectinload로 함께 로드하고, 그 외 관계의 지연 로딩은 raiseload로 막습니다.
+        app = self.db.query(Application).options(
+            selectinload(Application.apiKey),
+            raiseload("*")
+        ).filter(
             Application.id == appId,
             Application.deletedAt.is_(None)
         ).first()
+        self._cache[cacheKey] = app
+        return app
 
     def updateApplication(self, app: Application, appUpdate: ApplicationUpdate) -> Application:
         """
@@ -68,14 +172,52 @@ class ApplicationRepository:
         self.db.add(app)
         return app
 
-    def deleteApplication(self, appId: int) -> Application:
+    def softDeleteWithKeys(self, appId: int, userId: int, deletedAt: datetime) -> int:
         """
-        애플리케이션 ID(appId)를 사용하여 애플리케이션을 비활성화(소프트 삭제)합니다.
+        애플리케이션과 연결된 모든 API 키를 하나의 UPDATE 문으로 소프트 삭제하고, 영향을 받은 행 수를 반환합니다.
+        애플리케이션이 없거나 해당 사용자의 소유가 아니면 0을 반환합니다.
         """
-        # 1. 주어진 ID로 애플리케이션을 조회합니다.
-        app = self.getApplicationByAppId(appId)
+        # 1. 애플리케이션과 삭제되지 않은 API 키를 LEFT JOIN하여 다중 테이블 UPDATE를 실행합니다.
+        #    (MySQL은 CTE 기반 UPDATE ... RETURNING을 지원하지 않으므로 다중 테이블 UPDATE를 사용합니다.)
+        #    text() 문에는 모델의 onupdate가 적용되지 않으므로 updated_at도 직접 갱신합니다.
+        result = self.db.execute(
+            text(
+                """
+                UPDATE application AS a
+                LEFT JOIN api_key AS k
+                  ON k.application_id = a.id AND k.deleted_at IS NULL
+                SET a.deleted_at = :deletedAt,
+                    a.updated_at = :updatedAt,
+                    k.deleted_at = :deletedAt,
+                    k.is_active = 0,
+                    k.updated_at = :updatedAt
+                WHERE a.id = :appId
+                  AND a.user_id = :userId
+                  AND a.deleted_at IS NULL
+                """
+            ),
+            {
+                "appId": appId,
+                "userId": userId,
+                "deletedAt": deletedAt,
+                "updatedAt": datetime.now(settings.TIMEZONE),
+            }
+        )
 
-        # 2. 애플리케이션의 삭제 시각(deletedAt)을 현재 시간으로 설정하여 소프트 삭제 처리합니다.
-        app.deletedAt = datetime.now()
-        self.db.add(app)
-        return app
+        # 2. 삭제된 애플리케이션이 다시 조회되지 않도록 캐시에서 제거합니다.
+        self._cache.pop(("Application", appId), None)
+
+        # 3. 조건에 일치한 행 수를 반환합니다.
+        return result.rowcount
+
+    def getApplicationWithKeys(self, appId: int) -> Optional[Application]:
+        """
+        삭제 여부와 관계없이 애플리케이션과 연결된 모든 API 키를 함께 조회합니다.
+        """
+        # 1. 기본 키로 애플리케이션을 조회하면서 API 키를 selectinload로 함께 로드합니다.
+        #    그 외 관계의 지연 로딩은 raiseload로 막습니다.
+        return self.db.get(
+            Application, appId,
+            options=[selectinload(Application.apiKey), raiseload("*")],
+            populate_existing=True
+        )
@@ -1,10 +1,9 @@
 # app/repositories/captcha_repo.py
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only, raiseload
+from sqlalchemy import exists, func, insert, select
 from typing import Optional, List
 from datetime import datetime, timedelta
-import random
 from fastapi import HTTPException, status
 
 from app.models.captcha_problem import CaptchaProblem
@@ -18,14 +17,23 @@ class CaptchaRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def getRandomActiveProblem(self, difficulty: Optional[Difficulty] = None) -> Optional[CaptchaProblem]:
+    def getActiveProblems(self, difficulty: Optional[Difficulty] = None) -> List[CaptchaProblem]:
         """
-        데이터베이스에서 활성화된 (만료되지 않은) 캡챠 문제 중 하나를 무작위로 선택하여 반환합니다.
+        활성화된 (만료되지 않은) 캡챠 문제 목록을 문제 발급에 필요한 컬럼만 조회합니다.
+        호출 측에서 문제 내용을 캐시해 두고 발급 시에는 데이터베이스를 조회하지 않도록 하기 위한 메서드입니다.
         """
         try:
-            # 1. 현재 시간을 기준으로 아직 만료되지 않은 모든 캡챠 문제를 데이터베이스에서 조회합니다.
+            # 1. 현재 시간을 기준으로 아직 만료되지 않은 캡챠 문제를 조회합니다.
             # DB의 타임존 설정과 무관하게 애플리케이션의 타임존 설정을 기준으로 현재 시간을 계산합니다.
-            query = self.db.query(CaptchaProblem).filter(
+            query = self.db.query(CaptchaProblem).options(
+                load_only(
+                    CaptchaProblem.id, CaptchaProblem.imageUrl, CaptchaProblem.prompt,
+                    CaptchaProblem.answer, CaptchaProblem.wrongAnswer1,
+                    CaptchaProblem.wrongAnswer2, CaptchaProblem.wrongAnswer3,
+                    CaptchaProblem.expiresAt, raiseload=True
+                ),
+                raiseload("*")
+            ).filter(
                 CaptchaProblem.expiresAt > datetime.now(settings.TIMEZONE)
             )
 
@@ -33,22 +41,16 @@ class CaptchaRepository:
                 query = query.filter(
                     CaptchaProblem.difficulty == difficulty.to_int())
 
-            validProblems = query.all()
+            # 2. 조회된 문제 목록을 반환합니다.
+            return query.all()
         except Exception as e:
-            # 2. 데이터베이스 조회 중 오류가 발생하면 서버 오류를 발생시킵니다.
+            # 3. 데이터베이스 조회 중 오류가 발생하면 서버 오류를 발생시킵니다.
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"캡챠 문제 조회 중 오류가 발생했습니다: {e}"
             )
 
-        # 3. 유효한 문제가 없는 경우, None을 반환합니다.
-        if not validProblems:
-            return None
-
-        # 4. 조회된 유효한 문제 목록에서 무작위로 하나를 선택하여 반환합니다.
-        return random.choice(validProblems)
-
-    def createCaptchaSession(self, keyId: int, captchaProblemId: int, clientToken: str, ipAddress: Optional[str], userAgent: Optional[str]) -> CaptchaSession:
+    def createCaptchaSession(self, keyId: int, captchaProblemId: int, clientToken: str, ipAddress: Optional[str], userAgent: Optional[str], correctAnswer: Optional[str] = None) -> CaptchaSession:
         """
         새로운 캡챠 세션을 생성하고 데이터베이스 세션에 추가합니다.
         이 메소드는 세션에 객체를 추가할 뿐, 커밋(commit)은 직접 수행하지 않습니다.
@@ -59,6 +61,7 @@ class CaptchaRepository:
             clientToken (str): 이 세션을 식별하는 고유 클라이언트 토큰.
             ipAddress (Optional[str]): 클라이언트의 IP 주소.
             userAgent (Optional[str]): 클라이언트의 User-Agent 정보.
+            correctAnswer (Optional[str]): 문제의 정답. 검증 시 문제 테이블을 조회하지 않도록 세션에 함께 저장합니다.
 
         Returns:
             CaptchaSession: 새로 생성된 CaptchaSession 객체.
@@ -70,7 +73,8 @@ class CaptchaRepository:
                 captchaProblemId=captchaProblemId,
                 clientToken=clientToken,
                 ipAddress=ipAddress,
-                userAgent=userAgent
+                userAgent=userAgent,
+                correctAnswer=correctAnswer
             )
             # 2. 생성된 객체를 데이터베이스 세션에 추가합니다.
             self.db.add(captchaSession)
@@ -85,7 +89,8 @@ class CaptchaRepository:
 
     def getCaptchaSessionByClientToken(self, clientToken: str, for_update: bool = False) -> Optional[CaptchaSession]:
         """
-        클라이언트 토큰을 사용하여 캡챠 세션을 조회합니다.
+        클라이언트 토큰으로 검증할 캡챠 세션을 조회합니다.
+        for_update=True이면 세션 행을 잠가, 만료 세션 정리 작업(SKIP LOCKED)이 검증 중인 세션을 건너뛰도록 합니다.
         """
         # 2025-09-08 DEBUG_001: TIMEOUT 로그 중복 방지를 위해 for_update 파라미터를 추가하여 비관적 잠금(Pessimistic Lock)을 적용합니다.
         query = self.db.query(CaptchaSession).filter(
@@ -94,6 +99,15 @@ class CaptchaRepository:
             query = query.with_for_update()
         return query.first()
 
+    def hasCaptchaLog(self, sessionId: int) -> bool:
+        """
+        세션에 이미 검증 로그(성공/실패/타임아웃)가 기록되어 있는지 확인합니다.
+        session_id UNIQUE 인덱스만 확인하는 EXISTS 쿼리이므로, 비용이 큰 행동 모델 추론 전에 중복 요청을 걸러내는 데 사용합니다.
+        """
+        return self.db.scalar(
+            select(exists().where(CaptchaLog.sessionId == sessionId))
+        )
+
     def createCaptchaLog(self, session: CaptchaSession, result: CaptchaResult, latency_ms: int, is_correct: Optional[bool], ml_confidence: Optional[float], ml_is_bot: Optional[bool]):
         """
         캡챠 검증 결과를 로그로 기록합니다.
@@ -109,11 +123,21 @@ class CaptchaRepository:
         )
         self.db.add(log_entry)
 
-    def does_log_exist_for_session(self, session_id: int) -> bool:
-        """
-        주어진 세션 ID에 대한 로그가 이미 존재하는지 확인합니다.
+    def createTimeoutLogs(self, rows: List[dict]) -> None:
         """
-        return self.db.query(CaptchaLog).filter(CaptchaLog.sessionId == session_id).first() is not None
+        여러 세션의 타임아웃 로그를 하나의 다중 행 INSERT 문으로 기록합니다.
+
+        Args:
+            rows (List[dict]): 세션별 로그 값 (keyId, sessionId, latency_ms).
+        """
+        if not rows:
+            return
+        # 1. 결과/정답 여부는 모두 같으므로 공통 값을 채워 executemany로 한 번에 INSERT합니다.
+        self.db.execute(
+            insert(CaptchaLog),
+            [{**row, "result": CaptchaResult.TIMEOUT, "is_correct": False,
+              "ml_confidence": None, "ml_is_bot": None} for row in rows]
+        )
 
     def deleteUnloggedSessionsByApiKey(self, apiKeyId: int):
         """
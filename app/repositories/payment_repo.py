@@ -1,6 +1,7 @@
 # app/repositories/payment_repo.py
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session, raiseload
+from typing import List, Optional, Tuple
 from app.models.payment import Payment
 from app.models.user import User
 from app.schemas.payment import PaymentCreate
@@ -16,7 +17,7 @@ class PaymentRepository:
         이 메서드는 commit을 수행하지 않으므로, 호출 측에서 트랜잭션을 관리해야 합니다.
         """
         # Pydantic 스키마를 SQLAlchemy 모델 인스턴스로 변환합니다.
-        db_payment = Payment(**payment_in.dict())
+        db_payment = Payment(**payment_in.model_dump())
         # 데이터베이스 세션에 모델 인스턴스를 추가합니다. (커밋 X)
         self.db.add(db_payment)
         # 생성된 결제 객체를 반환합니다.
@@ -25,8 +26,31 @@ class PaymentRepository:
     def get_payments_by_user_id(self, *, user_id: int, skip: int = 0, limit: int = 100) -> List[Payment]:
         """
         특정 사용자의 결제 내역 리스트를 조회합니다.
+        모든 행이 같은 사용자의 결제이므로 사용자 정보는 함께 조회하지 않습니다. (호출 측에서 이미 알고 있는 사용자 사용)
         """
-        return self.db.query(Payment).options(joinedload(Payment.user)).filter(Payment.userId == user_id).order_by(Payment.createdAt.desc()).offset(skip).limit(limit).all()
+        return self.db.query(Payment).options(raiseload(Payment.user)).filter(Payment.userId == user_id).order_by(Payment.createdAt.desc()).offset(skip).limit(limit).all()
+
+    def get_payments_page_by_user_id(self, *, user_id: int, skip: int = 0, limit: int = 100) -> Tuple[List[Payment], int]:
+        """
+        특정 사용자의 결제 내역 페이지와 전체 결제 건수를 한 번의 쿼리로 조회합니다.
+        전체 건수는 윈도우 함수(COUNT(*) OVER ())로 각 행에 함께 실어 COUNT 쿼리를 따로 보내지 않습니다.
+        """
+        # 1. 페이지 행과 전체 건수를 함께 조회합니다.
+        rows = (
+            self.db.query(Payment, func.count().over().label("total"))
+            .options(raiseload(Payment.user))
+            .filter(Payment.userId == user_id)
+            .order_by(Payment.createdAt.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        if rows:
+            return [row[0] for row in rows], rows[0][1]
+
+        # 2. 범위를 벗어난 페이지는 행이 없어 건수를 알 수 없으므로, 첫 페이지가 아닐 때만 COUNT로 보완합니다.
+        total = self.get_payments_count_by_user_id(user_id=user_id) if skip > 0 else 0
+        return [], total
 
     def get_payments_count_by_user_id(self, *, user_id: int) -> int:
         """
@@ -1,111 +1,132 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
-from datetime import date, timedelta
+from sqlalchemy import func, case, String, select, bindparam
+from sqlalchemy.dialects.mysql import insert as mysqlInsert
+from datetime import date, datetime, timedelta
 from typing import Optional
 from fastapi import HTTPException, status
 
 from app.models.usage_stats import UsageStats
+from app.models.usage_stats_hourly import UsageStatsHourly
 from app.models.api_key import ApiKey
 from app.models.application import Application
 from app.models.captcha_log import CaptchaLog
+from app.core.config import settings
+
+
+# 요청마다 모양이 같은 요청 수 합산 쿼리는 모듈 로드 시 한 번만 구성하고, 실행 시 값만 바인딩합니다.
+# (키 ID 목록은 expanding 바인드 파라미터로 IN 절에 펼쳐집니다.)
+_TWO_PERIOD_TOTAL_REQUESTS_STMT = select(
+    func.sum(case((UsageStats.date.between(bindparam("currentStart"), bindparam("currentEnd")),
+                   UsageStats.captchaTotalRequests), else_=0)),
+    func.sum(case((UsageStats.date.between(bindparam("previousStart"), bindparam("previousEnd")),
+                   UsageStats.captchaTotalRequests), else_=0))
+).where(
+    UsageStats.keyId.in_(bindparam("keyIds", expanding=True)),
+    UsageStats.date.between(bindparam("rangeStart"), bindparam("rangeEnd"))
+)
+
+_TOTAL_REQUESTS_STMT = select(
+    func.sum(UsageStats.captchaTotalRequests)
+).where(
+    UsageStats.keyId.in_(bindparam("keyIds", expanding=True)),
+    UsageStats.date.between(bindparam("startDate"), bindparam("endDate"))
+)
 
 
 class UsageStatsRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def incrementTotalRequests(self, keyId: int):
+    def applyStatsDeltas(self, deltas: dict):
         """
-        특정 API 키에 대한 오늘 날짜의 캡챠 총 요청 수를 1 증가시킵니다.
-        오늘 날짜의 통계 데이터가 없으면 새로 생성하고, 있으면 카운트를 업데이트합니다.
+        여러 API 키의 누적된 통계 증가분을 하나의 INSERT ... ON DUPLICATE KEY UPDATE 문으로 반영합니다.
+        (api_key_id, date) UNIQUE 인덱스를 이용하므로 키별로 조회 후 갱신할 필요가 없습니다.
+
+        Args:
+            deltas (dict): (keyId, date)를 키로, 컬럼 속성명별 증가량 딕셔너리를 값으로 가지는 딕셔너리.
         """
+        if not deltas:
+            return
+
         try:
-            # 1. 오늘 날짜를 기준으로 해당 API 키의 통계 데이터를 조회합니다.
-            today = date.today()
-            usageStats = self.db.query(UsageStats).filter(
-                UsageStats.keyId == keyId,
-                UsageStats.date == today
-            ).first()
-
-            # 2. 오늘 날짜의 통계 데이터가 이미 존재하면, 총 요청 수를 1 증가시킵니다.
-            if usageStats:
-                usageStats.captchaTotalRequests += 1
-            # 3. 오늘 날짜의 통계 데이터가 없으면, 새로운 레코드를 생성하고 총 요청 수를 1로 초기화합니다.
-            else:
-                usageStats = UsageStats(
-                    keyId=keyId,
-                    date=today,
-                    captchaTotalRequests=1,
-                    captchaSuccessCount=0,
-                    captchaFailCount=0
-                )
-                self.db.add(usageStats)
-
-            # 4. 변경사항을 데이터베이스 세션에 반영합니다. 실제 커밋은 서비스 레이어에서 처리됩니다.
-            self.db.flush([usageStats])
+            # 1. 키별 증가분을 삽입할 행으로 변환합니다. (새 행일 때의 평균 응답 시간도 함께 계산)
+            now = datetime.now(settings.TIMEZONE)
+            rows = []
+            for (keyId, day), delta in deltas.items():
+                verificationCount = delta.get("verificationCount", 0)
+                totalLatencyMs = delta.get("totalLatencyMs", 0)
+                rows.append({
+                    "api_key_id": keyId,
+                    "date": day,
+                    "captcha_total_requests": delta.get("captchaTotalRequests", 0),
+                    "captcha_success_count": delta.get("captchaSuccessCount", 0),
+                    "captcha_fail_count": delta.get("captchaFailCount", 0),
+                    "captcha_timeout_count": delta.get("captchaTimeoutCount", 0),
+                    "total_latency_ms": totalLatencyMs,
+                    "verification_count": verificationCount,
+                    "avg_response_time_ms": totalLatencyMs / verificationCount if verificationCount > 0 else 0,
+                    "created_at": now,
+                })
+
+            # 2. 이미 행이 있으면 각 카운트에 증가분을 더합니다.
+            #    MySQL은 UPDATE 절을 왼쪽부터 적용하므로, 평균 응답 시간은 갱신된 합계/횟수로 계산됩니다.
+            table = UsageStats.__table__
+            stmt = mysqlInsert(table).values(rows)
+            counterColumns = [
+                "captcha_total_requests", "captcha_success_count", "captcha_fail_count",
+                "captcha_timeout_count", "total_latency_ms", "verification_count",
+            ]
+            updates = [(name, table.c[name] + stmt.inserted[name])
+                       for name in counterColumns]
+            updates.append(("avg_response_time_ms", case(
+                (table.c.verification_count > 0,
+                 table.c.total_latency_ms / table.c.verification_count),
+                else_=0)))
+            self.db.execute(stmt.on_duplicate_key_update(updates))
 
         except Exception as e:
-            # 5. 데이터베이스 작업 중 예외 발생 시, 롤백을 유도하고 서버 오류를 발생시킵니다.
+            # 3. 데이터베이스 작업 중 예외 발생 시, 서버 오류를 발생시킵니다.
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"캡챠 요청 수 업데이트 중 오류가 발생했습니다: {e}"
+                detail=f"사용량 통계 일괄 반영 중 오류가 발생했습니다: {e}"
             )
 
-    def incrementVerificationResult(self, keyId: int, result: str, latencyMs: int):
+    def applyHourlyStatsDeltas(self, deltas: dict):
         """
-        특정 API 키에 대한 오늘 날짜의 캡챠 검증 결과를(성공/실패/타임아웃) 1 증가시키고,
-        평균 응답 시간 계산을 위한 총 지연 시간과 검증 횟수를 업데이트합니다.
+        여러 API 키의 누적된 시간별 검증 결과 증가분을 하나의 INSERT ... ON DUPLICATE KEY UPDATE 문으로 반영합니다.
+        (api_key_id, date, hour) UNIQUE 인덱스를 이용하므로 키별로 조회 후 갱신할 필요가 없습니다.
+
+        Args:
+            deltas (dict): (keyId, date, hour)를 키로, 컬럼 속성명별 증가량 딕셔너리를 값으로 가지는 딕셔너리.
         """
-        try:
-            # 1. 오늘 날짜의 통계 데이터를 조회합니다.
-            today = date.today()
-            usageStats = self.db.query(UsageStats).filter(
-                UsageStats.keyId == keyId,
-                UsageStats.date == today
-            ).first()
-
-            # 2. 통계 데이터가 없으면 새로 생성합니다.
-            if not usageStats:
-                usageStats = UsageStats(
-                    keyId=keyId,
-                    date=today,
-                    captchaTotalRequests=0,
-                    captchaSuccessCount=0,
-                    captchaFailCount=0,
-                    captchaTimeoutCount=0,
-                    totalLatencyMs=0,
-                    verificationCount=0
-                )
-                self.db.add(usageStats)
-
-            # 3. 검증 결과에 따라 해당하는 카운트를 1 증가시킵니다.
-            if result == "success":
-                usageStats.captchaSuccessCount += 1
-            elif result == "fail":
-                usageStats.captchaFailCount += 1
-            elif result == "timeout":
-                usageStats.captchaTimeoutCount += 1
-
-            # 4. 평균 응답시간 계산을 위해 총 지연시간과 검증 횟수를 업데이트합니다.
-            #    TIMEOUT 결과는 검증 횟수에 포함하지 않습니다.
-            usageStats.totalLatencyMs += latencyMs
-            if result != "timeout": # TIMEOUT 결과는 지연 시간에 포함하지 않습니다.
-                usageStats.verificationCount += 1
-            
-            if usageStats.verificationCount > 0:
-                usageStats.avgResponseTimeMs = usageStats.totalLatencyMs / \
-                    usageStats.verificationCount
-            else:
-                usageStats.avgResponseTimeMs = 0 # 검증 횟수가 0이면 평균 응답 시간도 0
+        if not deltas:
+            return
 
-            # 5. 변경사항을 데이터베이스 세션에 반영합니다.
-            self.db.flush([usageStats])
+        try:
+            # 1. 키별 증가분을 삽입할 행으로 변환합니다.
+            rows = [{
+                "api_key_id": keyId,
+                "date": day,
+                "hour": hour,
+                "total_count": delta.get("totalCount", 0),
+                "success_count": delta.get("successCount", 0),
+                "fail_count": delta.get("failCount", 0),
+                "timeout_count": delta.get("timeoutCount", 0),
+            } for (keyId, day, hour), delta in deltas.items()]
+
+            # 2. 이미 행이 있으면 각 카운트에 증가분을 더합니다.
+            table = UsageStatsHourly.__table__
+            stmt = mysqlInsert(table).values(rows)
+            counterColumns = ["total_count", "success_count",
+                              "fail_count", "timeout_count"]
+            self.db.execute(stmt.on_duplicate_key_update(
+                [(name, table.c[name] + stmt.inserted[name]) for name in counterColumns]))
 
         except Exception as e:
-            # 6. 데이터베이스 작업 중 예외 발생 시, 서버 오류를 발생시킵니다.
+            # 3. 데이터베이스 작업 중 예외 발생 시, 서버 오류를 발생시킵니다.
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"캡챠 검증 결과 업데이트 중 오류가 발생했습니다: {e}"
+                detail=f"시간별 사용량 통계 일괄 반영 중 오류가 발생했습니다: {e}"
             )
 
     def getUsageDataLogs(self, keyIds: list[int], startDate: Optional[date] = None, endDate: Optional[date] = None, skip: int = 0, limit: int = 100) -> tuple[list, int]:
@@ -124,13 +145,16 @@ class UsageStatsRepository:
         """
         try:
             # 1. CaptchaLog, ApiKey, Application 테이블을 조인하여 기본 쿼리를 생성합니다.
+            #    각 컬럼은 응답 스키마(StatisticsLog)의 필드명으로 별칭을 붙이고,
+            #    생성 시각과 결과는 SQL에서 응답 형식의 문자열로 변환하여 행을 그대로 스키마에 옮길 수 있도록 합니다.
             base_query = self.db.query(
-                CaptchaLog.id,
-                Application.appName,
-                ApiKey.key,
-                CaptchaLog.created_at,
-                CaptchaLog.result,
-                CaptchaLog.latency_ms
+                CaptchaLog.id.label('id'),
+                Application.appName.label('appName'),
+                ApiKey.key.label('key'),
+                func.DATE_FORMAT(CaptchaLog.created_at,
+                                 '%Y-%m-%d %H:%i:%s').label('date'),
+                func.lower(CaptchaLog.result, type_=String).label('result'),
+                CaptchaLog.latency_ms.label('ratency')
             ).join(
                 ApiKey, CaptchaLog.keyId == ApiKey.id
             ).join(
@@ -153,11 +177,16 @@ class UsageStatsRepository:
                 base_query = base_query.filter(
                     CaptchaLog.created_at < endDate + timedelta(days=1))
 
-            # 5. 필터링된 전체 로그의 개수를 계산합니다.
-            total_count = base_query.count()
-            # 6. 페이지네이션(skip, limit)과 정렬을 적용하여 실제 로그 데이터를 조회합니다.
+            # 5. 페이지네이션(skip, limit)과 정렬을 적용하여 실제 로그 데이터를 조회합니다.
             logs = base_query.order_by(CaptchaLog.created_at.desc()).offset(
                 skip).limit(limit).all()
+            # 6. 필터링된 전체 로그의 개수를 계산합니다.
+            #    페이지가 limit보다 적게 채워졌다면 마지막 페이지이므로 COUNT 쿼리 없이 개수를 구합니다.
+            #    (범위를 벗어난 페이지는 행이 없어 개수를 알 수 없으므로 첫 페이지가 아닐 때는 COUNT로 보완합니다.)
+            if len(logs) < limit and (logs or skip == 0):
+                total_count = skip + len(logs)
+            else:
+                total_count = base_query.count()
 
             # 7. 조회된 로그 리스트와 전체 개수를 튜플로 반환합니다.
             return logs, total_count
@@ -168,10 +197,10 @@ class UsageStatsRepository:
                 detail=f"사용량 로그 데이터 조회 중 오류가 발생했습니다: {e}"
             )
 
-    def getStatsFromLogs(self, keyIds: list[int], startDate: date, endDate: date):
+    def getHourlyStats(self, keyIds: list[int], startDate: date, endDate: date):
         """
-        captcha_log 테이블에서 직접 시간별 통계를 집계합니다. (일간 통계용)
-        이 메소드는 `usage_stats` 테이블에 아직 집계되지 않은 실시간에 가까운 데이터를 제공할 때 유용합니다.
+        usage_stats_hourly 테이블에서 시간별 통계를 집계합니다. (일간 통계용)
+        검증 결과가 기록될 때 시간별로 미리 집계해 두므로, 원본 captcha_log를 읽지 않고 (키 수 x 시간 수)개의 행만 읽습니다.
 
         Args:
             keyIds (list[int]): 조회할 API 키 ID 리스트.
@@ -182,42 +211,42 @@ class UsageStatsRepository:
             list: 집계된 통계 데이터 리스트.
         """
         try:
-            # 1. 시간별로 그룹화하기 위해 DATE_FORMAT 함수를 사용합니다. (MySQL 호환)
-            timePeriod = func.DATE_FORMAT(
-                CaptchaLog.created_at, '%Y-%m-%dT%H:00:00').label('date')
+            # 1. 날짜와 시간을 'YYYY-MM-DDTHH:00:00' 형식의 그룹화 기준으로 조합합니다. (MySQL 호환)
+            timePeriod = func.concat(
+                UsageStatsHourly.date, 'T', func.lpad(UsageStatsHourly.hour, 2, '0'), ':00:00').label('date')
 
             # 2. 통계 집계를 위한 기본 쿼리를 작성합니다.
             query = self.db.query(
                 timePeriod,  # 그룹화된 시간
-                func.coalesce(func.count(CaptchaLog.id), 0).label(
+                func.coalesce(func.sum(UsageStatsHourly.totalCount), 0).label(
                     'totalRequests'),  # 총 요청 수
-                func.coalesce(func.sum(case((CaptchaLog.result == 'success', 1), else_=0)), 0).label(
+                func.coalesce(func.sum(UsageStatsHourly.successCount), 0).label(
                     'successCount'),  # 성공 수
-                func.coalesce(func.sum(case((CaptchaLog.result == 'fail', 1), else_=0)), 0).label(
+                func.coalesce(func.sum(UsageStatsHourly.failCount), 0).label(
                     'failCount'),  # 실패 수
-                func.coalesce(func.sum(case((CaptchaLog.result == 'timeout', 1), else_=0)), 0).label(
+                func.coalesce(func.sum(UsageStatsHourly.timeoutCount), 0).label(
                     'timeoutCount')  # 타임아웃 수
-            ).filter(CaptchaLog.created_at.between(f'{startDate} 00:00:00', f'{endDate} 23:59:59'))
+            ).filter(UsageStatsHourly.date.between(startDate, endDate))
 
             # 3. 제공된 API 키 ID 목록이 없으면 빈 결과를 반환합니다.
             if not keyIds:
                 return []
 
             # 4. API 키 ID 목록으로 쿼리를 필터링합니다.
-            query = query.filter(CaptchaLog.keyId.in_(keyIds))
+            query = query.filter(UsageStatsHourly.keyId.in_(keyIds))
 
             # 5. 시간별로 그룹화하고 정렬하여 결과를 반환합니다.
             return query.group_by(timePeriod).order_by(timePeriod).all()
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"로그 기반 일일 통계 조회 중 오류: {e}"
+                detail=f"시간별 통계 조회 중 오류: {e}"
             )
 
     def getAggregatedStats(self, keyIds: list[int], startDate: date, endDate: date, period: str):
         """
         usage_stats 테이블에서 기간별(일간, 월간) 통계를 집계합니다.
-        미리 집계된 `usage_stats` 테이블을 사용하므로 `getStatsFromLogs`보다 성능상 이점이 있습니다.
+        원본 로그가 아닌 미리 집계된 `usage_stats` 테이블을 사용하므로 조회할 행 수가 적습니다.
 
         Args:
             keyIds (list[int]): 조회할 API 키 ID 리스트.
@@ -269,45 +298,53 @@ class UsageStatsRepository:
                 detail=f"집계 기반 통계 조회 중 오류: {e}"
             )
 
-    def getTotalRequestsForPeriod(self, keyIds: list[int], startDate: date, endDate: date) -> int:
+    def getTotalRequestsForTwoPeriods(self, keyIds: list[int], currentStart: date, currentEnd: date, previousStart: date, previousEnd: date) -> tuple[int, int]:
         """
-        지정된 기간 동안의 총 캡챠 요청 수를 합산하여 반환합니다.
+        현재 기간과 이전 기간의 총 캡챠 요청 수를 하나의 쿼리로 합산하여 반환합니다.
+        두 기간을 조건부 집계(SUM(CASE ...))로 나누어 계산하므로 기간별로 따로 조회하지 않습니다.
 
         Args:
             keyIds (list[int]): 조회할 API 키 ID 리스트.
-            startDate (date): 조회 시작일.
-            endDate (date): 조회 종료일.
+            currentStart (date): 현재 기간 시작일.
+            currentEnd (date): 현재 기간 종료일.
+            previousStart (date): 이전 기간 시작일.
+            previousEnd (date): 이전 기간 종료일.
 
         Returns:
-            int: 총 요청 수.
+            tuple[int, int]: (현재 기간 총 요청 수, 이전 기간 총 요청 수).
         """
         # 1. API 키 목록이 없으면 0을 반환합니다.
         if not keyIds:
-            return 0
+            return 0, 0
 
         try:
-            # 2. usage_stats 테이블에서 captchaTotalRequests의 합계를 계산합니다.
-            totalRequests = self.db.query(
-                func.sum(UsageStats.captchaTotalRequests)
-            ).filter(
-                UsageStats.keyId.in_(keyIds),
-                UsageStats.date.between(startDate, endDate)
-            ).scalar()
+            # 2. 두 기간을 모두 포함하는 범위만 읽고, 기간별 captchaTotalRequests 합계를 조건부로 계산합니다.
+            currentCount, previousCount = self.db.execute(_TWO_PERIOD_TOTAL_REQUESTS_STMT, {
+                "keyIds": keyIds,
+                "currentStart": currentStart,
+                "currentEnd": currentEnd,
+                "previousStart": previousStart,
+                "previousEnd": previousEnd,
+                "rangeStart": min(currentStart, previousStart),
+                "rangeEnd": max(currentEnd, previousEnd),
+            }).one()
 
             # 3. 결과가 None이면 0을, 아니면 해당 값을 반환합니다.
-            return totalRequests or 0
+            return int(currentCount or 0), int(previousCount or 0)
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"기간별 총 요청 수 조회 중 오류: {e}"
             )
 
-    def getTotalRequests(self, keyIds: list[int]) -> int:
+    def getTotalRequests(self, keyIds: list[int], startDate: Optional[date] = None, endDate: Optional[date] = None) -> int:
         """
         지정된 API 키들의 전체 캡챠 요청 수를 합산하여 반환합니다.
 
         Args:
             keyIds (list[int]): 조회할 API 키 ID 리스트.
+            startDate (Optional[date]): 합산 시작일. None이면 처음부터. Defaults to None.
+            endDate (Optional[date]): 합산 종료일. None이면 끝까지. Defaults to None.
 
         Returns:
             int: 총 요청 수.
@@ -317,12 +354,13 @@ class UsageStatsRepository:
             return 0
 
         try:
-            # 2. usage_stats 테이블에서 날짜 필터 없이 captchaTotalRequests의 합계를 계산합니다.
-            totalRequests = self.db.query(
-                func.sum(UsageStats.captchaTotalRequests)
-            ).filter(
-                UsageStats.keyId.in_(keyIds)
-            ).scalar()
+            # 2. usage_stats 테이블에서 (주어진 날짜 범위의) captchaTotalRequests의 합계를 계산합니다.
+            #    범위가 없는 쪽은 DATE의 최소/최대값으로 바인딩하여 항상 같은 쿼리를 사용합니다.
+            totalRequests = self.db.execute(_TOTAL_REQUESTS_STMT, {
+                "keyIds": keyIds,
+                "startDate": startDate or date.min,
+                "endDate": endDate or date.max,
+            }).scalar()
 
             # 3. 결과가 None이면 0을, 아니면 해당 값을 반환합니다.
             return totalRequests or 0
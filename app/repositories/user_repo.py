@@ -1,7 +1,8 @@
 # app/repositories/user_repo.py
 
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.orm import Session, load_only, raiseload
 from datetime import datetime
 from fastapi import HTTPException, status
 
@@ -26,7 +27,9 @@ class UserRepository:
         """
         try:
             # 1. 이메일 주소를 기준으로 사용자 조회를 위한 기본 쿼리를 생성합니다.
-            query = self.db.query(User).filter(User.email == email)
+            #    관계의 지연 로딩은 raiseload로 막아 의도하지 않은 추가 SELECT를 바로 드러냅니다.
+            query = self.db.query(User).options(
+                raiseload("*")).filter(User.email == email)
 
             # 2. `includeDeleted`가 False이면, 아직 삭제되지 않은(deletedAt is None) 사용자만 필터링합니다.
             if not includeDeleted:
@@ -41,15 +44,45 @@ class UserRepository:
                 detail=f"이메일로 사용자 조회 중 오류가 발생했습니다: {e}"
             )
 
+    def getUserCredentialsByEmail(self, email: str) -> Optional[User]:
+        """
+        로그인 검증에 필요한 컬럼(ID, 이메일, 비밀번호 해시, 역할)만 로드하여 활성 사용자를 조회합니다.
+
+        Args:
+            email (str): 조회할 사용자의 이메일 주소.
+
+        Returns:
+            Optional[User]: 조회된 User 객체. 없으면 None을 반환합니다.
+        """
+        try:
+            # 1. 인증에 필요한 컬럼만 로드하고, 그 외 컬럼/관계에 접근하면 추가 SELECT 대신 예외가 발생하도록 합니다.
+            return self.db.query(User).options(
+                load_only(User.id, User.email, User.passwordHash,
+                          User.role, raiseload=True),
+                raiseload("*")
+            ).filter(
+                User.email == email,
+                User.deletedAt.is_(None)
+            ).first()
+        except Exception as e:
+            # 2. 데이터베이스 조회 중 오류 발생 시 서버 오류를 반환합니다.
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"이메일로 사용자 조회 중 오류가 발생했습니다: {e}"
+            )
+
     def getUserById(self, userId: int) -> Optional[User]:
         """
         사용자 ID를 사용하여 활성 사용자를 조회합니다.
         """
         try:
-            # 1. 사용자 ID와 삭제되지 않음 조건을 만족하는 사용자를 조회하여 반환합니다.
-            return self.db.query(User).filter(User.id == userId, User.deletedAt.is_(None)).first()
+            # 1. 기본 키로 사용자를 가져옵니다.
+            #    같은 요청에서 인증 시 이미 로드된 사용자는 세션의 identity map에서 바로 반환되어 SELECT를 다시 보내지 않습니다.
+            user = self.db.get(User, userId)
+            # 2. 삭제되지 않은 사용자만 반환합니다.
+            return user if user is not None and user.deletedAt is None else None
         except Exception as e:
-            # 2. 데이터베이스 조회 중 오류 발생 시 서버 오류를 반환합니다.
+            # 3. 데이터베이스 조회 중 오류 발생 시 서버 오류를 반환합니다.
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"ID로 사용자 조회 중 오류가 발생했습니다: {e}"
@@ -75,6 +108,20 @@ class UserRepository:
         self.db.add(user)
         return user
 
+    def decrementToken(self, userId: int) -> int:
+        """
+        잔액이 남아 있는 경우에만 사용자 토큰을 1 차감하는 단일 UPDATE 문을 실행하고, 영향을 받은 행 수를 반환합니다.
+        조회 후 잠금(SELECT ... FOR UPDATE) 없이 데이터베이스가 원자적으로 차감합니다.
+        """
+        # 1. 사용자 ID와 잔액 조건을 WHERE 절에 함께 걸어 조회 없이 바로 차감합니다.
+        result = self.db.execute(
+            update(User)
+            .where(User.id == userId, User.token > 0)
+            .values(token=User.token - 1)
+        )
+        # 2. 조건에 일치한 행 수를 반환합니다. (0이면 사용자가 없거나 토큰이 부족함)
+        return result.rowcount
+
     def updateUser(self, user: User, userUpdate: UserUpdate) -> User:
         """
         기존 사용자 객체의 정보를 업데이트합니다.
@@ -118,59 +165,77 @@ class UserRepository:
     def deleteUser(self, user: User) -> User:
         """
         사용자 객체를 비활성화(소프트 삭제)합니다.
+        ORM 변경 추적(flush) 없이 단일 UPDATE 문을 실행하며, 세션에 로드된 객체의 deletedAt도 함께 갱신됩니다.
         """
-        # 1. 사용자의 삭제 시각(deletedAt)을 현재 시간으로 설정하여 소프트 삭제 처리합니다.
-        user.deletedAt = datetime.now()
-        self.db.add(user)
+        # 1. 아직 삭제되지 않은 사용자만 WHERE 절에 걸어 삭제 시각(deletedAt)을 현재 시간으로 설정합니다.
+        self.db.execute(
+            update(User)
+            .where(User.id == user.id, User.deletedAt.is_(None))
+            .values(deletedAt=datetime.now())
+        )
         return user
 
-    # def getAllUsersAdmin(self, includeDeleted: bool = False) -> List[User]:
-    #     """
-    #     [관리자용] 모든 사용자 목록을 조회합니다.
+    def restoreUser(self, userId: int) -> int:
+        """
+        소프트 삭제된 사용자를 복구하는 단일 UPDATE 문을 실행하고, 영향을 받은 행 수를 반환합니다.
+        """
+        # 1. 삭제된 사용자만 WHERE 절에 걸어 조회 없이 바로 deletedAt을 비웁니다.
+        result = self.db.execute(
+            update(User)
+            .where(User.id == userId, User.deletedAt.isnot(None))
+            .values(deletedAt=None)
+        )
+        # 2. 조건에 일치한 행 수를 반환합니다. (0이면 사용자가 없거나 이미 활성 상태임)
+        return result.rowcount
 
-    #     Args:
-    #         includeDeleted (bool, optional): 소프트 삭제된 사용자를 포함할지 여부. Defaults to False.
+    def getAllUsersAdmin(self, includeDeleted: bool = False) -> List[User]:
+        """
+        [관리자용] 모든 사용자 목록을 조회합니다.
 
-    #     Returns:
-    #         List[User]: 조회된 User 객체의 리스트.
-    #     """
-    #     try:
-    #         # 1. 모든 사용자를 조회하는 기본 쿼리를 생성합니다.
-    #         query = self.db.query(User)
-    #         # 2. `includeDeleted`가 False이면, 삭제되지 않은 사용자만 필터링합니다.
-    #         if not includeDeleted:
-    #             query = query.filter(User.deletedAt.is_(None))
-    #         # 3. 쿼리를 실행하고 모든 결과를 리스트로 반환합니다.
-    #         return query.all()
-    #     except Exception as e:
-    #         # 4. 데이터베이스 조회 중 오류 발생 시 서버 오류를 반환합니다.
-    #         raise HTTPException(
-    #             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-    #             detail=f"모든 사용자 조회 중 오류가 발생했습니다: {e}"
-    #         )
+        Args:
+            includeDeleted (bool, optional): 소프트 삭제된 사용자를 포함할지 여부. Defaults to False.
 
-    # def getUserByIdAdmin(self, userId: int, includeDeleted: bool = False) -> Optional[User]:
-    #     """
-    #     [관리자용] 사용자 ID로 사용자를 조회하며, 삭제된 사용자도 포함할 수 있습니다.
+        Returns:
+            List[User]: 조회된 User 객체의 리스트.
+        """
+        try:
+            # 1. 모든 사용자를 조회하는 기본 쿼리를 생성합니다.
+            #    목록 직렬화 중 관계를 건드리면 사용자마다 추가 SELECT(N+1)가 발생하므로, raiseload로 막아 바로 드러냅니다.
+            query = self.db.query(User).options(raiseload("*"))
+            # 2. `includeDeleted`가 False이면, 삭제되지 않은 사용자만 필터링합니다.
+            if not includeDeleted:
+                query = query.filter(User.deletedAt.is_(None))
+            # 3. 쿼리를 실행하고 모든 결과를 리스트로 반환합니다.
+            return query.all()
+        except Exception as e:
+            # 4. 데이터베이스 조회 중 오류 발생 시 서버 오류를 반환합니다.
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"모든 사용자 조회 중 오류가 발생했습니다: {e}"
+            )
 
-    #     Args:
-    #         userId (int): 조회할 사용자의 ID.
-    #         includeDeleted (bool, optional): 소프트 삭제된 사용자를 포함할지 여부. Defaults to False.
+    def getUserByIdAdmin(self, userId: int, includeDeleted: bool = False) -> Optional[User]:
+        """
+        [관리자용] 사용자 ID로 사용자를 조회하며, 삭제된 사용자도 포함할 수 있습니다.
 
-    #     Returns:
-    #         Optional[User]: 조회된 User 객체. 없으면 None을 반환합니다.
-    #     """
-    #     try:
-    #         # 1. 사용자 ID를 기준으로 조회를 위한 기본 쿼리를 생성합니다.
-    #         query = self.db.query(User).filter(User.id == userId)
-    #         # 2. `includeDeleted`가 False이면, 삭제되지 않은 사용자만 필터링합니다.
-    #         if not includeDeleted:
-    #             query = query.filter(User.deletedAt.is_(None))
-    #         # 3. 쿼리를 실행하고 첫 번째 결과를 반환합니다.
-    #         return query.first()
-    #     except Exception as e:
-    #         # 4. 데이터베이스 조회 중 오류 발생 시 서버 오류를 반환합니다.
-    #         raise HTTPException(
-    #             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-    #             detail=f"ID로 관리자용 사용자 조회 중 오류가 발생했습니다: {e}"
-    #         )
+        Args:
+            userId (int): 조회할 사용자의 ID.
+            includeDeleted (bool, optional): 소프트 삭제된 사용자를 포함할지 여부. Defaults to False.
+
+        Returns:
+            Optional[User]: 조회된 User 객체. 없으면 None을 반환합니다.
+        """
+        try:
+            # 1. 사용자 ID를 기준으로 조회를 위한 기본 쿼리를 생성합니다.
+            query = self.db.query(User).filter(User.id == userId)
+            # 2. `includeDeleted`가 False이면, 삭제되지 않은 사용자만 필터링합니다.
+            if not includeDeleted:
+                query = query.filter(User.deletedAt.is_(None))
+            # 3. 쿼리를 실행하고 첫 번째 결과를 반환합니다.
+            return query.first()
+        except Exception as e:
+            # 4. 데이터베이스 조회 중 오류 발생 시 서버 오류를 반환합니다.
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"ID로 관리자용 사용자 조회 중 오류가 발생했습니다: {e}"
+            )
@@ -1,6 +1,7 @@
 # app/routers/application_router.py
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Response, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -46,7 +47,8 @@ def createApplication(
     # 2. 인증된 사용자와 요청된 정보를 바탕으로 애플리케이션 생성 서비스를 호출합니다.
     newApp = appService.createApplication(authenticatedUser, createAppSchema)
     # 3. 생성된 애플리케이션 정보를 반환합니다.
-    return newApp
+    # 서비스가 이미 응답 스키마를 반환하므로, 응답 모델 재검증 없이 orjson으로 바로 직렬화합니다.
+    return ORJSONResponse(newApp.model_dump(), status_code=status.HTTP_201_CREATED)
 
 
 @router.get(
@@ -75,7 +77,7 @@ def getApplications(
     # 2. 현재 사용자의 모든 애플리케이션을 조회하는 서비스를 호출합니다.
     userApps = appService.getApplications(authenticatedUser)
     # 3. 조회된 애플리케이션 목록을 반환합니다.
-    return userApps
+    return ORJSONResponse([app.model_dump() for app in userApps])
 
 
 @router.get(
@@ -132,10 +134,10 @@ def getApplication(
     """
     # 1. ApplicationService 인스턴스 생성
     appService = ApplicationService(db)
-    # 2. 특정 애플리케이션을 조회하는 서비스를 호출합니다.
-    application = appService.getApplication(appId, authenticatedUser)
+    # 2. 특정 애플리케이션을 조회하는 서비스를 호출합니다. (변경되지 않았으면 캐시된 JSON 바이트를 받습니다.)
+    body = appService.getApplicationJson(appId, authenticatedUser)
     # 3. 조회된 애플리케이션 정보를 반환합니다.
-    return application
+    return Response(content=body, media_type="application/json")
 
 
 @router.patch(
@@ -169,7 +171,7 @@ def updateApplication(
     updatedApp = appService.updateApplication(
         appId, authenticatedUser, appUpdateSchema)
     # 3. 수정된 애플리케이션 정보를 반환합니다.
-    return updatedApp
+    return ORJSONResponse(updatedApp.model_dump())
 
 
 @router.delete(
@@ -200,4 +202,4 @@ def deleteApplication(
     # 2. 애플리케이션을 삭제하는 서비스를 호출합니다.
     deletedApp = appService.deleteApplication(appId, authenticatedUser)
     # 3. 삭제 처리된 애플리케이션 정보를 반환합니다.
-    return deletedApp
\ No newline at end of file
+    return ORJSONResponse(deletedApp.model_dump())
\ No newline at end of file
@@ -1,6 +1,7 @@
 # app/routers/auth_router.py
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
 from db.session import get_db
@@ -44,7 +45,7 @@ async def loginForAccessToken(
     authService = AuthService(db)
     try:
         # 2. 인증 서비스를 통해 사용자 자격 증명을 검증합니다.
-        user = authService.authenticateUser(formData.email, formData.password)
+        user = await authService.authenticateUser(formData.email, formData.password)
     except UserNotFoundException:
         # 3. 사용자를 찾을 수 없는 경우, 401 Unauthorized 오류를 발생시킵니다.
         raise HTTPException(
@@ -63,5 +64,5 @@ async def loginForAccessToken(
     # 5. 인증에 성공하면, 해당 사용자를 위한 액세스 토큰을 생성합니다.
     token = authService.createAccessTokenForUser(user)
 
-    # 6. 생성된 토큰을 클라이언트에게 반환합니다.
-    return token
\ No newline at end of file
+    # 6. 생성된 토큰을 클라이언트에게 반환합니다. (응답 모델 재검증 없이 orjson으로 바로 직렬화)
+    return ORJSONResponse(token.model_dump())
\ No newline at end of file
@@ -8,6 +8,7 @@ from celery.exceptions import TimeoutError, TaskError # Import specific Celery e
 
 # 프로젝트 의존성 및 모델, 서비스 임포트
 from app.core.security import getValidApiKey
+from app.core.gzip_route import GzipRoute
 from app.models.api_key import ApiKey
 from db.session import get_db
 from app.schemas.captcha import CaptchaProblemResponse, CaptchaVerificationRequest, CaptchaVerificationResponse, CaptchaTaskResponse
@@ -16,10 +17,12 @@ from app.celery_app import celery_app
 
 
 # API 라우터 객체 생성
+# 행동 데이터가 큰 검증 요청은 gzip으로 압축해 보낼 수 있도록 GzipRoute를 사용합니다.
 router = APIRouter(
     prefix="/captcha",
     tags=["Captcha"],
     responses={404: {"description": "Not found"}},
+    route_class=GzipRoute,
 )
 
 
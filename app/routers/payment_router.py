@@ -64,7 +64,7 @@ def getUserPaymentHistory(
     description="paymentKey를 사용하여 토스페이먼츠에서 결제 상세 정보를 조회하고, 우리 DB의 기록과 대조하여 반환합니다.",
     response_model=Dict[str, Any]
 )
-def getPaymentDetails(
+async def getPaymentDetails(
     paymentKey: str,
     authenticatedUser: User = Depends(getAuthenticatedUser),
     db: Session = Depends(get_db), # Direct DB session injection
@@ -72,7 +72,7 @@ def getPaymentDetails(
     # 1. PaymentService 인스턴스 생성
     paymentService = PaymentService(db)
     # 2. PaymentService를 통해 결제 상세 정보 조회
-    return paymentService.getPaymentDetails(paymentKey, authenticatedUser)
+    return await paymentService.getPaymentDetails(paymentKey, authenticatedUser)
 
 
 @router.post(
@@ -81,7 +81,7 @@ def getPaymentDetails(
     description="paymentKey를 사용하여 승인된 결제를 취소합니다. 부분 취소도 가능합니다.",
     response_model=Dict[str, Any]
 )
-def cancelPayment(
+async def cancelPayment(
     paymentKey: str,
     cancelRequest: PaymentCancelRequest,
     authenticatedUser: User = Depends(getAuthenticatedUser),
@@ -90,7 +90,7 @@ def cancelPayment(
     # 1. PaymentService 인스턴스 생성
     paymentService = PaymentService(db)
     # 2. PaymentService를 통해 결제 취소 요청
-    return paymentService.cancelPayment(paymentKey, cancelRequest, authenticatedUser)
+    return await paymentService.cancelPayment(paymentKey, cancelRequest, authenticatedUser)
 
 
 @router.post(
@@ -99,7 +99,7 @@ def cancelPayment(
     summary="결제 승인 및 기록",
     description="클라이언트로부터 결제 정보를 받아 토스페이먼츠에 최종 승인 요청을 보내고, 성공 시 우리 데이터베이스에 결제 내역을 기록합니다.",
 )
-def confirmPayment(
+async def confirmPayment(
     data: PaymentConfirmRequest,
     authenticatedUser: User = Depends(getAuthenticatedUser),
     db: Session = Depends(get_db), # Direct DB session injection
@@ -107,6 +107,6 @@ def confirmPayment(
     # 1. PaymentService 인스턴스 생성
     paymentService = PaymentService(db)
     # 2. PaymentService를 통해 결제 승인 및 기록
-    paymentData = paymentService.confirmPayment(data, authenticatedUser)
+    paymentData = await paymentService.confirmPayment(data, authenticatedUser)
     # 3. 승인된 결제 데이터 반환
     return JSONResponse(content=paymentData, status_code=status.HTTP_200_OK)
\ No newline at end of file
@@ -1,6 +1,7 @@
 # app/routers/usage_stats_router.py
 
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import date
@@ -53,7 +54,8 @@ def getSummaryStats(
         endDate=endDate
     )
 
-    return data
+    # 서비스가 이미 응답 스키마를 반환하므로, 응답 모델 재검증 없이 orjson으로 바로 직렬화합니다.
+    return ORJSONResponse(data.model_dump())
 
 
 @router.get(
@@ -95,7 +97,8 @@ def getUsageLogs(
         limit=limit
     )
 
-    return data
+    # 로그 페이지는 항목 수가 많으므로, 응답 모델 재검증 없이 orjson으로 바로 직렬화합니다.
+    return ORJSONResponse(data.model_dump())
 
 
 @router.get(
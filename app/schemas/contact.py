@@ -3,6 +3,11 @@ from datetime import datetime
 from pydantic.alias_generators import to_camel
 import re
 
+# 검증에 사용하는 정규식은 모듈 로드 시 한 번만 컴파일합니다.
+_EMAIL_RE = re.compile(r"[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}")
+_NAME_INVALID_CHAR_RE = re.compile(r'[^가-힣A-Za-z0-9._-]')
+_NAME_REPEATED_SPECIAL_RE = re.compile(r'[._-]{2,}')
+
 
 # 문의 베이스 스키마
 class ContactBase(BaseModel):
@@ -23,11 +28,11 @@ class ContactBase(BaseModel):
             raise ValueError("이름은 1~50자 이내로 입력해주세요.")
         if v.isdigit():
             raise ValueError("이름은 숫자만으로 구성할 수 없습니다.")
-        if re.search(r'[^가-힣A-Za-z0-9._-]', v):
+        if _NAME_INVALID_CHAR_RE.search(v):
             raise ValueError("이름은 한글, 영문, 숫자, 특수문자(.-_) 만 사용할 수 있습니다.")
         if v.startswith(('.', '_', '-')) or v.endswith(('.', '_', '-')):
             raise ValueError("이름은 특수문자로 시작하거나 끝낼 수 없습니다.")
-        if re.search(r'[._-]{2,}', v):
+        if _NAME_REPEATED_SPECIAL_RE.search(v):
             raise ValueError("이름에 특수문자는 연속으로 사용할 수 없습니다.")
         return v
 
@@ -38,7 +43,7 @@ class ContactBase(BaseModel):
         v = v.strip().lower()
         if len(v) > 100:
             raise ValueError("이메일은 100자 이내로 입력해주세요.")
-        if not re.match(r"^[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$", v):
+        if not _EMAIL_RE.fullmatch(v):
             raise ValueError("올바른 이메일 주소 형식이 아닙니다.")
         return v
 
@@ -10,6 +10,13 @@ from pydantic.alias_generators import to_camel
 
 from app.models.user import UserRole
 
+# 검증에 사용하는 정규식은 모듈 로드 시 한 번만 컴파일합니다.
+# (전체 일치는 fullmatch로 검사하여 '$'가 끝의 개행 문자를 허용하지 않도록 합니다.)
+_EMAIL_RE = re.compile(r"[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}")
+_PASSWORD_RE = re.compile(r'[A-Za-z0-9!@#$%^&*()_+\-=\[\]{};:,./?]+')
+_NAME_INVALID_CHAR_RE = re.compile(r'[^가-힣A-Za-z0-9._-]')
+_NAME_REPEATED_SPECIAL_RE = re.compile(r'[._-]{2,}')
+
 
 class UserCreate(BaseModel):  # 사용자 회원가입 스키마
     email: str = Field(
@@ -35,7 +42,7 @@ class UserCreate(BaseModel):  # 사용자 회원가입 스키마
         v = v.strip().lower()
         if len(v) > 254:
             raise ValueError("이메일은 254자 이내로 입력해주세요.")
-        if not re.match(r"^[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$", v):
+        if not _EMAIL_RE.fullmatch(v):
             raise ValueError("올바른 이메일 주소 형식이 아닙니다.")
         return v
 
@@ -46,11 +53,11 @@ class UserCreate(BaseModel):  # 사용자 회원가입 스키마
             raise ValueError("이름은 1~30자 이내로 입력해주세요.")
         if v.isdigit():
             raise ValueError("이름은 숫자만으로 구성할 수 없습니다.")
-        if re.search(r'[^가-힣A-Za-z0-9._-]', v):
+        if _NAME_INVALID_CHAR_RE.search(v):
             raise ValueError("이름은 한글, 영문, 숫자, 특수문자(.-_) 만 사용할 수 있습니다.")
         if v.startswith(('.', '_', '-')) or v.endswith(('.', '_', '-')):
             raise ValueError("이름은 특수문자로 시작하거나 끝낼 수 없습니다.")
-        if re.search(r'[._-]{2,}', v):
+        if _NAME_REPEATED_SPECIAL_RE.search(v):
             raise ValueError("이름에 특수문자는 연속으로 사용할 수 없습니다.")
         return v
 
@@ -61,7 +68,7 @@ class UserCreate(BaseModel):  # 사용자 회원가입 스키마
             raise ValueError("비밀번호는 8~64자 이내로 입력해주세요.")
         if v.isdigit():
             raise ValueError("비밀번호는 숫자만으로 구성할 수 없습니다.")
-        if not re.match(r'^[A-Za-z0-9!@#$%^&*()_+\-=\[\]{};:,./?]+$', v):
+        if not _PASSWORD_RE.fullmatch(v):
             raise ValueError("비밀번호에 허용되지 않는 문자(공백 등)가 포함되어 있습니다.")
         return v
 
@@ -85,7 +92,7 @@ class UserLogin(BaseModel):  # 사용자 로그인 스키마
         v = v.strip().lower()
         if len(v) > 254:
             raise ValueError("이메일은 254자 이내로 입력해주세요.")
-        if not re.match(r"^[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$", v):
+        if not _EMAIL_RE.fullmatch(v):
             raise ValueError("올바른 이메일 주소 형식이 아닙니다.")
         return v
 
@@ -96,7 +103,7 @@ class UserLogin(BaseModel):  # 사용자 로그인 스키마
             raise ValueError("비밀번호는 8~64자 이내로 입력해주세요.")
         if v.isdigit():
             raise ValueError("비밀번호는 숫자만으로 구성할 수 없습니다.")
-        if not re.match(r'^[A-Za-z0-9!@#$%^&*()_+\-=\[\]{};:,./?]+$', v):
+        if not _PASSWORD_RE.fullmatch(v):
             raise ValueError("비밀번호에 허용되지 않는 문자(공백 등)가 포함되어 있습니다.")
         return v
 
@@ -140,11 +147,11 @@ class UserUpdate(BaseModel):  # 사용자 업데이트 스키마
             raise ValueError("이름은 1~30자 이내로 입력해주세요.")
         if v.isdigit():
             raise ValueError("이름은 숫자만으로 구성할 수 없습니다.")
-        if re.search(r'[^가-힣A-Za-z0-9._-]', v):
+        if _NAME_INVALID_CHAR_RE.search(v):
             raise ValueError("이름은 한글, 영문, 숫자, 특수문자(.-_) 만 사용할 수 있습니다.")
         if v.startswith(('.', '_', '-')) or v.endswith(('.', '_', '-')):
             raise ValueError("이름은 특수문자로 시작하거나 끝낼 수 없습니다.")
-        if re.search(r'[._-]{2,}', v):
+        if _NAME_REPEATED_SPECIAL_RE.search(v):
             raise ValueError("이름에 특수문자는 연속으로 사용할 수 없습니다.")
         return v
 
@@ -157,7 +164,7 @@ class UserUpdate(BaseModel):  # 사용자 업데이트 스키마
             raise ValueError("비밀번호는 8~20자 이내로 입력해주세요.")
         if v.isdigit():
             raise ValueError("비밀번호는 숫자만으로 구성할 수 없습니다.")
-        if not re.match(r'^[A-Za-z0-9!@#$%^&*()_+\-=\[\]{};:,./?]+$', v):
+        if not _PASSWORD_RE.fullmatch(v):
             raise ValueError("비밀번호에 허용되지 않는 문자(공백 등)가 포함되어 있습니다.")
         return v
 
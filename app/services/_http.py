@@ -0,0 +1,42 @@
+# app/services/_http.py
+
+from typing import Optional
+
+import httpx
+
+# 토스페이먼츠 API 기본 URL
+TOSS_API_BASE_URL = "https://api.tosspayments.com/v1"
+
+# 외부 API 호출 타임아웃 (연결 3초, 그 외 10초)
+TOSS_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+
+_tossClient: Optional[httpx.AsyncClient] = None
+
+
+def getTossClient() -> httpx.AsyncClient:
+    """
+    토스페이먼츠 API 호출에 재사용할 httpx.AsyncClient를 반환합니다.
+    커넥션 풀을 통해 요청마다 TCP/TLS 핸드셰이크를 반복하지 않고,
+    이벤트 루프를 막지 않은 채 여러 요청을 동시에 보낼 수 있습니다.
+    """
+    global _tossClient
+    if _tossClient is None:
+        # 1. 연결 실패는 짧게 재시도하고(HTTP 응답 오류는 재시도하지 않음), 커넥션 풀 크기를 제한합니다.
+        _tossClient = httpx.AsyncClient(
+            base_url=TOSS_API_BASE_URL,
+            timeout=TOSS_TIMEOUT,
+            limits=httpx.Limits(max_connections=50,
+                                max_keepalive_connections=10),
+            transport=httpx.AsyncHTTPTransport(retries=2),
+        )
+    return _tossClient
+
+
+async def closeTossClient() -> None:
+    """
+    애플리케이션 종료 시 토스페이먼츠 API 클라이언트의 커넥션을 정리합니다.
+    """
+    global _tossClient
+    if _tossClient is not None:
+        await _tossClient.aclose()
+        _tossClient = None
@@ -1,5 +1,7 @@
+from datetime import datetime
 from typing import List
 from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.repositories.api_key_repo import ApiKeyRepository
@@ -7,6 +9,9 @@ from app.models.api_key import ApiKey
 from app.models.user import User
 from app.schemas.api_key import ApiKeyResponse, ApiKeyUpdate
 from app.models.api_key import Difficulty
+from app.core.transaction import transactional
+from app.services.application_service import applicationCache, applicationsCache
+from app.services.usage_stats_service import userKeyIdsCache
 
 
 class ApiKeyService:
@@ -20,6 +25,7 @@ class ApiKeyService:
         self.db = db
         self.apiKeyRepo = ApiKeyRepository(db)
 
+    @transactional("API 키 생성")
     def createKey(self, currentUser: User, appId: int, expiresPolicy: int = 0, difficulty: Difficulty = Difficulty.MIDDLE) -> ApiKey:
         """
         특정 애플리케이션에 대한 새로운 API 키를 생성합니다.
@@ -32,42 +38,30 @@ class ApiKeyService:
         Returns:
             ApiKey: 새로 생성된 ApiKey 객체.
         """
+        # 1. ApiKeyRepository를 통해 새로운 API 키를 생성하고 바로 flush합니다.
+        key: ApiKey = self.apiKeyRepo.createKey(
+            userId=currentUser.id,
+            appId=appId,
+            expiresPolicy=expiresPolicy,
+            difficulty=difficulty
+        )
         try:
-            # 1. 해당 애플리케이션에 이미 활성화된 API 키가 존재하는지 확인합니다.
-            existingKey = self.apiKeyRepo.getKeyByAppId(appId)
-            if existingKey:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="이미 해당 애플리케이션에 대한 활성화된 API 키가 존재합니다."
-                )
-
-            # 2. ApiKeyRepository를 통해 새로운 API 키를 생성합니다.
-            key: ApiKey = self.apiKeyRepo.createKey(
-                userId=currentUser.id,
-                appId=appId,
-                expiresPolicy=expiresPolicy,
-                difficulty=difficulty
+            self.db.flush()
+        except IntegrityError:
+            # 2. 애플리케이션당 활성 키 UNIQUE 인덱스에 걸리면 이미 활성 키가 존재하는 것입니다.
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="이미 해당 애플리케이션에 대한 활성화된 API 키가 존재합니다."
             )
 
-            # 3. 변경사항을 커밋합니다.
-            self.db.commit()
+        # 3. 애플리케이션 응답에 키 정보가 포함되므로 해당 사용자의 목록 캐시와 애플리케이션 캐시를 비웁니다.
+        #    (통계 조회에 쓰이는 사용자의 키 ID 목록 캐시도 함께 비웁니다.)
+        applicationsCache.delete(currentUser.id)
+        applicationCache.delete(appId)
+        userKeyIdsCache.delete(currentUser.id)
 
-            # 4. 최신 상태를 반영합니다.
-            self.db.refresh(key)
-
-            # 5. 생성된 API 키 객체를 반환합니다.
-            return key
-        except HTTPException as e:
-            # 6. HTTP 예외 발생 시 롤백하고 예외를 다시 발생시킵니다.
-            self.db.rollback()
-            raise e
-        except Exception as e:
-            # 7. 그 외 모든 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
-            self.db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"API 키 생성 중 오류가 발생했습니다: {e}"
-            )
+        # 4. 생성된 API 키 객체를 반환합니다. (커밋은 transactional 데코레이터가 처리)
+        return key
 
     def getKeys(self, currentUser: User) -> List[ApiKeyResponse]:
         """
@@ -124,51 +118,95 @@ class ApiKeyService:
                 detail=f"API 키 조회 중 오류가 발생했습니다: {e}"
             )
 
-    def deleteKey(self, keyId: int, currentUser: User) -> ApiKeyResponse:
+    def _updateOwnedKey(self, keyId: int, currentUser: User, values: dict) -> ApiKey:
         """
-        API 키를 소프트 삭제합니다.
+        소유권 검사와 갱신을 하나의 UPDATE 문으로 처리한 뒤 변경된 API 키를 반환합니다.
 
         Args:
-            keyId (int): 삭제할 API 키의 ID.
+            keyId (int): 갱신할 API 키의 ID.
             currentUser (User): 현재 인증된 사용자 객체.
+            values (dict): 갱신할 컬럼 값.
 
         Returns:
-            ApiKeyResponse: 소프트 삭제된 ApiKeyResponse 객체.
+            ApiKey: 갱신된 ApiKey 객체.
         """
+        # 1. 키 ID와 소유자 ID를 조건으로 단일 UPDATE 문을 실행합니다.
         try:
-            # 1. ApiKeyRepository를 통해 API 키를 조회합니다.
-            key = self.apiKeyRepo.getKeyByKeyId(keyId)
+            updatedRows = self.apiKeyRepo.updateKeyOwned(
+                keyId, currentUser.id, values)
+        except IntegrityError:
+            # 키 활성화 시 같은 애플리케이션에 다른 활성 키가 있으면 UNIQUE 인덱스에 걸립니다.
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="이미 해당 애플리케이션에 대한 활성화된 API 키가 존재합니다."
+            )
 
-            # 2. API 키가 없거나 현재 사용자의 소유가 아닌 경우 404 오류를 발생시킵니다.
-            if not key or key.userId != currentUser.id:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="API 키를 찾을 수 없습니다."
-                )
+        # 2. 갱신된 행이 없으면 키가 없거나 현재 사용자의 소유가 아니므로 404 오류를 발생시킵니다.
+        if updatedRows == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="API 키를 찾을 수 없습니다."
+            )
 
-            # 3. ApiKeyRepository를 통해 API 키를 소프트 삭제합니다.
-            deletedKey = self.apiKeyRepo.deleteKey(keyId)
+        # 3. 갱신된 API 키를 가져옵니다. (MySQL은 RETURNING을 지원하지 않으므로,
+        #    세션에 이미 로드된 키는 그대로, 아니면 한 번 조회합니다.)
+        key = self.db.get(ApiKey, keyId)
 
-            # 4. 변경사항을 커밋합니다.
-            self.db.commit()
+        # 4. 애플리케이션 응답에 키 정보가 포함되므로 해당 사용자의 목록 캐시와 애플리케이션 캐시를 비웁니다.
+        #    (키 삭제 시 통계 조회에 쓰이는 사용자의 키 ID 목록도 바뀌므로 함께 비웁니다.)
+        applicationsCache.delete(currentUser.id)
+        applicationCache.delete(key.appId)
+        if "deletedAt" in values:
+            userKeyIdsCache.delete(currentUser.id)
+        return key
 
-            # 5. 최신 상태를 반영합니다.
-            self.db.refresh(deletedKey)
+    def _lockOwnedKey(self, keyId: int, currentUser: User) -> ApiKey:
+        """
+        상태 변경 전에 API 키 행을 잠급니다. 다른 요청이 같은 키를 수정 중이면 기다리지 않고 409 오류를 발생시킵니다.
 
-            # 6. 삭제된 API 키 객체를 반환합니다.
-            return deletedKey
-        except HTTPException as e:
-            # 7. HTTP 예외 발생 시 롤백하고 예외를 다시 발생시킵니다.
-            self.db.rollback()
-            raise e
-        except Exception as e:
-            # 8. 그 외 모든 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
-            self.db.rollback()
+        Args:
+            keyId (int): 잠글 API 키의 ID.
+            currentUser (User): 현재 인증된 사용자 객체.
+
+        Returns:
+            ApiKey: 잠근 ApiKey 객체.
+        """
+        # 1. SELECT ... FOR UPDATE SKIP LOCKED로 키를 잠급니다.
+        key = self.apiKeyRepo.lockOwnedKey(keyId, currentUser.id)
+        if key:
+            return key
+
+        # 2. 잠그지 못한 경우, 키가 존재하면 다른 요청이 수정 중인 것이므로 409 오류를 발생시킵니다.
+        existingKey = self.apiKeyRepo.getKeyByKeyId(keyId)
+        if existingKey and existingKey.userId == currentUser.id:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"API 키 삭제 중 오류가 발생했습니다: {e}"
+                status_code=status.HTTP_409_CONFLICT,
+                detail="다른 요청에서 API 키를 변경하는 중입니다. 잠시 후 다시 시도해주세요."
             )
 
+        # 3. 키가 없거나 현재 사용자의 소유가 아니면 404 오류를 발생시킵니다.
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="API 키를 찾을 수 없습니다."
+        )
+
+    @transactional("API 키 삭제")
+    def deleteKey(self, keyId: int, currentUser: User) -> ApiKeyResponse:
+        """
+        API 키를 소프트 삭제합니다.
+
+        Args:
+            keyId (int): 삭제할 API 키의 ID.
+            currentUser (User): 현재 인증된 사용자 객체.
+
+        Returns:
+            ApiKeyResponse: 소프트 삭제된 ApiKeyResponse 객체.
+        """
+        # 1. 소유권 조건을 포함한 단일 UPDATE 문으로 API 키를 소프트 삭제합니다.
+        return self._updateOwnedKey(
+            keyId, currentUser, {"deletedAt": datetime.now(), "isActive": False})
+
+    @transactional("API 키 활성화")
     def activateKey(self, keyId: int, currentUser: User) -> ApiKey:
         """
         API 키를 활성화합니다.
@@ -180,40 +218,13 @@ class ApiKeyService:
         Returns:
             ApiKey: 활성화된 ApiKey 객체.
         """
-        try:
-            # 1. ApiKeyRepository를 통해 API 키를 조회합니다.
-            key = self.apiKeyRepo.getKeyByKeyId(keyId)
-
-            # 2. API 키가 없거나 현재 사용자의 소유가 아닌 경우 404 오류를 발생시킵니다.
-            if not key or key.userId != currentUser.id:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="API 키를 찾을 수 없습니다."
-                )
-
-            # 3. ApiKeyRepository를 통해 API 키를 활성화합니다.
-            activatedKey = self.apiKeyRepo.activateKey(keyId)
+        # 1. 동시 요청으로 커넥션이 대기하지 않도록 키 행을 SKIP LOCKED로 잠급니다.
+        self._lockOwnedKey(keyId, currentUser)
 
-            # 4. 변경사항을 커밋합니다.
-            self.db.commit()
-
-            # 5. 최신 상태를 반영합니다.
-            self.db.refresh(activatedKey)
-
-            # 6. 활성화된 API 키 객체를 반환합니다.
-            return activatedKey
-        except HTTPException as e:
-            # 7. HTTP 예외 발생 시 롤백하고 예외를 다시 발생시킵니다.
-            self.db.rollback()
-            raise e
-        except Exception as e:
-            # 8. 그 외 모든 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
-            self.db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"API 키 활성화 중 오류가 발생했습니다: {e}"
-            )
+        # 2. 소유권 조건을 포함한 단일 UPDATE 문으로 API 키를 활성화합니다.
+        return self._updateOwnedKey(keyId, currentUser, {"isActive": True})
 
+    @transactional("API 키 비활성화")
     def deactivateKey(self, keyId: int, currentUser: User) -> ApiKey:
         """
         API 키를 비활성화합니다.
@@ -225,40 +236,13 @@ class ApiKeyService:
         Returns:
             ApiKey: 비활성화된 ApiKey 객체.
         """
-        try:
-            # 1. ApiKeyRepository를 통해 API 키를 조회합니다.
-            key = self.apiKeyRepo.getKeyByKeyId(keyId)
-
-            # 2. API 키가 없거나 현재 사용자의 소유가 아닌 경우 404 오류를 발생시킵니다.
-            if not key or key.userId != currentUser.id:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="API 키를 찾을 수 없습니다."
-                )
+        # 1. 동시 요청으로 커넥션이 대기하지 않도록 키 행을 SKIP LOCKED로 잠급니다.
+        self._lockOwnedKey(keyId, currentUser)
 
-            # 3. ApiKeyRepository를 통해 API 키를 비활성화합니다.
-            deactivatedKey = self.apiKeyRepo.deactivateKey(keyId)
-
-            # 4. 변경사항을 커밋합니다.
-            self.db.commit()
-
-            # 5. 최신 상태를 반영합니다.
-            self.db.refresh(deactivatedKey)
-
-            # 6. 비활성화된 API 키 객체를 반환합니다.
-            return deactivatedKey
-        except HTTPException as e:
-            # 7. HTTP 예외 발생 시 롤백하고 예외를 다시 발생시킵니다.
-            self.db.rollback()
-            raise e
-        except Exception as e:
-            # 8. 그 외 모든 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
-            self.db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"API 키 비활성화 중 오류가 발생했습니다: {e}"
-            )
+        # 2. 소유권 조건을 포함한 단일 UPDATE 문으로 API 키를 비활성화합니다.
+        return self._updateOwnedKey(keyId, currentUser, {"isActive": False})
 
+    @transactional("API 키 업데이트")
     def updateKey(self, keyId: int, currentUser: User, apiKeyUpdate: ApiKeyUpdate) -> ApiKey:
         """
         API 키를 업데이트합니다.
@@ -271,36 +255,12 @@ class ApiKeyService:
         Returns:
             ApiKey: 업데이트된 ApiKey 객체.
         """
-        try:
-            # 1. ApiKeyRepository를 통해 API 키를 조회합니다.
-            key = self.apiKeyRepo.getKeyByKeyId(keyId)
+        # 1. 업데이트 스키마를 컬럼 값 딕셔너리로 변환합니다.
+        values = self.apiKeyRepo.buildUpdateValues(apiKeyUpdate)
 
-            # 2. API 키가 없거나 현재 사용자의 소유가 아닌 경우 404 오류를 발생시킵니다.
-            if not key or key.userId != currentUser.id:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="API 키를 찾을 수 없습니다."
-                )
-
-            # 3. ApiKeyRepository를 통해 API 키를 업데이트합니다.
-            updatedKey = self.apiKeyRepo.updateKey(key, apiKeyUpdate)
-
-            # 4. 변경사항을 커밋합니다.
-            self.db.commit()
-
-            # 5. 최신 상태를 반영합니다.
-            self.db.refresh(updatedKey)
+        # 2. 변경할 값이 없으면 소유권만 확인하고 기존 키를 반환합니다.
+        if not values:
+            return self.getKey(keyId, currentUser)
 
-            # 6. 업데이트된 API 키 객체를 반환합니다.
-            return updatedKey
-        except HTTPException as e:
-            # 7. HTTP 예외 발생 시 롤백하고 예외를 다시 발생시킵니다.
-            self.db.rollback()
-            raise e
-        except Exception as e:
-            # 8. 그 외 모든 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
-            self.db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"API 키 업데이트 중 오류가 발생했습니다: {e}"
-            )
+        # 3. 소유권 조건을 포함한 단일 UPDATE 문으로 API 키를 업데이트합니다.
+        return self._updateOwnedKey(keyId, currentUser, values)
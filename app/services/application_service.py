@@ -1,3 +1,5 @@
+from datetime import datetime
+import orjson
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from typing import List, Optional
@@ -10,6 +12,23 @@ from app.repositories.application_repo import ApplicationRepository
 from app.schemas.application import ApplicationCreate, ApplicationResponse, ApplicationUpdate, CountResponse
 from app.schemas.api_key import ApiKeyResponse
 from app.core.config import settings  # settings 객체 임포트
+from app.core.cache import TTLCache
+from app.services.usage_stats_service import userKeyIdsCache
+
+
+# 사용자당 최대 애플리케이션 개수 (음수이면 무제한)
+_MAX_APPLICATIONS_PER_USER: int = settings.MAX_APPLICATIONS_PER_USER
+
+# 사용자별 애플리케이션 목록 응답 캐시
+# 값은 (버전, 응답 목록) 형태이며, 버전은 애플리케이션/API 키의 최종 수정 시각과 개수로 구성됩니다.
+# 캐시는 워커 프로세스마다 따로 있어 쓰기 후 delete()는 해당 프로세스에서만 동작하므로,
+# 다른 프로세스는 버전 비교로 변경을 감지합니다. (updated_at은 마이크로초 단위라 같은 초 안의 연속 수정도 구분됩니다.)
+applicationsCache = TTLCache(ttlSeconds=30, maxSize=4096)
+
+# 애플리케이션별 단일 조회 응답 캐시
+# 값은 (버전, 직렬화된 JSON 바이트) 형태이며, 버전은 소유자 ID와 애플리케이션/API 키의 수정 시각으로 구성됩니다.
+# 쓰기 후 delete()는 해당 워커 프로세스의 캐시만 비우므로, 다른 프로세스는 마이크로초 단위 수정 시각 버전으로 변경을 감지합니다.
+applicationCache = TTLCache(ttlSeconds=60, maxSize=4096)
 
 
 class ApplicationService:
@@ -36,13 +55,14 @@ class ApplicationService:
             ApplicationResponse: 매핑된 ApplicationResponse 객체.
         """
         # 1. ApplicationResponse 객체를 생성하여 반환합니다.
-        return ApplicationResponse(
+        # ORM에서 읽은 값은 이미 스키마와 일치하므로 model_construct로 검증을 생략합니다.
+        return ApplicationResponse.model_construct(
             id=app.id,
             userId=app.userId,
             appName=app.appName,
             description=app.description,
             # 2. API 키 정보가 존재하면 ApiKeyResponse로 변환하여 포함하고, 없으면 None으로 설정합니다.
-            key=ApiKeyResponse(
+            key=ApiKeyResponse.model_construct(
                 id=key.id,
                 key=key.key,
                 isActive=key.isActive,
@@ -70,44 +90,46 @@ class ApplicationService:
         """
         try:
             # 1. 사용자가 생성할 수 있는 최대 애플리케이션 개수를 확인합니다.
-            maxApps = settings.MAX_APPLICATIONS_PER_USER
-
-            # 2. 현재 사용자가 생성한 애플리케이션의 개수를 조회합니다.
-            currentAppsCount = self.appRepo.getApplicationsCountByUserId(
-                currentUser.id)
-
-            # 3. 최대 애플리케이션 개수를 초과하는 경우 예외 처리합니다.
-            if currentAppsCount >= maxApps:
+            maxApps = _MAX_APPLICATIONS_PER_USER
+
+            # 2. 최대 개수가 음수이면 무제한이므로 개수 확인 없이 애플리케이션을 생성합니다.
+            if maxApps < 0:
+                app = self.appRepo.createApplication(currentUser.id, appCreate)
+            else:
+                # 3. 개수 확인과 생성을 하나의 INSERT 문으로 처리합니다.
+                app = self.appRepo.createApplicationWithinLimit(
+                    currentUser.id, appCreate, maxApps)
+
+            # 4. 최대 애플리케이션 개수를 초과하여 생성되지 않은 경우 예외 처리합니다.
+            if app is None:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail=f"최대 {maxApps}개의 애플리케이션만 생성할 수 있습니다."
                 )
 
-            # 4. ApplicationRepository를 통해 새로운 애플리케이션을 생성합니다.
-            app = self.appRepo.createApplication(currentUser.id, appCreate)
-
             # 5. ApiKeyRepository를 통해 생성된 애플리케이션에 대한 API 키를 발급합니다.
+            #    방금 같은 트랜잭션에서 생성한 애플리케이션이므로 존재 확인 쿼리는 생략하고, 커밋 시 함께 flush됩니다.
             key = self.apiKeyRepo.createKey(
                 userId=currentUser.id,
                 appId=app.id,
-                expiresPolicy=appCreate.expiresPolicy
+                expiresPolicy=appCreate.expiresPolicy,
+                verifyApp=False
             )
 
-            # 6. 모든 DB 작업이 성공하면 변경사항을 커밋합니다.
+            # 6. 모든 DB 작업이 성공하면 변경사항을 커밋하고 목록 캐시와 사용자의 키 ID 목록 캐시를 비웁니다.
             self.db.commit()
+            applicationsCache.delete(currentUser.id)
+            userKeyIdsCache.delete(currentUser.id)
 
-            # 7. 커밋된 객체들의 최신 상태를 DB로부터 받아옵니다.
-            self.db.refresh(app)
-            self.db.refresh(key)
-
-            # 8. 생성된 애플리케이션과 API 키 정보를 매핑하여 반환합니다.
+            # 7. 생성된 애플리케이션과 API 키 정보를 매핑하여 반환합니다.
+            #    (세션이 expire_on_commit=False이고 기본값은 파이썬에서 채워지므로 refresh 없이 바로 사용할 수 있습니다.)
             return self.mapToApplicationResponse(app, key)
         except HTTPException as e:
-            # 9. HTTP 예외 발생 시 롤백하고 예외를 다시 발생시킵니다.
+            # 8. HTTP 예외 발생 시 롤백하고 예외를 다시 발생시킵니다.
             self.db.rollback()
             raise e
         except Exception as e:
-            # 10. 그 외 모든 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
+            # 9. 그 외 모든 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
             self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -125,20 +147,28 @@ class ApplicationService:
             List[ApplicationResponse]: 사용자의 모든 애플리케이션 및 API 키 정보를 포함하는 응답 객체 리스트.
         """
         try:
-            # 1. ApplicationRepository를 통해 사용자의 모든 애플리케이션을 조회합니다.
-            apps = self.appRepo.getApplicationsByUserId(currentUser.id)
-            # 2. ApiKeyRepository를 통해 사용자의 모든 API 키를 조회합니다.
-            keys = self.apiKeyRepo.getKeysByUserId(currentUser.id)
-
-            # 3. 조회된 애플리케이션과 API 키 정보를 매핑하여 리스트로 반환합니다.
-            # 각 애플리케이션에 해당하는 API 키를 찾아 매핑합니다.
-            return [
-                self.mapToApplicationResponse(app, next(
-                    (key for key in keys if key.appId == app.id), None))
+            # 1. 사용자의 애플리케이션/API 키 목록 버전을 조회하고, 캐시된 응답의 버전과 같으면 그대로 반환합니다.
+            version = self.appRepo.getApplicationsVersionByUserId(
+                currentUser.id)
+            cached = applicationsCache.get(currentUser.id)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            # 2. 사용자의 모든 애플리케이션을 삭제되지 않은 API 키와 함께 한 번에 조회합니다.
+            apps = self.appRepo.getApplicationsWithKeysByUserId(currentUser.id)
+
+            # 3. 각 애플리케이션에 이미 로드된 API 키를 사용하여 응답으로 매핑합니다.
+            responses = [
+                self.mapToApplicationResponse(
+                    app, app.apiKey[0] if app.apiKey else None)
                 for app in apps
             ]
+
+            # 4. 매핑 결과를 버전과 함께 캐시에 저장하고 반환합니다.
+            applicationsCache.set(currentUser.id, (version, responses))
+            return responses
         except Exception as e:
-            # 4. 예외 발생 시 서버 오류를 반환합니다.
+            # 5. 예외 발생 시 서버 오류를 반환합니다.
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"애플리케이션 목록 조회 중 오류가 발생했습니다: {e}"
@@ -202,6 +232,50 @@ class ApplicationService:
                 detail=f"애플리케이션 조회 중 오류가 발생했습니다: {e}"
             )
 
+    def getApplicationJson(self, appId: int, currentUser: User) -> bytes:
+        """
+        애플리케이션 ID로 단일 애플리케이션을 조회하여 직렬화된 JSON 바이트로 반환합니다.
+        변경되지 않은 애플리케이션은 캐시된 바이트를 그대로 반환하여 매핑과 직렬화를 생략합니다.
+
+        Args:
+            appId (int): 조회할 애플리케이션의 ID.
+            currentUser (User): 현재 인증된 사용자 객체.
+
+        Returns:
+            bytes: ApplicationResponse를 직렬화한 JSON 바이트.
+        """
+        try:
+            # 1. 애플리케이션의 버전(소유자, 수정 시각)을 조회합니다.
+            version = self.appRepo.getApplicationVersion(appId)
+
+            # 2. 애플리케이션이 없거나 현재 사용자의 소유가 아닌 경우 404 오류를 발생시킵니다.
+            if version is None or version[0] != currentUser.id:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="애플리케이션을 찾을 수 없습니다."
+                )
+
+            # 3. 캐시된 응답의 버전이 같으면 그대로 반환합니다.
+            #    (다른 워커에서 수정된 경우에도 마이크로초 단위 updated_at이 바뀌므로 버전이 달라집니다.)
+            cached = applicationCache.get(appId)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            # 4. 캐시가 없거나 오래된 경우 응답을 새로 만들어 직렬화하고 캐시에 저장합니다.
+            body = orjson.dumps(
+                self.getApplication(appId, currentUser).model_dump())
+            applicationCache.set(appId, (version, body))
+            return body
+        except HTTPException as e:
+            # 5. HTTP 예외는 그대로 다시 발생시킵니다.
+            raise e
+        except Exception as e:
+            # 6. 그 외 예외 발생 시 서버 오류를 반환합니다.
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"애플리케이션 조회 중 오류가 발생했습니다: {e}"
+            )
+
     def updateApplication(self, appId: int, currentUser: User, appUpdate: ApplicationUpdate) -> ApplicationResponse:
         """
         애플리케이션 ID에 해당하는 애플리케이션 정보를 업데이트합니다.
@@ -230,20 +304,20 @@ class ApplicationService:
             # 4. ApplicationRepository를 통해 애플리케이션 정보를 업데이트합니다.
             updatedApp = self.appRepo.updateApplication(app, appUpdate)
 
-            # 5. 변경사항을 커밋합니다.
+            # 5. 변경사항을 커밋하고 목록/단일 조회 캐시를 비웁니다.
             self.db.commit()
+            applicationsCache.delete(currentUser.id)
+            applicationCache.delete(appId)
 
-            # 6. 최신 상태를 반영합니다.
-            self.db.refresh(updatedApp)
-
-            # 7. 업데이트된 애플리케이션과 API 키 정보를 매핑하여 반환합니다.
+            # 6. 업데이트된 애플리케이션과 API 키 정보를 매핑하여 반환합니다.
+            #    (updatedAt은 onupdate로 파이썬에서 채워지므로 refresh 없이 바로 사용할 수 있습니다.)
             return self.mapToApplicationResponse(updatedApp, key)
         except HTTPException as e:
-            # 8. HTTP 예외 발생 시 롤백하고 예외를 다시 발생시킵니다.
+            # 7. HTTP 예외 발생 시 롤백하고 예외를 다시 발생시킵니다.
             self.db.rollback()
             raise e
         except Exception as e:
-            # 9. 그 외 모든 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
+            # 8. 그 외 모든 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
             self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -262,42 +336,42 @@ class ApplicationService:
             ApplicationResponse: 삭제 처리된 애플리케이션과 API 키 정보를 포함하는 응답 객체.
         """
         try:
-            # 1. ApplicationRepository를 통해 애플리케이션을 조회합니다.
-            app = self.appRepo.getApplicationByAppId(appId)
+            # 1. 삭제 시각을 초 단위로 맞춥니다. (DATETIME 컬럼에 저장된 값과 그대로 비교하기 위함)
+            deletedAt = datetime.now().replace(microsecond=0)
 
-            # 2. 애플리케이션이 없거나 현재 사용자의 소유가 아닌 경우 404 오류를 발생시킵니다.
-            if not app or app.userId != currentUser.id:
+            # 2. 소유권 조건을 포함한 하나의 UPDATE 문으로 애플리케이션과 연결된 API 키를 함께 소프트 삭제합니다.
+            updatedRows = self.appRepo.softDeleteWithKeys(
+                appId, currentUser.id, deletedAt)
+
+            # 3. 갱신된 행이 없으면 애플리케이션이 없거나 현재 사용자의 소유가 아니므로 404 오류를 발생시킵니다.
+            if updatedRows == 0:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="애플리케이션을 찾을 수 없습니다."
                 )
 
-            # 3. 연결된 API 키를 조회합니다.
-            key = self.apiKeyRepo.getKeyByAppId(appId)
-
-            # 4. ApiKeyRepository를 통해 연결된 API 키를 소프트 삭제합니다.
-            # 키가 존재하면 삭제하고, 삭제된 키 객체를 받습니다.
-            deletedKey = self.apiKeyRepo.deleteKey(key.id) if key else None
-
-            # 5. ApplicationRepository를 통해 애플리케이션을 소프트 삭제합니다。
-            deletedApp = self.appRepo.deleteApplication(appId)
+            # 4. 삭제 처리된 애플리케이션과 API 키를 조회합니다.
+            deletedApp = self.appRepo.getApplicationWithKeys(appId)
+            deletedKey = max(
+                (key for key in deletedApp.apiKey if key.deletedAt == deletedAt),
+                key=lambda key: key.createdAt,
+                default=None
+            )
 
-            # 6. 변경사항을 커밋합니다.
+            # 5. 변경사항을 커밋하고 목록/단일 조회 캐시와 사용자의 키 ID 목록 캐시를 비웁니다.
             self.db.commit()
+            applicationsCache.delete(currentUser.id)
+            applicationCache.delete(appId)
+            userKeyIdsCache.delete(currentUser.id)
 
-            # 7. 최신 상태를 반영합니다.
-            self.db.refresh(deletedApp)
-            if deletedKey:
-                self.db.refresh(deletedKey)
-
-            # 8. 삭제 처리된 애플리케이션과 API 키 정보를 매핑하여 반환합니다.
+            # 6. 삭제 처리된 애플리케이션과 API 키 정보를 매핑하여 반환합니다.
             return self.mapToApplicationResponse(deletedApp, deletedKey)
         except HTTPException as e:
-            # 9. HTTP 예외 발생 시 롤백하고 예외를 다시 발생시킵니다.
+            # 7. HTTP 예외 발생 시 롤백하고 예외를 다시 발생시킵니다.
             self.db.rollback()
             raise e
         except Exception as e:
-            # 10. 그 외 모든 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
+            # 8. 그 외 모든 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
             self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from datetime import timedelta
 from typing import Optional
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 
 from app.core import security
 from app.models.user import User
@@ -33,9 +34,10 @@ class AuthService:
         # 데이터베이스 세션을 주입받아 UserRepository 인스턴스를 초기화합니다.
         self.userRepo = UserRepository(db)
 
-    def authenticateUser(self, email: str, password: str) -> User:
+    async def authenticateUser(self, email: str, password: str) -> User:
         """
         사용자 자격 증명(이메일, 비밀번호)을 검증하고, 인증된 사용자 객체를 반환합니다.
+        블로킹 작업(DB 조회, bcrypt 검증)은 스레드풀에서 실행하여 이벤트 루프를 막지 않습니다.
 
         Args:
             email (str): 사용자의 이메일 주소.
@@ -45,8 +47,8 @@ class AuthService:
             User: 인증에 성공한 사용자 객체.
         """
         try:
-            # 1. 이메일을 사용하여 데이터베이스에서 사용자를 조회합니다.
-            user = self.userRepo.getUserByEmail(email)
+            # 1. 이메일을 사용하여 데이터베이스에서 사용자의 인증 정보만 조회합니다.
+            user = await run_in_threadpool(self.userRepo.getUserCredentialsByEmail, email)
         except Exception as e:
             # 2. 사용자 조회 중 데이터베이스 오류 발생 시 서버 오류를 반환합니다.
             raise HTTPException(
@@ -58,8 +60,8 @@ class AuthService:
         if not user:
             raise UserNotFoundException()
 
-        # 4. 비밀번호 일치 여부를 확인합니다.
-        if not security.verifyPassword(password, user.passwordHash):
+        # 4. 비밀번호 일치 여부를 확인합니다. (argon2/bcrypt 해시 연산은 GIL을 해제하므로 스레드풀에서 병렬로 실행됩니다.)
+        if not await run_in_threadpool(security.verifyPassword, password, user.passwordHash):
             raise InvalidPasswordException()
 
         # 5. 인증에 성공하면 사용자 객체를 반환합니다.
@@ -2,6 +2,9 @@
 
 import os
 import json
+import math
+import queue
+import time
 from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 import logging
@@ -9,7 +12,13 @@ import logging
 import numpy as np
 import torch
 import torch.nn as nn
-from threading import Lock
+from concurrent.futures import Future
+from threading import Lock, Thread, local
+
+try:
+    import onnxruntime as ort
+except ImportError:  # onnxruntime이 없으면 torch 경로만 사용합니다.
+    ort = None
 
 # 로거 설정
 logger = logging.getLogger(__name__)
@@ -45,6 +54,10 @@ class CNN1D(nn.Module):
 APP_DIR = Path(__file__).resolve().parent.parent
 ARTIFACTS_DIR = APP_DIR / "artifacts"
 BEST_PT = ARTIFACTS_DIR / "cnn" / "best.pt"
+# export_int8_model()로 오프라인 생성한 int8 양자화 TorchScript 모델 (있으면 best.pt 대신 사용)
+BEST_INT8_PT = ARTIFACTS_DIR / "cnn" / "best_int8.pt"
+# export_onnx_model()로 오프라인 생성한 ONNX 모델 (있고 onnxruntime이 설치되어 있으면 torch 대신 사용)
+BEST_ONNX = ARTIFACTS_DIR / "cnn" / "best.onnx"
 THR_JSON = ARTIFACTS_DIR / "cnn" / "thresholds.json"
 CALIB_JSON = ARTIFACTS_DIR / "cnn" / "calibration.json"
 
@@ -52,6 +65,20 @@ _MODEL: Optional[nn.Module] = None
 _THRESHOLD: Optional[float] = None
 _DEVICE = "cpu"
 _MODEL_LOCK = Lock()
+# uvicorn 워커마다 torch 스레드가 코어 수만큼 생기면 과다 구독이 발생하므로 워커당 스레드 수를 제한합니다.
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "1"))
+# 스레드별로 재사용하는 (1,7,T) 입력 버퍼 (요청마다 텐서를 새로 할당하지 않기 위함)
+_INPUT_BUFFERS = local()
+
+_ORT_SESSION = None
+_ORT_LOCK = Lock()
+
+# 마이크로배치 설정: 동시에 들어온 추론 요청을 최대 BEHAVIOR_BATCH_MAX개까지 BEHAVIOR_BATCH_WAIT_MS 동안 모아 한 번에 추론합니다.
+# 1 이하이면 배치 없이 요청마다 바로 추론합니다. (prefork 워커처럼 프로세스당 동시 요청이 하나뿐인 환경의 기본값)
+BEHAVIOR_BATCH_MAX = int(os.getenv("BEHAVIOR_BATCH_MAX", "1"))
+BEHAVIOR_BATCH_WAIT_MS = float(os.getenv("BEHAVIOR_BATCH_WAIT_MS", "3"))
+_BATCHER = None
+_BATCHER_LOCK = Lock()
 
 
 def _load_threshold_once() -> float:
@@ -71,6 +98,34 @@ def get_threshold() -> float:
     return _load_threshold_once()
 
 
+def _load_fp32_model() -> nn.Module:
+    m = CNN1D(in_ch=7, c1=96, c2=192, dropout=0.2, input_bn=True)
+    # 가중치만 메모리 매핑으로 읽고(assign=True로 복사 없이 파라미터에 연결) 임의 객체 역직렬화는 막습니다.
+    state = torch.load(BEST_PT, map_location=_DEVICE,
+                       mmap=True, weights_only=True)
+    m.load_state_dict(state, strict=True, assign=True)
+    m.eval()
+    return m
+
+
+def _load_int8_model() -> Optional[nn.Module]:
+    """best_int8.pt가 있고 fbgemm 엔진을 사용할 수 있으면 int8 모델을 로드합니다. 실패 시 None."""
+    if not BEST_INT8_PT.exists():
+        return None
+    if "fbgemm" not in torch.backends.quantized.supported_engines:
+        logger.warning("[경고] fbgemm 엔진 미지원, FP32 모델을 사용합니다.")
+        return None
+    try:
+        torch.backends.quantized.engine = "fbgemm"
+        m = torch.jit.load(str(BEST_INT8_PT), map_location=_DEVICE)
+        m.eval()
+        logger.info(f"[확인] best_int8.pt 로드 완료: {BEST_INT8_PT}")
+        return m
+    except Exception as e:
+        logger.warning(f"[경고] best_int8.pt 로드 실패, FP32 모델을 사용합니다: {e}")
+        return None
+
+
 def get_model() -> Optional[nn.Module]:
     """필요 시점에만 안전하게 로딩. 실패해도 다음 요청에서 재시도."""
     global _MODEL
@@ -79,11 +134,20 @@ def get_model() -> Optional[nn.Module]:
     with _MODEL_LOCK:
         if _MODEL is not None:
             return _MODEL
+        if TORCH_NUM_THREADS > 0:
+            torch.set_num_threads(TORCH_NUM_THREADS)
+        # int8 양자화 모델을 우선 사용하고, 없거나 로드에 실패하면 FP32 모델로 대체합니다.
+        m = _load_int8_model()
+        if m is not None:
+            _MODEL = m
+            return _MODEL
         try:
-            m = CNN1D(in_ch=7, c1=96, c2=192, dropout=0.2, input_bn=True)
-            state = torch.load(BEST_PT, map_location=_DEVICE)
-            m.load_state_dict(state, strict=True)
-            m.eval()
+            m = _load_fp32_model()
+            try:
+                # TorchScript로 고정(freeze)하여 BN+Conv+ReLU 융합 및 MKLDNN 커널을 사용합니다.
+                m = torch.jit.optimize_for_inference(torch.jit.script(m))
+            except Exception as e:
+                logger.warning(f"[경고] TorchScript 최적화 실패, eager 모델을 사용합니다: {e}")
             _MODEL = m
             logger.info(f"[확인] best.pt 로드 완료: {BEST_PT}")
         except Exception as e:
@@ -91,23 +155,96 @@ def get_model() -> Optional[nn.Module]:
             _MODEL = None
         return _MODEL
 
+
+def export_int8_model(windows: List[np.ndarray], out_path: Path = BEST_INT8_PT) -> Path:
+    """
+    best.pt를 fbgemm int8 정적 양자화 모델로 변환하여 저장합니다. (오프라인 전용)
+    prepare_fx가 (Conv, BN, ReLU)를 융합하고, windows로 활성값 범위를 보정(calibration)한 뒤 convert_fx로 변환합니다.
+
+    Args:
+        windows (List[np.ndarray]): build_window_7ch로 만든 (T,7) 보정용 입력 샘플.
+        out_path (Path): 저장할 TorchScript 경로.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    # 1. FP32 모델을 로드하고 fbgemm 기본 qconfig로 관측 모델을 준비합니다.
+    torch.backends.quantized.engine = "fbgemm"
+    m = _load_fp32_model()
+    example = torch.zeros((1, 7, windows[0].shape[0]), dtype=torch.float32)
+    prepared = prepare_fx(m, get_default_qconfig_mapping("fbgemm"), (example,))
+
+    # 2. 실제 입력 샘플로 보정합니다.
+    with torch.inference_mode():
+        for X in windows:
+            prepared(torch.from_numpy(np.ascontiguousarray(X.T)).unsqueeze(0))
+
+    # 3. int8 모델로 변환한 뒤 TorchScript로 저장합니다.
+    quantized = convert_fx(prepared)
+    torch.jit.save(torch.jit.script(quantized), str(out_path))
+    return out_path
+
+def get_ort_session():
+    """best.onnx가 있고 onnxruntime을 사용할 수 있으면 InferenceSession을 한 번만 생성합니다. 실패 시 None."""
+    global _ORT_SESSION
+    if _ORT_SESSION is not None or ort is None or not BEST_ONNX.exists():
+        return _ORT_SESSION
+    with _ORT_LOCK:
+        if _ORT_SESSION is not None:
+            return _ORT_SESSION
+        try:
+            # 모든 그래프 최적화(BN 폴딩, Conv+ReLU 융합 등)를 켜고 워커당 스레드 수를 제한합니다.
+            opts = ort.SessionOptions()
+            opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if TORCH_NUM_THREADS > 0:
+                opts.intra_op_num_threads = TORCH_NUM_THREADS
+            _ORT_SESSION = ort.InferenceSession(
+                str(BEST_ONNX), sess_options=opts, providers=["CPUExecutionProvider"])
+            logger.info(f"[확인] best.onnx 로드 완료: {BEST_ONNX}")
+        except Exception as e:
+            logger.warning(f"[경고] best.onnx 로드 실패, torch 모델을 사용합니다: {e}")
+            _ORT_SESSION = None
+        return _ORT_SESSION
+
+
+def export_onnx_model(out_path: Path = BEST_ONNX, T: int = 300) -> Path:
+    """
+    best.pt를 ONNX 모델로 내보냅니다. (오프라인 전용)
+
+    Args:
+        out_path (Path): 저장할 ONNX 경로.
+        T (int): 입력 윈도우 길이.
+    """
+    m = _load_fp32_model()
+    torch.onnx.export(
+        m, torch.zeros((1, 7, T), dtype=torch.float32), str(out_path),
+        input_names=["x"], output_names=["logit"], opset_version=17,
+        # 마이크로배치 추론을 위해 배치 차원은 가변으로 둡니다.
+        dynamic_axes={"x": {0: "batch"}, "logit": {0: "batch"}})
+    return out_path
+
 # ====== Calibration (temperature / platt) ======
 _CALIB = None
 _CALIB_MTIME = None
+# calibration.json 변경 감시 주기(초). 요청 경로에서는 stat/JSON 파싱 없이 _CALIB만 읽습니다.
+CALIB_POLL_SECONDS = float(os.getenv("CALIB_POLL_SECONDS", "5"))
+_CALIB_WATCHER_STARTED = False
+_CALIB_LOCK = Lock()
 
 def _load_calibration():
     """
-    calibration.json mtime을 보고 자동 리로드.
+    calibration.json mtime을 보고 자동 리로드. (감시 스레드에서 호출)
     지원: {"type":"temperature","T":...}  |  {"type":"platt","a":...,"b":...}
     """
     global _CALIB, _CALIB_MTIME
     try:
         st = CALIB_JSON.stat()
-        if _CALIB is not None and _CALIB_MTIME == st.st_mtime:
+        if _CALIB_MTIME == st.st_mtime:
             return _CALIB  # 캐시 유효
         with open(CALIB_JSON, "r", encoding="utf-8") as f:
             obj = json.load(f)
         t = str(obj.get("type", "")).lower()
+        # 불변 튜플을 한 번에 대입하므로 요청 스레드는 락 없이 읽을 수 있습니다.
         if t == "temperature":
             _CALIB = ("temperature", float(obj["T"]))
         elif t == "platt":
@@ -120,6 +257,30 @@ def _load_calibration():
         _CALIB_MTIME = None
     return _CALIB
 
+
+def _watch_calibration():
+    while True:
+        time.sleep(CALIB_POLL_SECONDS)
+        _load_calibration()
+
+
+def get_calibration():
+    """
+    현재 보정 파라미터를 반환합니다. 첫 호출 시 한 번 동기 로드한 뒤 감시 스레드를 시작합니다.
+    """
+    global _CALIB_WATCHER_STARTED
+    if not _CALIB_WATCHER_STARTED:
+        with _CALIB_LOCK:
+            if not _CALIB_WATCHER_STARTED:
+                _load_calibration()
+                Thread(target=_watch_calibration,
+                       name="calibration-watcher", daemon=True).start()
+                _CALIB_WATCHER_STARTED = True
+    return _CALIB
+
+# 포인터 이벤트가 하나도 없는 요청의 판정 ("bot"이면 추론 없이 봇으로 판정, 그 외 값이면 판정하지 않음)
+EMPTY_EVENTS_VERDICT = os.getenv("BEHAVIOR_EMPTY_EVENTS_VERDICT", "bot").lower()
+
 # ====== Temperature scaling =====
 LOGIT_TEMPERATURE = float(os.getenv("LOGIT_TEMPERATURE", "2.0"))
 
@@ -159,31 +320,66 @@ def _roi_rects(meta: Any) -> Tuple[Optional[Tuple[float, float, float, float]],
 # ---------- 이벤트 평탄화 ----------
 
 
-def _flatten_events(meta: Any, events: List[Any]):
-    out = []
+# 평탄화 대상 이벤트 스키마 (type 값 → 사용하는 필드)
+#   moves / moves_free: payload.base_t, payload.dts, payload.xrs, payload.yrs
+#   pointerdown / pointerup / click: t, x_raw, y_raw
+_MOVE_EVENT_TYPES = frozenset(("moves", "moves_free"))
+_POINT_EVENT_TYPES = frozenset(("pointerdown", "pointerup", "click"))
+
+
+def _as_dict(obj: Any) -> Dict[str, Any]:
+    """dict는 그대로, 속성 객체는 __dict__로 바꿔 이후 접근을 dict 조회 하나로 통일합니다."""
+    if isinstance(obj, dict):
+        return obj
+    return vars(obj) if hasattr(obj, "__dict__") else {}
+
+
+def _flatten_events(meta: Any, events: List[Any]) -> np.ndarray:
+    """
+    이벤트 목록을 시간순으로 정렬된 (N,3) float64 배열 [t, x_raw, y_raw]로 평탄화합니다.
+    moves/moves_free 페이로드는 dts 누적합으로 시간축을 한 번에 계산합니다.
+    """
+    chunks: List[np.ndarray] = []
+    points: List[Tuple[float, float, float]] = []
+    # 이벤트 형식(dict/객체) 판별은 루프 밖에서 한 번만 하고, 이후에는 dict 조회만 사용합니다.
+    if not all(type(ev) is dict for ev in events):
+        events = [_as_dict(ev) for ev in events]
     for ev in events:
-        et = getattr(ev, "type", None) or (ev.get("type") if isinstance(ev, dict) else None)
-        if et in ("moves", "moves_free"):
-            p = getattr(ev, "payload", None) or (ev.get("payload") if isinstance(ev, dict) else None)
+        et = ev.get("type")
+        if et in _MOVE_EVENT_TYPES:
+            p = ev.get("payload")
             if not p: continue
-            base = int(getattr(p, "base_t", 0) or (p.get("base_t") if isinstance(p, dict) else 0) or 0)
-            dts  = list(getattr(p, "dts", []) or (p.get("dts") if isinstance(p, dict) else []) or [])
-            xs   = list(getattr(p, "xrs", []) or (p.get("xrs") if isinstance(p, dict) else []) or [])
-            ys   = list(getattr(p, "yrs", []) or (p.get("yrs") if isinstance(p, dict) else []) or [])
-            t = base
-            n = min(len(dts), len(xs), len(ys))
-            for i in range(n):
-                out.append((t, float(xs[i]), float(ys[i])))
-                dt = int(dts[i]) if int(dts[i]) > 0 else 1
-                t += dt
-        elif et in ("pointerdown", "pointerup", "click"):
-            t  = (getattr(ev, "t", None) if not isinstance(ev, dict) else ev.get("t"))
-            xr = (getattr(ev, "x_raw", None) if not isinstance(ev, dict) else ev.get("x_raw"))
-            yr = (getattr(ev, "y_raw", None) if not isinstance(ev, dict) else ev.get("y_raw"))
+            if type(p) is not dict:
+                p = _as_dict(p)
+            base = int(p.get("base_t", 0) or 0)
+            dts = np.asarray(p.get("dts") or [], dtype=np.float64)
+            xs = np.asarray(p.get("xrs") or [], dtype=np.float64)
+            ys = np.asarray(p.get("yrs") or [], dtype=np.float64)
+            n = min(dts.size, xs.size, ys.size)
+            if n == 0: continue
+            # dt<=0 은 1ms로 보정하고, 각 점의 시각은 base + (이전 dt들의 합)
+            d = dts[:n].astype(np.int64)
+            d = np.where(d > 0, d, 1)
+            t = base + np.cumsum(d) - d
+            if points:
+                # 입력 순서를 유지하기 위해 앞서 모인 단일 포인트를 먼저 추가합니다.
+                chunks.append(np.asarray(points, dtype=np.float64))
+                points = []
+            chunks.append(np.column_stack((t.astype(np.float64), xs[:n], ys[:n])))
+        elif et in _POINT_EVENT_TYPES:
+            t = ev.get("t")
+            xr = ev.get("x_raw")
+            yr = ev.get("y_raw")
             if t is None or xr is None or yr is None: continue
-            out.append((int(t), float(xr), float(yr)))
-    out.sort(key=lambda x: x[0])
-    logger.debug(f"_flatten_events 결과: {len(out)}개의 포인트, 첫 5개: {out[:5]}")
+            points.append((float(int(t)), float(xr), float(yr)))
+    if points:
+        chunks.append(np.asarray(points, dtype=np.float64))
+    if not chunks:
+        return np.empty((0, 3), dtype=np.float64)
+    out = np.concatenate(chunks, axis=0) if len(chunks) > 1 else chunks[0]
+    # 시간 기준 안정 정렬 (같은 시각이면 입력 순서 유지)
+    out = out[np.argsort(out[:, 0], kind="stable")]
+    logger.debug(f"_flatten_events 결과: {len(out)}개의 포인트, 첫 5개: {out[:5].tolist()}")
     return out
 
 # ---------- 시간 단위 보정 (sec/ms/us → ms) ----------
@@ -216,15 +412,6 @@ def _time_scale_to_ms(t: np.ndarray) -> Tuple[np.ndarray, str]:
         return idx * 16.0, "time_reindexed_16ms"
     return t, "time_ms_fallback"
 
-def _norm_xy(x_raw: float, y_raw: float, rect: Tuple[float, float, float, float]):
-    L, T, W, H = rect
-    xr = (x_raw - L) / max(1.0, W)
-    yr = (y_raw - T) / max(1.0, H)
-    oob = 1 if (xr < 0 or xr > 1 or yr < 0 or yr > 1) else 0
-    x = min(1.0, max(0.0, xr))
-    y = min(1.0, max(0.0, yr))
-    return x, y, oob
-
 # ---------- 특징 구성 (dt 기반, 모델 입력 oob=canvas 기준) ----------
 
 
@@ -241,69 +428,60 @@ def build_window_7ch(meta: Any, events: List[Any], T: int = 300):
         return None, 0, False, (rect_oob is not None), 0.0, 0.0
 
     pts = _flatten_events(meta, events)
-    if not pts:
+    if pts.shape[0] == 0:
         logger.warning(
             f"build_window_7ch: 평탄화된 이벤트(pts)가 없으므로 전처리 건너뜀. events: {events}")
         return None, 0, True, (rect_oob is not None), 0.0, 0.0
 
-    # 1) 정규화 + OOB (canvas 기준)
-    xs, ys, oobs_canvas, oobs_wrap, ts = [], [], [], [], []
-    for t, xr, yr in pts:
-        x1, y1, oob_canvas = _norm_xy(xr, yr, rect_track)  # ← 항상 canvas 기준
-        xs.append(x1)
-        ys.append(y1)
-        oobs_canvas.append(oob_canvas)
-        ts.append(float(t))
-
-        if rect_oob is not None:
-            _, _, oob_wrap = _norm_xy(xr, yr, rect_oob)    # 통계용 wrapper
-        else:
-            oob_wrap = 0  # wrapper가 없으면 0으로
-        oobs_wrap.append(oob_wrap)
-
-    xs = np.asarray(xs, dtype=np.float32)
-    ys = np.asarray(ys, dtype=np.float32)
-    oobs_canvas = np.asarray(oobs_canvas, dtype=np.float32)
-    oobs_wrap = np.asarray(oobs_wrap, dtype=np.float32)
-    ts = np.asarray(ts, dtype=np.float64)
+    # 1) 정규화 + OOB (canvas 기준) — 모든 포인트를 한 번에 계산
+    n = pts.shape[0]
+    ts = pts[:, 0]
+    xr_raw = pts[:, 1]
+    yr_raw = pts[:, 2]
+
+    L, T_, W, H = rect_track  # ← 항상 canvas 기준
+    xr = (xr_raw - L) / max(1.0, W)
+    yr = (yr_raw - T_) / max(1.0, H)
+    oob_canvas_mask = (xr < 0) | (xr > 1) | (yr < 0) | (yr > 1)
+    xs = np.clip(xr, 0.0, 1.0).astype(np.float32)
+    ys = np.clip(yr, 0.0, 1.0).astype(np.float32)
+
+    if rect_oob is not None:
+        # 통계용 wrapper 기준 OOB
+        Lw, Tw, Ww, Hw = rect_oob
+        xw = (xr_raw - Lw) / max(1.0, Ww)
+        yw = (yr_raw - Tw) / max(1.0, Hw)
+        oob_wrap_mask = (xw < 0) | (xw > 1) | (yw < 0) | (yw > 1)
+    else:
+        oob_wrap_mask = None  # wrapper가 없으면 0으로
+
     ts, _ = _time_scale_to_ms(ts) # 2) 시간 보정(ms)
 
-    # 3) dt (sec)
-    dt_ms = np.diff(ts, prepend=ts[0])
-    dt_ms = np.clip(dt_ms, 1e-3, None)
-    dt_s = dt_ms / 1000.0
-
-    # 4) vx, vy, speed, accel
-    if len(xs) < 2:
-        vx = np.zeros_like(xs)
-        vy = np.zeros_like(ys)
-        speed = np.zeros_like(xs)
-        accel = np.zeros_like(xs)
-    else:
-        dx = np.diff(xs, prepend=xs[0])
-        dy = np.diff(ys, prepend=ys[0])
-        vx = dx / dt_s
-        vy = dy / dt_s
+    # 3) 길이 정규화 구간: 마지막 T개 포인트만 모델 입력에 사용
+    start = max(0, n - T)
+    raw_len = n
+    X = np.zeros((T, 7), dtype=np.float32)
+    m = n - start
+    X[:m, 0] = xs[start:]
+    X[:m, 1] = ys[start:]
+    X[:m, 6] = oob_canvas_mask[start:]
+
+    # 4) dt (sec), vx, vy, speed, accel
+    if n >= 2:
+        dt_s = np.clip(np.diff(ts, prepend=ts[0]), 1e-3, None) / 1000.0
+        vx = np.diff(xs, prepend=xs[0]) / dt_s
+        vy = np.diff(ys, prepend=ys[0]) / dt_s
         speed = np.sqrt(vx*vx + vy*vy)
         accel = np.diff(speed, prepend=speed[0]) / dt_s
-
-    # 5) 모델 입력: [x, y, vx, vy, speed, accel, oob_canvas]
-    X = np.stack([xs, ys, vx, vy, speed, accel, oobs_canvas],
-                 axis=1).astype(np.float32)
-    raw_len = X.shape[0]
-
-    # 6) 길이 정규화
-    if raw_len < T:
-        X = np.concatenate(
-            [X, np.zeros((T - raw_len, X.shape[1]), np.float32)], axis=0)
-    elif raw_len > T:
-        X = X[-T:, :]
-
-    # 7) 통계
-    oob_canvas_rate = float(np.mean(oobs_canvas > 0.5)
-                            ) if oobs_canvas.size else 0.0
-    oob_wrapper_rate = float(np.mean(oobs_wrap > 0.5)
-                             ) if oobs_wrap.size else 0.0
+        X[:m, 2] = vx[start:]
+        X[:m, 3] = vy[start:]
+        X[:m, 4] = speed[start:]
+        X[:m, 5] = accel[start:]
+
+    # 5) 통계
+    oob_canvas_rate = float(np.count_nonzero(oob_canvas_mask) / n)
+    oob_wrapper_rate = float(np.count_nonzero(oob_wrap_mask) / n
+                             ) if oob_wrap_mask is not None else 0.0
     return X, raw_len, True, (rect_oob is not None), oob_canvas_rate, oob_wrapper_rate
 
 
@@ -329,27 +507,136 @@ def seq_stats(X, raw_len: int, has_track: bool, has_wrap: bool, oob_canvas_rate:
 # ====== Inference Entrypoint ======
 
 
-def run_behavior_verification(meta: Dict[str, Any], events: List[Dict[str, Any]]):
-    model = get_model()
-    if model is None:
-        logger.error("행동 검증 모델이 로드되지 않았습니다.")
-        return {"ok": False, "error": "model not loaded"}
+def _input_array(X: np.ndarray) -> np.ndarray:
+    """(T,7) 특징을 스레드별로 재사용하는 (1,7,T) float32 버퍼에 제자리 복사합니다."""
+    buffers = getattr(_INPUT_BUFFERS, "by_len", None)
+    if buffers is None:
+        buffers = _INPUT_BUFFERS.by_len = {}
+    T = X.shape[0]
+    buf = buffers.get(T)
+    if buf is None:
+        buf = buffers[T] = np.empty((1, 7, T), dtype=np.float32)
+    buf[0] = X.T
+    return buf
+
+
+def _predict_logit(X: np.ndarray) -> float:
+    """ONNX Runtime 세션이 있으면 우선 사용하고, 없으면 torch 모델로 로짓을 계산합니다."""
+    xa = _input_array(X)  # (1,7,T)
+    sess = get_ort_session()
+    if sess is not None:
+        return float(sess.run(None, {"x": xa})[0][0])
+
+    with torch.inference_mode():
+        # torch.from_numpy는 버퍼 메모리를 그대로 공유하므로 복사가 발생하지 않습니다.
+        return get_model()(torch.from_numpy(xa)).item()
+
 
-    # (전처리)
+def _predict_logits(Xb: np.ndarray) -> np.ndarray:
+    """(K,T,7) 특징 배치를 한 번의 forward로 추론하여 (K,) 로짓을 반환합니다."""
+    xa = np.ascontiguousarray(Xb.transpose(0, 2, 1), dtype=np.float32)  # (K,7,T)
+    sess = get_ort_session()
+    if sess is not None:
+        return sess.run(None, {"x": xa})[0].reshape(-1)
+
+    with torch.inference_mode():
+        return get_model()(torch.from_numpy(xa)).numpy().reshape(-1)
+
+
+class _MicroBatcher:
+    """
+    여러 스레드에서 동시에 들어온 추론 요청을 짧은 시간 동안 모아 (K,7,T) 한 번의 forward로 처리합니다.
+    요청 스레드는 결과가 나올 때까지 Future에서 대기합니다.
+    """
+
+    def __init__(self, maxBatch: int, waitSeconds: float):
+        self.maxBatch = maxBatch
+        self.waitSeconds = waitSeconds
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future]]" = queue.Queue()
+        Thread(target=self._run, name="behavior-microbatcher",
+               daemon=True).start()
+
+    def submit(self, X: np.ndarray) -> float:
+        future: Future = Future()
+        self._queue.put((X, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            # 1. 첫 요청을 기다린 뒤, 대기 시간 안에 들어온 요청을 최대 maxBatch개까지 모읍니다.
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.waitSeconds
+            while len(items) < self.maxBatch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # 2. 같은 길이의 윈도우를 하나의 배치로 추론하고 결과를 각 Future에 돌려줍니다.
+            try:
+                logits = _predict_logits(np.stack([X for X, _ in items]))
+                for (_, future), logit in zip(items, logits):
+                    future.set_result(float(logit))
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+def _get_batcher() -> Optional[_MicroBatcher]:
+    global _BATCHER
+    if BEHAVIOR_BATCH_MAX <= 1:
+        return None
+    if _BATCHER is None:
+        with _BATCHER_LOCK:
+            if _BATCHER is None:
+                _BATCHER = _MicroBatcher(
+                    BEHAVIOR_BATCH_MAX, BEHAVIOR_BATCH_WAIT_MS / 1000.0)
+    return _BATCHER
+
+
+def warmup() -> bool:
+    """
+    추론에 필요한 모델/임계값/보정값을 미리 로드합니다. (워커 프로세스 시작 시 호출)
+    모델을 사용할 수 있으면 True를 반환합니다.
+    """
+    ready = get_ort_session() is not None or get_model() is not None
+    get_threshold()
+    get_calibration()
+    return ready
+
+
+def run_behavior_verification(meta: Dict[str, Any], events: List[Dict[str, Any]]):
+    # (전처리) 모델 없이 판정할 수 있는 입력은 모델 로딩/추론 전에 걸러냅니다.
     X, raw_len, has_track, has_wrap, oob_c, oob_w = build_window_7ch(
         meta, events, T=300)
     if X is None:
+        if has_track and raw_len == 0 and EMPTY_EVENTS_VERDICT == "bot":
+            # 캔버스 ROI는 있는데 포인터 이벤트가 하나도 없으면 추론 없이 봇으로 판정합니다.
+            return {
+                "ok": True,
+                "model": "rule",
+                "bot_prob": 1.0,
+                "threshold": float(get_threshold()),
+                "verdict": "bot",
+                "stats": seq_stats(None, 0, has_track, has_wrap, 0.0, 0.0),
+            }
         logger.warning("특징 추출 결과가 None입니다. 추론을 건너뜁니다.")
         return {"ok": False, "error": "empty or invalid events/roi"}
 
-    # (추론)
-    xt = torch.from_numpy(np.transpose(X, (1, 0))).unsqueeze(
-        0).float()  # (1,7,300)
-    with torch.no_grad():
-        logit = model(xt).item()
+    if get_ort_session() is None and get_model() is None:
+        logger.error("행동 검증 모델이 로드되지 않았습니다.")
+        return {"ok": False, "error": "model not loaded"}
+
+    # (추론) 마이크로배치가 켜져 있으면 동시 요청과 묶어서 추론합니다.
+    batcher = _get_batcher()
+    logit = batcher.submit(X) if batcher is not None else _predict_logit(X)
 
     # (후처리) Calibration 우선순위: temperature → platt
-    calib = _load_calibration()
+    calib = get_calibration()
     if calib and calib[0] == "temperature":
         T = max(1.0, float(calib[1]))   # ← 안전: 최소 1.0로 고정
         z = logit / T
@@ -361,8 +648,8 @@ def run_behavior_verification(meta: Dict[str, Any], events: List[Dict[str, Any]]
         z = logit / T
 
     z_raw = float(z)
-    z_clip = float(np.clip(z_raw, -3.0, 3.0))  # 시그모이드 전 클립
-    prob = float(1.0 / (1.0 + np.exp(-z_clip)))
+    z_clip = min(3.0, max(-3.0, z_raw))  # 시그모이드 전 클립 (스칼라이므로 NumPy 대신 파이썬 연산 사용)
+    prob = 1.0 / (1.0 + math.exp(-z_clip))
 
     thr = float(get_threshold())
     verdict = "bot" if prob >= thr else "human"
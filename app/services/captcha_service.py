@@ -1,28 +1,37 @@
 # app/services/captcha_service.py
 
 import logging
-import os
-import json
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List, Tuple
-import uuid
+from typing import Optional, Dict, Any, Tuple
+import secrets
 import random
 
 from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.models.api_key import ApiKey
-from app.models.user import User
+from app.models.api_key import ApiKey, Difficulty
 from app.repositories.captcha_repo import CaptchaRepository
-from app.repositories.usage_stats_repo import UsageStatsRepository
+from app.repositories.user_repo import UserRepository
 from app.schemas.captcha import CaptchaProblemResponse, CaptchaVerificationRequest, CaptchaVerificationResponse
 from app.models.captcha_log import CaptchaResult
 from app.services import behavior_service
+from app.services.usage_stats_buffer import usageStatsBuffer
 
 # 로거 설정
 logger = logging.getLogger(__name__)
 
+# 요청마다 읽는 설정 값은 프로세스 시작 시 고정되므로 모듈 상수로 한 번만 읽어 둡니다.
+_ENABLE_KS3 = settings.ENABLE_KS3
+_TZ = settings.TIMEZONE
+_CAPTCHA_TIMEOUT = timedelta(minutes=settings.CAPTCHA_TIMEOUT_MINUTES)
+
+# 난이도별 활성 캡챠 문제 캐시 (문제 발급 시마다 문제 내용을 조회하지 않도록 함)
+# 각 항목은 발급에 필요한 값(ID, 프롬프트, 전체 이미지 URL, 정답, 선택지, 만료 시각)을 미리 계산해 둔 딕셔너리입니다.
+activeProblemsCache = TTLCache(ttlSeconds=60, maxSize=16)
+
 
 class CaptchaService:
     def __init__(self, db: Session):
@@ -34,6 +43,7 @@ class CaptchaService:
         """
         self.db = db
         self.captchaRepo = CaptchaRepository(db)
+        self.userRepo = UserRepository(db)
 
     def verifyCaptchaAnswerAsync(self, clientToken: str, request: CaptchaVerificationRequest, ipAddress: Optional[str], userAgent: Optional[str]) -> str:
         """
@@ -66,11 +76,65 @@ class CaptchaService:
         )
 
         # 행동 데이터 업로드를 비동기 작업으로 처리
-        if settings.ENABLE_KS3:
-            uploadBehaviorDataTask.delay(clientToken, request.dict())
+        # (None 필드는 제외하고 JSON 호환 값으로 덤프하여, 워커는 모델 복원 없이 그대로 기록합니다.)
+        if _ENABLE_KS3:
+            uploadBehaviorDataTask.delay(
+                clientToken, request.model_dump(mode="json", exclude_none=True))
 
         return task.id
 
+    def _loadActiveProblems(self, difficulty: Optional[Difficulty]) -> Tuple[Dict[str, Any], ...]:
+        """
+        활성 캡챠 문제를 조회하여, 발급 시 그대로 사용할 수 있는 형태로 변환합니다.
+        전체 이미지 URL은 여기에서 한 번만 만들어 둡니다.
+        """
+        # 1. S3_BASE_URL 환경 변수를 확인합니다.
+        s3BaseUrl = settings.KS3_BASE_URL
+        if not s3BaseUrl:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="KS3_BASE_URL 환경 변수가 설정되지 않았습니다."  # Changed from S3_BASE_URL
+            )
+
+        # 2. 활성 문제를 조회하여 발급에 필요한 값만 담은 딕셔너리로 변환합니다.
+        problems = []
+        for problem in self.captchaRepo.getActiveProblems(difficulty):
+            problems.append({
+                "id": problem.id,
+                "prompt": problem.prompt,
+                # S3 이미지 키와 S3_BASE_URL을 조합하여 클라이언트가 직접 접근할 수 있는 전체 URL을 생성합니다.
+                "imageUrl": f"{s3BaseUrl}/{problem.imageUrl}",
+                "answer": problem.answer,
+                "options": (problem.answer, problem.wrongAnswer1, problem.wrongAnswer2, problem.wrongAnswer3),
+                "expiresAt": problem.expiresAt,
+            })
+        return tuple(problems)
+
+    def _pickActiveProblem(self, difficulty: Optional[Difficulty]) -> Optional[Dict[str, Any]]:
+        """
+        캐시된 활성 문제 목록에서 무작위로 하나를 고릅니다. 문제 내용은 캐시에서 가져오므로 데이터베이스를 조회하지 않습니다.
+        고른 문제가 그사이 만료된 경우, 목록을 새로 조회하여 한 번 더 시도합니다.
+        """
+        for _ in range(2):
+            # 1. 난이도별 활성 문제 목록을 캐시에서 가져오고, 없으면 조회하여 캐시합니다.
+            problems = activeProblemsCache.get(difficulty)
+            if problems is None:
+                problems = self._loadActiveProblems(difficulty)
+                # 문제가 새로 등록되면 바로 사용할 수 있도록 빈 목록은 캐시하지 않습니다.
+                if problems:
+                    activeProblemsCache.set(difficulty, problems)
+            if not problems:
+                return None
+
+            # 2. 문제 하나를 무작위로 고르고, 만료되지 않았으면 반환합니다.
+            problem = random.choice(problems)
+            if problem["expiresAt"] > datetime.now(_TZ):
+                return problem
+
+            # 3. 캐시된 목록이 오래된 것이므로 비우고 다시 시도합니다.
+            activeProblemsCache.delete(difficulty)
+        return None
+
     def generateCaptchaProblem(self, apiKey: ApiKey, ipAddress: Optional[str], userAgent: Optional[str]) -> CaptchaProblemResponse:
         """
         새로운 캡챠 문제를 생성하고, 사용자 토큰을 차감하며, 캡챠 세션 정보를 반환하는 비즈니스 로직입니다.
@@ -85,80 +149,55 @@ class CaptchaService:
             CaptchaProblemResponse: 생성된 캡챠 문제의 상세 정보 (클라이언트 토큰, 이미지 URL, 프롬프트, 선택지).
         """
         try:
-            # 1. API 키에 연결된 사용자(User) 객체를 조회하고, 비관적 잠금(with_for_update)을 적용하여 동시성 문제를 방지합니다.
-            user: User = self.db.query(User).filter(
-                User.id == apiKey.userId).with_for_update().first()
-
-            # 2. 사용자 또는 사용자 토큰 잔액이 부족한 경우 402 Payment Required 오류를 발생시킵니다.
-            if not user or user.token <= 0:
-                raise HTTPException(
-                    status_code=status.HTTP_402_PAYMENT_REQUIRED,
-                    detail="API 토큰이 부족합니다."
-                )
-
-            # 3. 사용자의 토큰 잔액을 1 차감하고, 변경사항을 세션에 추가합니다.
-            user.token -= 1
-            self.db.add(user)
-
-            # 4. CaptchaRepository를 통해 활성화된 캡챠 문제 중 하나를 무작위로 선택합니다.
-            selectedProblem = self.captchaRepo.getRandomActiveProblem(
-                apiKey.difficulty)
-            # 5. 유효한 캡챠 문제가 없는 경우 503 Service Unavailable 오류를 발생시킵니다.
+            # 1. 캐시된 활성 문제 목록에서 캡챠 문제 하나를 무작위로 선택합니다. (문제 내용 조회 없음)
+            selectedProblem = self._pickActiveProblem(apiKey.difficulty)
+            # 2. 유효한 캡챠 문제가 없는 경우 503 Service Unavailable 오류를 발생시킵니다.
             if not selectedProblem:
                 raise HTTPException(
                     status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                     detail="활성화된 캡차 문제가 없습니다."
                 )
 
-            # 6. 고유한 클라이언트 토큰을 생성합니다.
-            clientToken = str(uuid.uuid4())
-            # 7. CaptchaRepository를 통해 새로운 캡챠 세션을 생성하고 세션에 추가합니다. (아직 커밋되지 않음)
-            session = self.captchaRepo.createCaptchaSession(
+            # 3. 사용자 토큰을 잔액 조건부 단일 UPDATE 문으로 1 차감합니다.
+            #    (SELECT ... FOR UPDATE로 사용자 행을 먼저 잠그지 않으므로 조회 왕복과 잠금 대기가 없습니다.)
+            # 4. 차감된 행이 없으면 사용자가 없거나 토큰 잔액이 부족하므로 402 Payment Required 오류를 발생시킵니다.
+            if self.userRepo.decrementToken(apiKey.userId) == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_402_PAYMENT_REQUIRED,
+                    detail="API 토큰이 부족합니다."
+                )
+
+            # 5. 고유한 클라이언트 토큰을 생성합니다. (128비트 난수, URL-safe 22자)
+            clientToken = secrets.token_urlsafe(16)
+            # 6. CaptchaRepository를 통해 새로운 캡챠 세션을 생성하고 세션에 추가합니다. (아직 커밋되지 않음)
+            self.captchaRepo.createCaptchaSession(
                 keyId=apiKey.id,
-                captchaProblemId=selectedProblem.id,
+                captchaProblemId=selectedProblem["id"],
                 clientToken=clientToken,
                 ipAddress=ipAddress,
-                userAgent=userAgent
+                userAgent=userAgent,
+                correctAnswer=selectedProblem["answer"]
             )
 
-            # 8. S3_BASE_URL 환경 변수를 가져와 전체 이미지 URL을 구성합니다.
-            s3BaseUrl = settings.KS3_BASE_URL
-            if not s3BaseUrl:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="KS3_BASE_URL 환경 변수가 설정되지 않았습니다."  # Changed from S3_BASE_URL
-                )
-
-            # S3 이미지 키와 S3_BASE_URL을 조합하여 클라이언트가 직접 접근할 수 있는 전체 URL을 생성합니다.
-            fullImageUrl = f"{s3BaseUrl}/{selectedProblem.imageUrl}"
-
-            # 9. usage_stats_repo를 사용하여 요청 카운트를 업데이트합니다.
-            usageStatsRepo = UsageStatsRepository(self.db)
-            usageStatsRepo.incrementTotalRequests(apiKey.id)
-
-            # 10. 사용자 토큰 차감 및 캡챠 세션 생성 등 모든 변경사항을 데이터베이스에 한 번에 커밋합니다.
+            # 7. 사용자 토큰 차감 및 캡챠 세션 생성 등 모든 변경사항을 데이터베이스에 한 번에 커밋합니다.
             self.db.commit()
 
-            # 11. 커밋된 세션 객체를 새로고침하여 최신 상태를 반영합니다.
-            self.db.refresh(session)
+            # 8. 요청 카운트는 요청마다 통계 행을 갱신하지 않도록, 커밋이 성공한 뒤 버퍼에 모아 주기적으로 반영합니다.
+            usageStatsBuffer.addTotalRequest(apiKey.id)
 
-            # 12. 클라이언트에게 반환할 CaptchaProblemResponse 객체를 생성하여 반환합니다.
-            option_list = [
-                selectedProblem.answer,
-                selectedProblem.wrongAnswer1,
-                selectedProblem.wrongAnswer2,
-                selectedProblem.wrongAnswer3
-            ]
+            # 9. 클라이언트에게 반환할 CaptchaProblemResponse 객체를 생성하여 반환합니다.
+            #    (4개짜리 선택지는 random.sample보다 복사 후 random.shuffle이 약 2배 빠릅니다.)
+            option_list = list(selectedProblem["options"])
             random.shuffle(option_list)
 
             return CaptchaProblemResponse(
-                clientToken=session.clientToken,
-                imageUrl=fullImageUrl,  # S3 직접 이미지 URL을 반환
-                prompt=selectedProblem.prompt,
+                clientToken=clientToken,  # 커밋 후 새로고침 없이 생성한 토큰을 그대로 사용
+                imageUrl=selectedProblem["imageUrl"],  # S3 직접 이미지 URL을 반환
+                prompt=selectedProblem["prompt"],
                 options=option_list
             )
         except HTTPException as e:
-            # 13. HTTP 예외가 발생한 경우, 데이터베이스 변경사항을 롤백하고 해당 예외를 다시 발생시킵니다.
+            # 10. HTTP 예외가 발생한 경우, 데이터베이스 변경사항을 롤백하고 해당 예외를 다시 발생시킵니다.
             self.db.rollback()
             raise e
         except Exception as e:
@@ -166,6 +205,19 @@ class CaptchaService:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
+    def _commitCaptchaLog(self) -> None:
+        """
+        추가한 캡챠 로그를 커밋합니다.
+        같은 세션의 로그가 이미 있으면 captcha_log.session_id UNIQUE 제약에 걸리므로 이미 검증된 토큰으로 처리합니다.
+        """
+        try:
+            self.db.commit()
+        except IntegrityError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="이미 검증된 토큰입니다."
+            )
+
     def verifyCaptchaAnswer(
         self,
         clientToken: str,
@@ -187,7 +239,9 @@ class CaptchaService:
             CaptchaVerificationResponse: 캡챠 검증 결과 (성공, 실패, 시간 초과).
         """
         try:
-            # 1. 클라이언트 토큰을 사용하여 캡챠 세션 정보를 데이터베이스에서 조회합니다.
+            # 1. 클라이언트 토큰으로 캡챠 세션을 조회하면서 세션 행을 잠급니다.
+            #    (만료 세션 정리 작업은 SKIP LOCKED로 잠긴 세션을 건너뛰므로, 검증 중인 세션에 TIMEOUT 로그를 중복으로 쓰지 않습니다.
+            #     정리 작업이 먼저 잠갔다면 그 커밋을 기다린 뒤 아래 로그 존재 확인에서 걸러집니다.)
             session = self.captchaRepo.getCaptchaSessionByClientToken(
                 clientToken, for_update=True)
 
@@ -197,18 +251,16 @@ class CaptchaService:
                     detail="유효하지 않은 클라이언트 토큰입니다."
                 )
 
-            if self.captchaRepo.does_log_exist_for_session(session.id):
+            # 2. 재전송되었거나 이미 타임아웃 처리된 토큰은 행동 모델 추론 전에 가벼운 EXISTS 쿼리로 걸러냅니다.
+            #    (captcha_log.session_id UNIQUE 제약은 최종 안전장치로 남겨 둡니다.)
+            if self.captchaRepo.hasCaptchaLog(session.id):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="이미 검증된 토큰입니다."
                 )
 
-            if session.createdAt.tzinfo is None:
-                session.createdAt = settings.TIMEZONE.localize(
-                    session.createdAt)
-
-            latency = datetime.now(settings.TIMEZONE) - session.createdAt
-            if latency > timedelta(minutes=settings.CAPTCHA_TIMEOUT_MINUTES):
+            latency = datetime.now(_TZ) - session.createdAt
+            if latency > _CAPTCHA_TIMEOUT:
                 self.captchaRepo.createCaptchaLog(
                     session=session,
                     result=CaptchaResult.TIMEOUT,
@@ -217,10 +269,10 @@ class CaptchaService:
                     ml_confidence=None,
                     ml_is_bot=None
                 )
-                usageStatsRepo = UsageStatsRepository(self.db)
-                usageStatsRepo.incrementVerificationResult(
+                self._commitCaptchaLog()
+                # 타임아웃 통계는 커밋이 성공한 뒤 버퍼에 모아 일괄 반영합니다.
+                usageStatsBuffer.addVerificationResult(
                     session.keyId, CaptchaResult.TIMEOUT.value, int(latency.total_seconds() * 1000))
-                self.db.commit()
                 return CaptchaVerificationResponse(result="timeout", message="캡챠 세션이 만료되었습니다.")
 
             # 행동 데이터 분석
@@ -239,7 +291,10 @@ class CaptchaService:
                         f"할당된 신뢰도: {confidence}, 판정: {verdict}")
 
             # 7. 세션에 연결된 캡챠 문제의 정답을 가져옵니다.
-            correct_answer = session.captchaProblem.answer
+            #    (세션 생성 시 복사해 둔 정답을 사용하여 문제 테이블을 조회하지 않습니다. 이전에 생성된 세션만 문제를 조회합니다.)
+            correct_answer = session.correctAnswer
+            if correct_answer is None:
+                correct_answer = session.captchaProblem.answer
             # 8. 사용자가 제출한 답변과 정답을 비교하여 성공 여부를 판단합니다.
             is_correct = request.answer == correct_answer
 
@@ -263,13 +318,14 @@ class CaptchaService:
                 ml_is_bot=(verdict == "bot") if verdict else None
             )
 
-            # 11. API 키 사용 통계에 검증 결과를 업데이트합니다.
-            usageStatsRepo = UsageStatsRepository(self.db)
-            usageStatsRepo.incrementVerificationResult(
-                session.keyId, result.value, int(latency.total_seconds() * 1000))
+            # 11. 로그 기록을 데이터베이스에 커밋합니다.
+            #     (중복 검증을 막는 로그는 결과를 반환하기 전에 반드시 커밋되어야 합니다.)
+            self._commitCaptchaLog()
 
-            # 12. 모든 변경사항(로그 기록, 통계 업데이트)을 하나의 트랜잭션으로 데이터베이스에 커밋합니다.
-            self.db.commit()
+            # 12. API 키 사용 통계는 같은 행을 갱신하는 경합과 커밋 비용을 줄이기 위해,
+            #     커밋이 성공한 뒤 버퍼에 모아 여러 검증분을 하나의 문장으로 반영합니다.
+            usageStatsBuffer.addVerificationResult(
+                session.keyId, result.value, int(latency.total_seconds() * 1000))
 
             # 13. 최종 검증 결과를 클라이언트에게 반환합니다.
             return CaptchaVerificationResponse(result=result.value, message=message, confidence=confidence, verdict=verdict)
@@ -4,6 +4,7 @@ from fastapi import HTTPException, status
 from app.repositories.contact_repo import ContactRepo # ContactRepo 클래스 임포트
 from app.schemas.contact import ContactCreate
 from app.models.contact import Contact
+from app.core.transaction import transactional
 
 
 class ContactService:
@@ -17,30 +18,19 @@ class ContactService:
         self.db = db
         self.contactRepo = ContactRepo() # ContactRepo 인스턴스 생성
 
+    @transactional("문의 등록")
     def createContact(self, *, contactIn: ContactCreate) -> Contact:
         """
         새로운 문의를 생성하고, 실패 시 HTTP 예외를 발생시킵니다.
+        커밋은 transactional 데코레이터가 한 번 수행하며, 생성 시각은 Python 측 기본값으로 채워지므로 새로고침하지 않습니다.
         """
-        try:
-            contact = self.contactRepo.createContact(db=self.db, contactIn=contactIn)
+        contact = self.contactRepo.createContact(db=self.db, contactIn=contactIn)
 
-            if not contact:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="문의를 등록하는 중 서버에 오류가 발생했습니다."
-                )
-
-            self.db.commit()
-            self.db.refresh(contact)
-
-            # 필요시 이곳에 이메일 발송과 같은 추가적인 비즈니스 로직을 구현할 수 있습니다.
-            return contact
-        except HTTPException as e:
-            self.db.rollback()
-            raise e
-        except Exception as e:
-            self.db.rollback()
+        if not contact:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"문의 등록 중 오류 발생: {e}"
+                detail="문의를 등록하는 중 서버에 오류가 발생했습니다."
             )
+
+        # 필요시 이곳에 이메일 발송과 같은 추가적인 비즈니스 로직을 구현할 수 있습니다.
+        return contact
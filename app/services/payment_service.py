@@ -4,10 +4,13 @@ from typing import Dict, Any, List, Optional
 import base64
 import re
 from datetime import datetime, timedelta
-import requests
-import uuid
+import httpx
+import secrets
+from fastapi.concurrency import run_in_threadpool
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.services._http import getTossClient
 from app.models.user import User
 from app.models.payment import Payment
 from app.repositories.payment_repo import PaymentRepository
@@ -16,37 +19,49 @@ from app.schemas.payment import (
     PaymentHistoryResponse, PaymentHistoryItem
 )
 
+# 토스페이먼츠 API 인증 헤더 (시크릿 키는 프로세스 시작 시 고정되므로 한 번만 인코딩)
+_TOSS_AUTH_HEADER = "Basic " + base64.b64encode(
+    (settings.TOSS_SECRET_KEY + ":").encode("utf-8")).decode("utf-8")
+
+# 주문명에서 토큰 수를 추출하는 정규식 (예: "100 토큰 구매")
+_TOKEN_RE = re.compile(r'(\d+)\s*토큰')
+
+# 더 이상 바뀌지 않는 결제 상태 (이 상태의 상세 정보만 캐시해 두고 재사용)
+# DONE은 이후 취소될 수 있으므로 캐시하지 않습니다. 캐시는 프로세스마다 따로 있어,
+# 한 프로세스에서 캐시를 비워도 다른 uvicorn 워커의 캐시에는 반영되지 않기 때문입니다.
+_CACHEABLE_PAYMENT_STATUSES = frozenset({"CANCELED", "ABORTED", "EXPIRED"})
+
+# paymentKey별 토스페이먼츠 결제 상세 정보 캐시 (프론트엔드의 반복 조회가 토스 API를 다시 호출하지 않도록 함)
+# 프로세스 내부 캐시이므로 무효화도 프로세스 단위로만 동작합니다.
+paymentDetailsCache = TTLCache(ttlSeconds=3600, maxSize=4096)
+
+
 class PaymentService:
     def __init__(self, db: Session):
         # 1. 데이터베이스 세션 초기화
         self.db = db
         # 2. PaymentRepository 인스턴스 생성
         self.paymentRepo = PaymentRepository(db)
-        # 3. 토스 시크릿 키 로드
-        self.secretKey = settings.TOSS_SECRET_KEY
-
-    # 1. 암호화된 시크릿 키를 반환하는 헬퍼 함수
-    def _getEncryptedSecretKey(self) -> str:
-        return "Basic " + base64.b64encode((self.secretKey + ":").encode("utf-8")).decode("utf-8")
 
     # 1. 사용자 결제 내역을 조회하는 함수
     def getUserPaymentHistory(self, currentUser: User, skip: int, limit: int) -> PaymentHistoryResponse:
         try:
-            # 1.1. 현재 사용자의 총 결제 건수 조회
-            total = self.paymentRepo.get_payments_count_by_user_id(user_id=currentUser.id)
-            # 1.2. 현재 사용자의 결제 내역 조회 (페이지네이션 적용)
-            payments = self.paymentRepo.get_payments_by_user_id(
+            # 1.1. 현재 사용자의 결제 내역(페이지네이션 적용)과 총 결제 건수를 한 번의 쿼리로 조회
+            # 1.2. (총 건수는 윈도우 함수로 함께 조회되므로 별도의 COUNT 쿼리가 필요 없음)
+            payments, total = self.paymentRepo.get_payments_page_by_user_id(
                 user_id=currentUser.id, skip=skip, limit=limit
             )
 
             # 1.3. 조회된 Payment 모델을 PaymentHistoryItem 스키마로 변환
+            #      (모두 현재 사용자의 결제이므로 사용자 이름은 추가 조회 없이 currentUser에서 가져옴)
+            userName = currentUser.userName
             historyItems = [
                 PaymentHistoryItem(
                     createdAt=p.createdAt,
                     approvedAt=p.approvedAt,
                     orderId=p.orderId,
                     status=p.status,
-                    userName=p.user.userName,
+                    userName=userName,
                     amount=p.amount,
                     method=p.method,
                     orderName=p.orderName,
@@ -69,70 +84,93 @@ class PaymentService:
                 detail=f"결제 내역 조회 중 오류가 발생했습니다: {e}"
             )
 
-    # 1. 결제 상세 정보를 조회하는 함수
-    def getPaymentDetails(self, paymentKey: str, currentUser: User) -> Dict[str, Any]:
-        # 1.1. 우리 DB에서 결제 기록 조회 및 사용자 권한 확인
+    # 1. 현재 사용자의 결제 기록을 조회하는 헬퍼 함수 (없거나 권한이 없으면 404)
+    def _getOwnedPayment(self, paymentKey: str, currentUser: User) -> Payment:
         ourPaymentRecord = self.paymentRepo.db.query(Payment).filter(
             Payment.paymentKey == paymentKey,
             Payment.userId == currentUser.id
         ).first()
-
-        # 1.2. 결제 기록이 없거나 권한이 없는 경우 404 Not Found 오류 발생
         if not ourPaymentRecord:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="해당 결제 정보를 찾을 수 없거나 접근 권한이 없습니다."
             )
+        return ourPaymentRecord
+
+    # 1. 결제 상세 정보를 조회하는 함수
+    async def getPaymentDetails(self, paymentKey: str, currentUser: User) -> Dict[str, Any]:
+        # 1.1. 우리 DB에서 결제 기록 조회 및 사용자 권한 확인 (동기 DB 작업은 스레드풀에서 실행)
+        # 1.2. 결제 기록이 없거나 권한이 없는 경우 404 Not Found 오류 발생
+        await run_in_threadpool(self._getOwnedPayment, paymentKey, currentUser)
+
+        # 1.3. 종료된 결제의 상세 정보가 캐시되어 있으면 토스페이먼츠 API를 호출하지 않고 반환
+        cached = paymentDetailsCache.get(paymentKey)
+        if cached is not None:
+            return cached
 
-        # 1.3. 토스페이먼츠 API 인증을 위한 헤더 설정
+        # 1.4. 토스페이먼츠 API 인증을 위한 헤더 설정
         headers = {
-            "Authorization": self._getEncryptedSecretKey(),
+            "Authorization": _TOSS_AUTH_HEADER,
             "Content-Type": "application/json",
         }
 
         try:
-            # 1.4. 토스페이먼츠 API 호출하여 상세 정보 조회
-            tossApiUrl = f"https://api.tosspayments.com/v1/payments/{paymentKey}"
-            response = requests.get(tossApiUrl, headers=headers)
-            # 1.5. HTTP 응답 상태 코드 확인 (2xx가 아니면 예외 발생)
+            # 1.5. 토스페이먼츠 API 호출하여 상세 정보 조회 (이벤트 루프를 막지 않도록 비동기로 호출)
+            response = await getTossClient().get(
+                f"/payments/{paymentKey}", headers=headers)
+            # 1.6. HTTP 응답 상태 코드 확인 (2xx가 아니면 예외 발생)
             response.raise_for_status()
 
-            # 1.6. 토스페이먼츠로부터 받은 상세 결제 정보 반환
-            return response.json()
+            # 1.7. 더 이상 바뀌지 않는 상태의 결제는 캐시한 뒤, 상세 결제 정보 반환
+            paymentDetails = response.json()
+            if paymentDetails.get("status") in _CACHEABLE_PAYMENT_STATUSES:
+                paymentDetailsCache.set(paymentKey, paymentDetails)
+            return paymentDetails
 
-        except requests.exceptions.HTTPError as e:
-            # 1.7. 토스페이먼츠 API에서 HTTP 에러 발생 시 해당 에러 반환
+        except httpx.HTTPStatusError as e:
+            # 1.8. 토스페이먼츠 API에서 HTTP 에러 발생 시 해당 에러 반환
             raise HTTPException(
                 status_code=e.response.status_code,
                 detail=f"토스페이먼츠 API 조회 중 오류 발생: {e.response.json().get('message', str(e))}"
             )
         except Exception as e:
-            # 1.8. 기타 예외 처리 시 500 Internal Server Error 반환
+            # 1.9. 기타 예외 처리 시 500 Internal Server Error 반환
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"결제 정보 조회 중 서버 오류 발생: {str(e)}"
             )
 
-    # 1. 결제를 취소하는 함수
-    def cancelPayment(self, paymentKey: str, cancelRequest: PaymentCancelRequest, currentUser: User) -> Dict[str, Any]:
-        # 1.1. 우리 DB에서 결제 기록 조회 및 사용자 권한 확인
-        ourPaymentRecord = self.paymentRepo.db.query(Payment).filter(
-            Payment.paymentKey == paymentKey,
-            Payment.userId == currentUser.id
-        ).first()
+    # 1. 토스페이먼츠 취소 응답을 우리 DB 결제 기록에 반영하는 헬퍼 함수
+    def _applyCancellation(self, ourPaymentRecord: Payment, tossResponseData: Dict[str, Any]) -> None:
+        # 1.1. 상태 변경 및 잔액 업데이트
+        ourPaymentRecord.status = tossResponseData.get('status')
+        ourPaymentRecord.amount = tossResponseData.get('balanceAmount')
+
+        # 1.2. 취소 날짜 기록
+        cancelsList = tossResponseData.get('cancels')
+        if cancelsList and isinstance(cancelsList, list) and len(cancelsList) > 0:
+            lastCancelObj = cancelsList[-1]
+            canceledAtStr = lastCancelObj.get('canceledAt')
+            if canceledAtStr:
+                ourPaymentRecord.canceledAt = datetime.fromisoformat(
+                    canceledAtStr.replace('Z', '+00:00'))
+
+        # 1.3. DB 변경사항 커밋 (응답은 토스페이먼츠 데이터를 그대로 반환하므로 새로고침하지 않음)
+        self.paymentRepo.db.add(ourPaymentRecord)
+        self.paymentRepo.db.commit()
 
+    # 1. 결제를 취소하는 함수
+    async def cancelPayment(self, paymentKey: str, cancelRequest: PaymentCancelRequest, currentUser: User) -> Dict[str, Any]:
+        # 1.1. 우리 DB에서 결제 기록 조회 및 사용자 권한 확인 (동기 DB 작업은 스레드풀에서 실행)
         # 1.2. 결제 기록이 없거나 권한이 없는 경우 404 Not Found 오류 발생
-        if not ourPaymentRecord:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="해당 결제 정보를 찾을 수 없거나 접근 권한이 없습니다."
-            )
+        ourPaymentRecord = await run_in_threadpool(
+            self._getOwnedPayment, paymentKey, currentUser)
 
         # 1.3. 토스페이먼츠 API 인증을 위한 헤더 및 멱등키 설정
         headers = {
-            "Authorization": self._getEncryptedSecretKey(),
+            "Authorization": _TOSS_AUTH_HEADER,
             "Content-Type": "application/json",
-            "Idempotency-Key": str(uuid.uuid4())
+            "Idempotency-Key": secrets.token_urlsafe(16)
         }
 
         # 1.4. 취소 요청 페이로드 구성
@@ -142,57 +180,82 @@ class PaymentService:
         if cancelRequest.cancelAmount is not None:
             payload["cancelAmount"] = cancelRequest.cancelAmount
         if cancelRequest.refundReceiveAccount is not None:
-            payload["refundReceiveAccount"] = cancelRequest.refundReceiveAccount.dict()
+            payload["refundReceiveAccount"] = cancelRequest.refundReceiveAccount.model_dump()
 
         try:
             # 1.5. 토스페이먼츠 API 호출하여 결제 취소 요청
-            tossApiUrl = f"https://api.tosspayments.com/v1/payments/{paymentKey}/cancel"
-            response = requests.post(tossApiUrl, headers=headers, json=payload)
+            response = await getTossClient().post(
+                f"/payments/{paymentKey}/cancel", headers=headers, json=payload)
             # 1.6. HTTP 응답 상태 코드 확인 (2xx가 아니면 예외 발생)
             response.raise_for_status()
 
             # 1.7. 토스페이먼츠로부터 받은 응답 데이터 파싱
             tossResponseData = response.json()
 
-            # 1.8. 우리 DB 업데이트 (상태 변경 및 잔액 업데이트)
-            ourPaymentRecord.status = tossResponseData.get('status')
-            ourPaymentRecord.amount = tossResponseData.get('balanceAmount')
-
-            # 1.9. 취소 날짜 기록
-            cancelsList = tossResponseData.get('cancels')
-            if cancelsList and isinstance(cancelsList, list) and len(cancelsList) > 0:
-                lastCancelObj = cancelsList[-1]
-                canceledAtStr = lastCancelObj.get('canceledAt')
-                if canceledAtStr:
-                    ourPaymentRecord.canceledAt = datetime.fromisoformat(
-                        canceledAtStr.replace('Z', '+00:00'))
-
-            # 1.10. DB 변경사항 커밋 및 새로고침
-            self.paymentRepo.db.add(ourPaymentRecord)
-            self.paymentRepo.db.commit()
-            self.paymentRepo.db.refresh(ourPaymentRecord)
+            # 1.8. 우리 DB 업데이트 (상태, 잔액, 취소 날짜 반영 후 커밋)
+            await run_in_threadpool(
+                self._applyCancellation, ourPaymentRecord, tossResponseData)
+            # (취소 가능한 DONE 상태는 캐시하지 않으므로 캐시를 비울 필요가 없음)
 
-            # 1.11. 토스페이먼츠로부터 받은 취소 응답 반환
+            # 1.9. 토스페이먼츠로부터 받은 취소 응답 반환
             return tossResponseData
 
-        except requests.exceptions.HTTPError as e:
-            # 1.12. 토스페이먼츠 API에서 HTTP 에러 발생 시 해당 에러 반환
+        except httpx.HTTPStatusError as e:
+            # 1.10. 토스페이먼츠 API에서 HTTP 에러 발생 시 해당 에러 반환
             raise HTTPException(
                 status_code=e.response.status_code,
                 detail=f"토스페이먼츠 API 취소 중 오류 발생: {e.response.json().get('message', str(e))}"
             )
         except Exception as e:
-            # 1.13. 기타 예외 처리 시 500 Internal Server Error 반환
+            # 1.11. 기타 예외 처리 시 500 Internal Server Error 반환
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"결제 취소 중 서버 오류 발생: {str(e)}"
             )
 
+    # 1. 승인된 결제를 기록하고 사용자 토큰을 충전하는 헬퍼 함수
+    def _recordPayment(self, paymentData: Dict[str, Any], tokenAmount: int, currentUser: User) -> None:
+        try:
+            # 1.1. 결제 정보 생성 (세션에 추가, 커밋 X)
+            #      토스페이먼츠 응답은 이미 검증을 마친 신뢰할 수 있는 데이터이므로 model_construct로 검증을 생략하고,
+            #      문자열인 승인 일시만 직접 datetime으로 변환합니다.
+            approvedAtStr = paymentData.get("approvedAt")
+            paymentToCreate = PaymentCreate.model_construct(
+                userId=currentUser.id,
+                orderId=paymentData.get("orderId"),
+                paymentKey=paymentData.get("paymentKey"),
+                status=paymentData.get("status"),
+                method=paymentData.get("method"),
+                orderName=paymentData.get("orderName"),
+                amount=paymentData.get("totalAmount"),
+                currency=paymentData.get("currency"),
+                approvedAt=datetime.fromisoformat(
+                    approvedAtStr.replace('Z', '+00:00')) if approvedAtStr else None,
+                canceledAt=None,
+            )
+            self.paymentRepo.create_payment(payment_in=paymentToCreate)
+
+            # 1.2. 사용자 토큰 업데이트 (세션에 추가)
+            currentUser.token += tokenAmount
+            self.paymentRepo.db.add(currentUser)
+
+            # 1.3. 모든 변경사항을 한 번에 커밋
+            #      (응답은 토스페이먼츠 데이터를 그대로 반환하므로 커밋된 객체를 새로고침하지 않음)
+            self.paymentRepo.db.commit()
+
+        except Exception as dbError:
+            # 1.4. DB 작업 중 오류 발생 시 롤백 처리
+            self.paymentRepo.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"데이터베이스 처리 중 오류가 발생했습니다: {dbError}"
+            )
+
     # 1. 결제를 승인하고 기록하는 함수
-    def confirmPayment(self, data: PaymentConfirmRequest, currentUser: User) -> Dict[str, Any]:
+    async def confirmPayment(self, data: PaymentConfirmRequest, currentUser: User) -> Dict[str, Any]:
         # 1.1. 토스페이먼츠 API 인증을 위한 헤더 구성
         headers = {
-            "Authorization": self._getEncryptedSecretKey(),
+            "Authorization": _TOSS_AUTH_HEADER,
             "Content-Type": "application/json",
         }
         # 1.2. 결제 승인 요청 페이로드 구성
@@ -203,9 +266,9 @@ class PaymentService:
         }
 
         try:
-            # 1.3. 토스페이먼츠에 결제 승인을 요청
-            response = requests.post(
-                "https://api.tosspayments.com/v1/payments/confirm",
+            # 1.3. 토스페이먼츠에 결제 승인을 요청 (이벤트 루프를 막지 않도록 비동기로 호출)
+            response = await getTossClient().post(
+                "/payments/confirm",
                 headers=headers,
                 json=payload
             )
@@ -217,7 +280,7 @@ class PaymentService:
 
             # 1.6. API 호출 성공 후, 응답 데이터 유효성 검증 (주문명에서 토큰 수 추출)
             orderName = paymentData.get("orderName")
-            match = re.search(r'(\d+)\s*토큰', orderName)
+            match = _TOKEN_RE.search(orderName)
             if not match:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -234,54 +297,23 @@ class PaymentService:
                     detail=f"결제 금액({totalAmount}원)이 정책과 맞지 않습니다."
                 )
 
-            try:
-                # 1.8. 결제 정보 생성 (세션에 추가, 커밋 X)
-                paymentToCreate = PaymentCreate(
-                    userId=currentUser.id,
-                    orderId=paymentData.get("orderId"),
-                    paymentKey=paymentData.get("paymentKey"),
-                    status=paymentData.get("status"),
-                    method=paymentData.get("method"),
-                    orderName=paymentData.get("orderName"),
-                    amount=paymentData.get("totalAmount"),
-                    currency=paymentData.get("currency"),
-                    approvedAt=paymentData.get("approvedAt"),
-                )
-                dbPayment = self.paymentRepo.create_payment(
-                    payment_in=paymentToCreate)
-
-                # 1.9. 사용자 토큰 업데이트 (세션에 추가)
-                currentUser.token += tokenAmount
-                self.paymentRepo.db.add(currentUser)
-
-                # 1.10. 모든 변경사항을 한 번에 커밋
-                self.paymentRepo.db.commit()
-
-                # 1.11. 커밋된 객체들을 리프레시
-                self.paymentRepo.db.refresh(currentUser)
-                self.paymentRepo.db.refresh(dbPayment)
-
-            except Exception as dbError:
-                # 1.12. DB 작업 중 오류 발생 시 롤백 처리
-                self.paymentRepo.db.rollback()
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"데이터베이스 처리 중 오류가 발생했습니다: {dbError}"
-                )
+            # 1.8. 결제 기록 및 토큰 충전을 하나의 트랜잭션으로 커밋 (동기 DB 작업은 스레드풀에서 실행)
+            await run_in_threadpool(
+                self._recordPayment, paymentData, tokenAmount, currentUser)
 
-            # 1.13. 성공적으로 처리된 경우, 토스페이먼츠의 응답 반환
+            # 1.9. 성공적으로 처리된 경우, 토스페이먼츠의 응답 반환
             return paymentData
 
-        except requests.exceptions.HTTPError as e:
-            # 1.14. 토스페이먼츠 API로부터 HTTP 에러를 받은 경우, 해당 내용을 그대로 클라이언트에 반환
+        except httpx.HTTPStatusError as e:
+            # 1.10. 토스페이먼츠 API로부터 HTTP 에러를 받은 경우, 해당 내용을 그대로 클라이언트에 반환
             raise HTTPException(
                 status_code=e.response.status_code,
                 detail=f"토스페이먼츠 결제 승인 중 오류 발생: {e.response.json().get('message', str(e))}"
             )
         except HTTPException as e:
-            # 1.15. 유효성 검사 등에서 발생한 HTTP 예외는 그대로 전달
+            # 1.11. 유효성 검사 등에서 발생한 HTTP 예외는 그대로 전달
             raise e
         except Exception as e:
-            # 1.16. 그 외의 예외가 발생한 경우, 500 에러 반환
+            # 1.12. 그 외의 예외가 발생한 경우, 500 에러 반환
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
\ No newline at end of file
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -0,0 +1,156 @@
+# app/services/usage_stats_buffer.py
+
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Optional
+
+from app.core.config import settings
+from app.repositories.usage_stats_repo import UsageStatsRepository
+from db.session import SessionLocal
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 검증 결과별로 증가시킬 통계 컬럼
+_RESULT_COLUMNS = {
+    "success": "captchaSuccessCount",
+    "fail": "captchaFailCount",
+    "timeout": "captchaTimeoutCount",
+}
+
+# 검증 결과별로 증가시킬 시간별 통계 컬럼
+_HOURLY_RESULT_COLUMNS = {
+    "success": "successCount",
+    "fail": "failCount",
+    "timeout": "timeoutCount",
+}
+
+
+def mergeDeltas(target: dict, deltas: dict) -> None:
+    """
+    키별 컬럼 증가분 딕셔너리(deltas)를 target에 합산합니다.
+    """
+    for key, delta in deltas.items():
+        current = target.setdefault(key, {})
+        for column, amount in delta.items():
+            current[column] = current.get(column, 0) + amount
+
+
+class UsageStatsBuffer:
+    """
+    캡챠 사용량 통계 증가분을 프로세스 내부에 모아 두었다가 한 번에 데이터베이스에 반영하는 버퍼입니다.
+    요청마다 같은 통계 행을 갱신하면 행 잠금 경합과 커밋 비용이 커지므로,
+    증가분을 (keyId, 날짜)별로 합산한 뒤 maxEvents개가 쌓이거나 flushInterval초가 지나면 하나의 문장으로 반영합니다.
+    검증 결과는 일간(시간별) 통계용으로 (keyId, 날짜, 시간)별로도 합산하여 함께 반영합니다.
+    """
+
+    def __init__(self, flushInterval: float, maxEvents: int):
+        self.flushInterval = flushInterval
+        self.maxEvents = maxEvents
+        self._deltas: dict = {}
+        self._hourlyDeltas: dict = {}
+        self._events = 0
+        self._lastFlush = time.monotonic()
+        self._lock = threading.Lock()
+        self._flushLock = threading.Lock()
+        self._flusherStarted = False
+
+    def _add(self, keyId: Optional[int], values: dict, hourlyValues: Optional[dict] = None) -> None:
+        """
+        증가분을 버퍼에 합산하고, 크기나 시간 기준을 넘으면 반영합니다.
+        """
+        if keyId is None:
+            return
+
+        with self._lock:
+            # 1. (keyId, 오늘 날짜)별로 증가분을 합산합니다.
+            mergeDeltas(self._deltas, {(keyId, date.today()): values})
+            # 1.1. 시간별 증가분은 로그 생성 시각과 같은 기준(애플리케이션 시간대)으로 (keyId, 날짜, 시간)별로 합산합니다.
+            if hourlyValues:
+                now = datetime.now(settings.TIMEZONE)
+                mergeDeltas(self._hourlyDeltas,
+                            {(keyId, now.date(), now.hour): hourlyValues})
+            self._events += 1
+
+            # 2. 유휴 상태에서도 주기적으로 반영되도록 첫 사용 시 반영 스레드를 시작합니다.
+            #    (Celery prefork 자식 프로세스에서 시작되어야 하므로 임포트 시점이 아닌 첫 사용 시점에 시작)
+            if not self._flusherStarted:
+                threading.Thread(target=self._runFlusher,
+                                 name="usage-stats-flusher", daemon=True).start()
+                self._flusherStarted = True
+
+            shouldFlush = self._events >= self.maxEvents or \
+                time.monotonic() - self._lastFlush >= self.flushInterval
+
+        # 3. 기준을 넘었으면 바로 반영합니다.
+        if shouldFlush:
+            self.flush()
+
+    def addTotalRequest(self, keyId: Optional[int]) -> None:
+        """
+        캡챠 총 요청 수 증가분을 버퍼에 추가합니다.
+        """
+        self._add(keyId, {"captchaTotalRequests": 1})
+
+    def addVerificationResult(self, keyId: Optional[int], result: str, latencyMs: int) -> None:
+        """
+        캡챠 검증 결과(성공/실패/타임아웃)와 지연 시간 증가분을 버퍼에 추가합니다.
+        TIMEOUT 결과는 검증 횟수에 포함하지 않습니다.
+        """
+        values = {"totalLatencyMs": latencyMs}
+        column = _RESULT_COLUMNS.get(result)
+        if column:
+            values[column] = 1
+        if result != "timeout":
+            values["verificationCount"] = 1
+        hourlyValues = {"totalCount": 1}
+        hourlyColumn = _HOURLY_RESULT_COLUMNS.get(result)
+        if hourlyColumn:
+            hourlyValues[hourlyColumn] = 1
+        self._add(keyId, values, hourlyValues)
+
+    def flush(self) -> None:
+        """
+        버퍼에 모인 증가분을 별도의 데이터베이스 세션으로 한 번에 반영합니다.
+        반영에 실패하면 증가분을 버퍼에 되돌려 다음 반영 때 다시 시도합니다.
+        """
+        with self._flushLock:
+            # 1. 버퍼를 비우고 반영할 증가분을 가져옵니다.
+            with self._lock:
+                deltas, hourlyDeltas = self._deltas, self._hourlyDeltas
+                self._deltas, self._hourlyDeltas = {}, {}
+                self._events = 0
+                self._lastFlush = time.monotonic()
+            if not deltas and not hourlyDeltas:
+                return
+
+            # 2. 일간/시간별 통계를 각각 하나의 INSERT ... ON DUPLICATE KEY UPDATE 문으로 반영하고 함께 커밋합니다.
+            db = SessionLocal()
+            try:
+                usageStatsRepo = UsageStatsRepository(db)
+                usageStatsRepo.applyStatsDeltas(deltas)
+                usageStatsRepo.applyHourlyStatsDeltas(hourlyDeltas)
+                db.commit()
+            except Exception as e:
+                # 3. 실패 시 롤백하고 증가분을 버퍼에 되돌립니다.
+                db.rollback()
+                logger.error(f"사용량 통계 반영 중 오류 발생: {e}")
+                with self._lock:
+                    mergeDeltas(self._deltas, deltas)
+                    mergeDeltas(self._hourlyDeltas, hourlyDeltas)
+            finally:
+                db.close()
+
+    def _runFlusher(self) -> None:
+        while True:
+            time.sleep(self.flushInterval)
+            self.flush()
+
+
+# 프로세스 전역 사용량 통계 버퍼
+usageStatsBuffer = UsageStatsBuffer(
+    flushInterval=settings.USAGE_STATS_FLUSH_INTERVAL_SECONDS,
+    maxEvents=settings.USAGE_STATS_FLUSH_MAX_EVENTS,
+)
@@ -1,13 +1,68 @@
+import calendar
 from datetime import date, timedelta
-import math
+from functools import lru_cache
 from fastapi import HTTPException, status
 from app.repositories.usage_stats_repo import UsageStatsRepository
 from app.repositories.api_key_repo import ApiKeyRepository
 from app.schemas.usage_stats import StatisticsDataResponse, StatisticsData, StatisticsLog, StatisticsLogResponse, RequestCountSummary, RequestCountSummaryResponse, RequestTotalResponse
 from app.models.user import User
-from typing import Optional, List
+from app.core.cache import TTLCache
+from typing import Optional, List, Tuple
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
+
+
+# 사용자별 API 키 ID 목록 캐시 (대시보드가 여러 통계 API를 연달아 호출할 때 키 목록 조회를 한 번으로 줄임)
+# API 키나 애플리케이션이 생성/삭제되면 해당 사용자의 항목을 비웁니다.
+userKeyIdsCache = TTLCache(ttlSeconds=60, maxSize=4096)
+
+# (API 키 ID 목록, 오늘 날짜)별 어제까지의 누적 요청 수 캐시
+# 지난 날짜의 통계는 자정 직후 버퍼에 남은 증가분이 반영되는 것 외에는 바뀌지 않으므로, 그 정도만 보정되도록 TTL을 둡니다.
+totalRequestsCache = TTLCache(ttlSeconds=600, maxSize=4096)
+
+
+@lru_cache(maxsize=8)
+def _getPeriodBounds(periodType: str, todayOrdinal: int) -> Tuple[date, date, date, date]:
+    """
+    기간 타입별 현재 기간과 이전 기간의 날짜 범위를 계산합니다.
+    같은 날의 요청은 모두 같은 범위를 사용하므로 (기간 타입, 오늘 날짜 서수)를 키로 캐시합니다.
+
+    Returns:
+        Tuple[date, date, date, date]: (현재 시작일, 현재 종료일, 이전 시작일, 이전 종료일).
+    """
+    today = date.fromordinal(todayOrdinal)
+    if periodType == 'daily':
+        yesterday = today - timedelta(days=1)
+        return today, today, yesterday, yesterday
+    if periodType == 'weekly':
+        currentStart = today - timedelta(days=today.weekday())
+        return (currentStart, currentStart + timedelta(days=6),
+                currentStart - timedelta(weeks=1), currentStart - timedelta(days=1))
+    # monthly
+    currentStart = today.replace(day=1)
+    currentEnd = today.replace(
+        day=calendar.monthrange(today.year, today.month)[1])
+    previousEnd = currentStart - timedelta(days=1)
+    return currentStart, currentEnd, previousEnd.replace(day=1), previousEnd
+
+
+def _getOneYearAgo(today: date) -> date:
+    """
+    1년 전 같은 날짜를 반환합니다. 전년도에 없는 2월 29일은 2월 28일로 맞춥니다.
+    """
+    try:
+        return today.replace(year=today.year - 1)
+    except ValueError:
+        return today.replace(year=today.year - 1, day=28)
+
+
+def _calculateRate(currentCount: int, previousCount: int) -> float:
+    """
+    이전 기간 대비 현재 기간의 증감률(%)을 소수점 둘째 자리까지 계산합니다.
+    이전 기간 요청이 0일 때 현재 요청이 있으면 100% 증가로, 둘 다 0이면 변화 없음(0%)으로 처리합니다.
+    """
+    if previousCount:
+        return round((currentCount - previousCount) / previousCount * 100, 2)
+    return 100.0 if currentCount else 0.0
 
 
 class UsageStatsService:
@@ -28,26 +83,38 @@ class UsageStatsService:
         self.repo = repo
         self.api_key_repo = api_key_repo
 
-    def _checkApiKeyOwner(self, keyId: int, currentUser: User):
+    def _getKeyIds(self, keyId: Optional[int], currentUser: User) -> List[int]:
         """
-        API 키의 소유권을 확인하는 private 헬퍼 메소드입니다.
-        요청한 사용자가 해당 API 키의 실제 소유자인지 확인하여, 권한이 없는 경우 예외를 발생시킵니다.
+        통계를 조회할 API 키 ID 목록을 결정하는 private 헬퍼 메소드입니다.
+        사용자의 키 ID 목록은 캐시해 두고, 특정 keyId가 주어지면 그 목록으로 소유권을 확인합니다.
 
         Args:
-            keyId (int): 확인할 API 키의 ID.
+            keyId (Optional[int]): 조회할 API 키 ID. None이면 사용자 전체 키.
             currentUser (User): 현재 인증된 사용자 객체.
 
+        Returns:
+            List[int]: 조회할 API 키 ID 리스트.
+
         Raises:
             HTTPException: API 키가 존재하지 않거나 사용자에게 소유권이 없는 경우 403 Forbidden 예외 발생.
         """
-        # 1. API 키 ID를 사용하여 API 키 정보를 조회합니다.
-        api_key = self.api_key_repo.getKeyByKeyId(keyId)
-        # 2. API 키가 존재하지 않거나, 해당 키의 애플리케이션 소유자와 현재 사용자가 다를 경우 예외를 발생시킵니다.
-        if not api_key or api_key.application.userId != currentUser.id:
+        # 1. 사용자의 API 키 ID 목록을 캐시에서 가져오고, 없으면 ID 컬럼만 조회하여 캐시에 저장합니다.
+        keyIds = userKeyIdsCache.get(currentUser.id)
+        if keyIds is None:
+            keyIds = self.api_key_repo.getKeyIdsByUserId(currentUser.id)
+            userKeyIdsCache.set(currentUser.id, keyIds)
+
+        # 2. keyId가 없으면 사용자의 전체 키 ID 목록을 반환합니다.
+        if not keyId:
+            return keyIds
+
+        # 3. keyId가 사용자의 키 목록에 없으면 (존재하지 않거나 소유권이 없으면) 예외를 발생시킵니다.
+        if keyId not in keyIds:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="이 API 키에 접근할 권한이 없습니다."
             )
+        return [keyId]
 
     def getSummary(self, currentUser: User, keyId: Optional[int], periodType: str, startDate: Optional[date], endDate: Optional[date]) -> StatisticsDataResponse:
         """
@@ -64,15 +131,8 @@ class UsageStatsService:
             StatisticsDataResponse: 기간별 통계 데이터가 담긴 응답 객체.
         """
         try:
-            # 1. 조회할 API 키 ID 목록을 결정합니다.
-            if keyId:
-                # 특정 keyId가 주어지면, 해당 키의 소유권을 확인합니다.
-                self._checkApiKeyOwner(keyId, currentUser)
-                keyIds = [keyId]
-            else:
-                # keyId가 없으면, 현재 사용자가 소유한 모든 API 키를 조회합니다.
-                userKeys = self.api_key_repo.getKeysByUserId(currentUser.id)
-                keyIds = [key.id for key in userKeys] if userKeys else []
+            # 1. 조회할 API 키 ID 목록을 결정합니다. (특정 keyId가 주어지면 소유권을 확인합니다.)
+            keyIds = self._getKeyIds(keyId, currentUser)
 
             # 2. 조회 기간(startDate, endDate)을 설정합니다.
             today = date.today()
@@ -80,8 +140,7 @@ class UsageStatsService:
                 endDate = today
             if not startDate:
                 if periodType == 'yearly':
-                    startDate = today - relativedelta(years=1)
-                    startDate = startDate.replace(day=1)
+                    startDate = date(today.year - 1, today.month, 1)
                 elif periodType == 'monthly':
                     startDate = today - timedelta(days=30)
                 elif periodType == 'weekly':
@@ -91,8 +150,8 @@ class UsageStatsService:
 
             # 3. 기간 타입에 따라 적절한 리포지토리 메소드를 호출하여 데이터를 조회합니다.
             if periodType == 'daily':
-                # 일간 통계는 실시간 성이 중요하므로, 집계된 `usage_stats`가 아닌 원본 `captcha_log`에서 직접 조회합니다.
-                rawData = self.repo.getStatsFromLogs(
+                # 일간 통계는 시간별로 보여주므로, 검증 결과가 기록될 때 시간별로 집계해 두는 `usage_stats_hourly`에서 조회합니다.
+                rawData = self.repo.getHourlyStats(
                     keyIds=keyIds,
                     startDate=startDate,
                     endDate=endDate
@@ -157,13 +216,8 @@ class UsageStatsService:
             StatisticsLogResponse: 페이지네이션된 사용량 로그 객체.
         """
         try:
-            # 1. 조회할 API 키 ID 목록을 결정합니다.
-            if keyId:
-                self._checkApiKeyOwner(keyId, currentUser)
-                keyIds = [keyId]
-            else:
-                userKeys = self.api_key_repo.getKeysByUserId(currentUser.id)
-                keyIds = [key.id for key in userKeys] if userKeys else []
+            # 1. 조회할 API 키 ID 목록을 결정합니다. (특정 keyId가 주어지면 소유권을 확인합니다.)
+            keyIds = self._getKeyIds(keyId, currentUser)
 
             # 2. 조회 기간을 설정합니다.
             today = date.today()
@@ -171,7 +225,7 @@ class UsageStatsService:
                 endDate = today
             if not startDate:
                 if periodType == 'yearly':
-                    startDate = today - relativedelta(years=1)
+                    startDate = _getOneYearAgo(today)
                 elif periodType == 'monthly':
                     startDate = today - timedelta(days=30)
                 elif periodType == 'weekly':
@@ -189,20 +243,8 @@ class UsageStatsService:
             )
 
             # 4. 조회된 로그 데이터를 응답 스키마 형태로 변환합니다.
-            items = []
-            for log in logs:
-                log_date = log[3].strftime('%Y-%m-%d %H:%M:%S')
-
-                items.append(
-                    StatisticsLog(
-                        id=log[0],
-                        appName=log[1],
-                        key=log[2],
-                        date=log_date,
-                        result=log[4],
-                        ratency=log[5]
-                    )
-                )
+            #    리포지토리가 스키마 필드명과 형식에 맞춰 조회하므로, model_construct로 행마다의 검증 없이 그대로 옮깁니다.
+            items = [StatisticsLog.model_construct(**log._mapping) for log in logs]
 
             # 5. 최종 페이지네이션 응답 객체를 생성하여 반환합니다.
             return StatisticsLogResponse(
@@ -234,60 +276,28 @@ class UsageStatsService:
             RequestCountSummaryResponse: 비교 요약 데이터가 담긴 응답 객체.
         """
         try:
-            # 1. 조회할 API 키 ID 목록을 결정합니다.
-            if keyId:
-                self._checkApiKeyOwner(keyId, currentUser)
-                keyIds = [keyId]
-            else:
-                userKeys = self.api_key_repo.getKeysByUserId(currentUser.id)
-                keyIds = [key.id for key in userKeys] if userKeys else []
+            # 1. 조회할 API 키 ID 목록을 결정합니다. (특정 keyId가 주어지면 소유권을 확인합니다.)
+            keyIds = self._getKeyIds(keyId, currentUser)
 
-            # 2. `periodType`에 따라 현재와 이전 기간의 날짜 범위를 계산합니다.
-            today = date.today()
-            if periodType == 'daily':
-                currentStart = today
-                currentEnd = today
-                previousStart = today - timedelta(days=1)
-                previousEnd = today - timedelta(days=1)
-            elif periodType == 'weekly':
-                currentStart = today - timedelta(days=today.weekday())
-                currentEnd = currentStart + timedelta(days=6)
-                previousStart = currentStart - timedelta(weeks=1)
-                previousEnd = currentStart - timedelta(days=1)
-            elif periodType == 'monthly':
-                currentStart = today.replace(day=1)
-                nextMonth = currentStart.replace(day=28) + timedelta(days=4)
-                currentEnd = nextMonth - timedelta(days=nextMonth.day)
-                previousEnd = currentStart - timedelta(days=1)
-                previousStart = previousEnd.replace(day=1)
-            else:
+            # 2. `periodType`에 따라 현재와 이전 기간의 날짜 범위를 가져옵니다. (같은 날에는 캐시된 값을 사용합니다.)
+            if periodType not in ('daily', 'weekly', 'monthly'):
                 raise HTTPException(
                     status_code=400, detail="Invalid periodType")
+            currentStart, currentEnd, previousStart, previousEnd = _getPeriodBounds(
+                periodType, date.today().toordinal())
 
-            # 3. 리포지토리를 통해 각 기간의 요청 수를 조회합니다.
-            currentCount = self.repo.getTotalRequestsForPeriod(
-                keyIds, currentStart, currentEnd)
-            previousCount = self.repo.getTotalRequestsForPeriod(
-                keyIds, previousStart, previousEnd)
-
-            # 4. 이전 기간 대비 증감률(%)을 계산합니다.
-            if previousCount > 0:
-                rate = ((currentCount - previousCount) / previousCount) * 100
-            elif currentCount > 0:
-                # 이전 기간 요청이 0일 때, 현재 요청이 있으면 100% 증가로 처리합니다.
-                rate = 100.0
-            else:
-                # 이전 기간과 현재 기간 모두 요청이 0이면 변화 없음(0%)으로 처리합니다.
-                rate = 0.0
+            # 3. 리포지토리를 통해 현재와 이전 기간의 요청 수를 한 번의 쿼리로 조회합니다.
+            currentCount, previousCount = self.repo.getTotalRequestsForTwoPeriods(
+                keyIds, currentStart, currentEnd, previousStart, previousEnd)
 
-            # 5. 응답 스키마에 맞게 데이터를 조립합니다.
+            # 4. 이전 기간 대비 증감률(%)을 계산하고 응답 스키마에 맞게 데이터를 조립합니다.
             summaryData = RequestCountSummary(
                 currentCount=currentCount,
                 previousCount=previousCount,
-                rate=round(rate, 2)
+                rate=_calculateRate(currentCount, previousCount)
             )
 
-            # 6. 최종 응답 객체를 생성하여 반환합니다.
+            # 5. 최종 응답 객체를 생성하여 반환합니다.
             return RequestCountSummaryResponse(
                 keyId=keyId,
                 periodType=periodType,
@@ -313,16 +323,20 @@ class UsageStatsService:
             RequestTotalResponse: 전체 요청 수가 담긴 응답 객체.
         """
         try:
-            # 1. 조회할 API 키 ID 목록을 결정합니다.
-            if keyId:
-                self._checkApiKeyOwner(keyId, currentUser)
-                keyIds = [keyId]
-            else:
-                userKeys = self.api_key_repo.getKeysByUserId(currentUser.id)
-                keyIds = [key.id for key in userKeys] if userKeys else []
+            # 1. 조회할 API 키 ID 목록을 결정합니다. (특정 keyId가 주어지면 소유권을 확인합니다.)
+            keyIds = self._getKeyIds(keyId, currentUser)
 
-            # 2. 리포지토리를 통해 전체 요청 수를 조회합니다.
-            count = self.repo.getTotalRequests(keyIds)
+            # 2. 어제까지의 요청 수는 더 이상 바뀌지 않으므로 (키 목록, 오늘 날짜)별로 캐시하고,
+            #    오늘 요청 수만 매번 조회하여 더합니다.
+            today = date.today()
+            cacheKey = (tuple(keyIds), today)
+            previousCount = totalRequestsCache.get(cacheKey)
+            if previousCount is None:
+                previousCount = self.repo.getTotalRequests(
+                    keyIds, endDate=today - timedelta(days=1))
+                totalRequestsCache.set(cacheKey, previousCount)
+            count = previousCount + \
+                self.repo.getTotalRequests(keyIds, startDate=today)
 
             # 3. 최종 응답 객체를 생성하여 반환합니다.
             return RequestTotalResponse(
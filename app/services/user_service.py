@@ -1,6 +1,7 @@
 # services/user_service.py
 
 from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
 import re
@@ -12,6 +13,9 @@ from app.schemas.user import UserCreate, UserUpdate
 from app.models.user import User, UserRole
 from app.core.config import settings  # settings 객체 임포트
 
+# 사용자 이름 정규식 (요청마다 re 모듈 캐시를 조회하지 않도록 모듈 로드 시 한 번만 컴파일)
+_USER_NAME_RE = re.compile(settings.USER_NAME_REGEX_PATTERN)
+
 
 class UserService:
     """
@@ -57,29 +61,26 @@ class UserService:
             User: 새로 생성된 사용자 객체. 이메일이 이미 존재하면 None을 반환합니다.
         """
         try:
-            # 1. 삭제된 사용자를 포함하여 모든 사용자 중에서 이메일 중복을 확인합니다.
-            existingUser = self.userRepo.getUserByEmail(
-                userData.email, includeDeleted=True)
-
-            # 2. 이메일이 이미 존재하는 경우 None을 반환하여 중복을 알립니다.
-            if existingUser:
-                return None
-
-            # 3. 비밀번호를 해시 처리합니다.
+            # 1. 비밀번호를 해시 처리합니다.
             hashedPassword = getPasswordHash(userData.password)
-            # 4. UserRepository를 통해 새로운 사용자를 생성합니다.
+            # 2. UserRepository를 통해 새로운 사용자를 생성합니다.
             newUser = self.userRepo.createUser(userData, hashedPassword)
 
-            # 5. 변경사항을 커밋합니다.
-            self.userRepo.db.commit()
-
-            # 6. 최신 상태를 반영합니다.
-            self.userRepo.db.refresh(newUser)
+            # 3. 변경사항을 커밋합니다.
+            #    이메일 중복은 미리 조회하지 않고 email UNIQUE 제약으로 판단합니다.
+            #    (삭제된 사용자의 행도 남아 있으므로 삭제된 사용자의 이메일도 중복으로 처리됩니다.)
+            try:
+                self.userRepo.db.commit()
+            except IntegrityError:
+                # 4. 이메일이 이미 존재하는 경우 롤백하고 None을 반환하여 중복을 알립니다.
+                self.userRepo.db.rollback()
+                return None
 
-            # 7. 생성된 사용자 객체를 반환합니다.
+            # 5. 생성된 사용자 객체를 반환합니다.
+            #    (기본값은 모두 파이썬에서 채워지므로 refresh 없이 바로 사용할 수 있습니다.)
             return newUser
         except Exception as e:
-            # 8. 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
+            # 6. 예외 발생 시 롤백하고 서버 오류를 발생시킵니다.
             self.userRepo.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -113,7 +114,7 @@ class UserService:
 
             # 3. 사용자 이름 유효성 검증 및 업데이트
             if userUpdate.userName is not None:
-                # if not re.match(settings.USER_NAME_REGEX_PATTERN, userUpdate.userName):  # 정규식 패턴 사용
+                # if not _USER_NAME_RE.match(userUpdate.userName):  # 미리 컴파일한 정규식 사용
                 #     raise HTTPException(
                 #         status_code=status.HTTP_400_BAD_REQUEST,
                 #         detail="사용자 이름에는 한글, 영문, 숫자, 특수문자(.-_) 만 사용할 수 있습니다."
@@ -155,10 +156,8 @@ class UserService:
             # 6. 변경사항을 커밋합니다.
             self.userRepo.db.commit()
 
-            # 7. 최신 상태를 반영합니다.
-            self.userRepo.db.refresh(updatedUser)
-
-            # 8. 업데이트된 사용자 객체를 반환합니다.
+            # 7. 업데이트된 사용자 객체를 반환합니다.
+            #    (updatedAt은 onupdate로 파이썬에서 채워지므로 refresh 없이 바로 사용할 수 있습니다.)
             return updatedUser
         except HTTPException as e:
             self.userRepo.db.rollback()
@@ -231,10 +230,7 @@ class UserService:
             # 4. 변경사항을 커밋합니다.
             self.userRepo.db.commit()
 
-            # 5. 최신 상태를 반영합니다.
-            self.userRepo.db.refresh(deletedUser)
-
-            # 6. 삭제된 사용자 객체를 반환합니다.
+            # 5. 삭제된 사용자 객체를 반환합니다. (삭제 시각은 파이썬에서 채우므로 refresh가 필요 없습니다.)
             return deletedUser
         except Exception as e:
             self.userRepo.db.rollback()
@@ -293,21 +289,19 @@ class UserService:
             User | None: 복구된 사용자 객체. 사용자를 찾을 수 없거나 이미 활성 상태이면 None을 반환합니다.
         """
         try:
-            # 1. 삭제된 사용자를 포함하여 복구할 사용자를 조회합니다.
-            user = self.userRepo.getUserByIdAdmin(
-                userId, includeDeleted=True)
-            # 2. 사용자가 없거나 이미 활성 상태인 경우 None을 반환합니다.
-            if not user or user.deletedAt is None:
+            # 1. 삭제된 사용자만 조건으로 하는 단일 UPDATE 문으로 사용자를 복구합니다.
+            restoredRows = self.userRepo.restoreUser(userId)
+            # 2. 갱신된 행이 없으면 사용자가 없거나 이미 활성 상태이므로 None을 반환합니다.
+            if restoredRows == 0:
+                self.userRepo.db.rollback()
                 return None
 
-            # 3. deletedAt을 None으로 설정하여 사용자를 복구합니다.
-            user.deletedAt = None
-            self.userRepo.db.add(user)
             self.userRepo.db.commit()
-            self.userRepo.db.refresh(user)
-            # 4. 복구된 사용자 객체를 반환합니다.
-            return user
+            # 3. 복구된 사용자 객체를 반환합니다. (MySQL은 RETURNING을 지원하지 않으므로,
+            #    세션에 이미 로드된 사용자는 그대로, 아니면 한 번 조회합니다.)
+            return self.userRepo.db.get(User, userId)
         except Exception as e:
+            self.userRepo.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"관리자용 사용자 복구 중 오류가 발생했습니다: {e}"
@@ -337,15 +331,17 @@ class UserService:
                 user.userName = userUpdate.userName
             if userUpdate.newPassword:
                 user.passwordHash = getPasswordHash(userUpdate.newPassword)
-            if userUpdate.role is not None:
-                user.role = userUpdate.role
-            if userUpdate.plan is not None:
-                user.plan = userUpdate.plan
-
-            # 4. 변경사항을 데이터베이스에 커밋합니다.
-            self.userRepo.db.commit()
-            self.userRepo.db.refresh(user)
+            #    (UserUpdate에는 role이 없을 수 있고, User 모델의 plan 컬럼은 현재 사용하지 않으므로 role만 선택적으로 반영합니다.)
+            role = getattr(userUpdate, "role", None)
+            if role is not None:
+                user.role = role
+
+            # 4. 실제로 바뀐 컬럼이 있을 때만 변경사항을 데이터베이스에 커밋합니다.
+            #    (같은 값을 다시 보낸 요청은 UPDATE/COMMIT 없이 그대로 반환합니다.)
+            if self.userRepo.db.is_modified(user, include_collections=False):
+                self.userRepo.db.commit()
             # 5. 업데이트된 사용자 객체를 반환합니다.
+            #    (updatedAt은 onupdate로 파이썬에서 채워지므로 refresh 없이 바로 사용할 수 있습니다.)
             return user
         except Exception as e:
             raise HTTPException(
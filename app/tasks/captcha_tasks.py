@@ -1,40 +1,39 @@
 # app/tasks/captcha_tasks.py
 
 import logging
-from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional, Dict, Any, List
 from fastapi import HTTPException
 
 from app.celery_app import celery_app
 from app.core.config import settings
 from app.models.captcha_session import CaptchaSession
-from app.models.captcha_log import CaptchaResult
+from app.models.captcha_log import CaptchaLog
 from app.schemas.captcha import CaptchaVerificationRequest
 from db.session import SessionLocal
 
 import os
-import json
-import io
-import gzip
+import orjson
+import tempfile
 import boto3
+import zstandard as zstd
 from botocore.config import Config
 from pydantic import BaseModel
 
 # 로거 설정
 logger = logging.getLogger(__name__)
 
-# ===== KS3/S3 helpers (copied from captcha_service.py) =====
-
+# 만료 세션 정리 작업이 한 번에 잠그고 처리할 최대 세션 수
+_CLEANUP_BATCH_SIZE = 500
 
-def model_dump_compat(obj, *, exclude_none: bool = True):
-    if hasattr(obj, "model_dump"):
-        return obj.model_dump(exclude_none=exclude_none)
-    if hasattr(obj, "dict"):
-        return obj.dict(exclude_none=exclude_none)
-    return obj
+# ===== KS3/S3 helpers (copied from captcha_service.py) =====
 
 
+@lru_cache(maxsize=1)
 def _ks3_client():
+    # 클라이언트 생성(설정 로드, 자격 증명 확인)은 비싸므로 워커 프로세스당 한 번만 만들고,
+    # 이후 업로드는 같은 클라이언트의 커넥션 풀(TLS 세션)을 재사용합니다.
     cfg = Config(
         s3={"addressing_style": "path" if settings.KS3_FORCE_PATH_STYLE else "virtual"},
         signature_version="s3v4",
@@ -48,60 +47,73 @@ def _ks3_client():
     return session.client("s3", endpoint_url=settings.KS3_ENDPOINT, config=cfg)
 
 
-def _make_session_key(session_id: str, gz: bool = True) -> str:
+def _make_session_key(session_id: str, suffix: str = ".zst") -> str:
     ts = datetime.now(settings.TIMEZONE).strftime("%Y%m%d-%H%M%S")
-    fname = f"{ts}_{session_id}.json" + (".gz" if gz else "")
+    fname = f"{ts}_{session_id}.json" + suffix
     return f"{settings.KS3_PREFIX.strip('/')}/{fname}".strip("/")
 
 
-def _serialize_jsonl_bytes(payload: CaptchaVerificationRequest) -> bytes:
-    meta = model_dump_compat(payload.meta, exclude_none=True)
-    events = [model_dump_compat(e, exclude_none=True) for e in payload.events]
-    lines = [json.dumps({"type": "meta", **meta}, ensure_ascii=False)]
-    for ev in events:
-        lines.append(json.dumps({"type": "event", **ev}, ensure_ascii=False))
-    # Assuming label is not part of CaptchaVerificationRequest for now, or needs to be added
-    # if payload.label:
-    #     lines.append(json.dumps({"type": "label", **payload.label}, ensure_ascii=False))
-    return ("\n".join(lines) + "\n").encode("utf-8")
-
-
-def _gzip_bytes(raw: bytes) -> bytes:
-    buf = io.BytesIO()
-    with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=6, mtime=0) as gz:
-        gz.write(raw)
-    return buf.getvalue()
-
-def upload_ks3_session(payload: CaptchaVerificationRequest, session_id: str):
-    if not settings.ENABLE_KS3 or not settings.KS3_BUCKET or not settings.KS3_ACCESS_KEY or not settings.KS3_SECRET_KEY or not settings.KS3_ENDPOINT:
-        missing = []
-        if not settings.ENABLE_KS3:
-            missing.append("KS3_ENABLE(auto)==False")
-        if not settings.KS3_BUCKET:
-            missing.append("KS3_BUCKET")
-        if not settings.KS3_ACCESS_KEY:
-            missing.append("KS3_ACCESS_KEY")
-        if not settings.KS3_SECRET_KEY:
-            missing.append("KS3_SECRET_KEY")
-        if not settings.KS3_ENDPOINT:
-            missing.append("KS3_ENDPOINT")
+def _zstd_jsonl(payload: Dict[str, Any]) -> tempfile.SpooledTemporaryFile:
+    # 줄 단위 JSON(orjson이 바로 UTF-8 바이트로 직렬화)을 메모리에 모으지 않고 zstd(레벨 3) 스트림에 바로 써서, 페이로드 사본이 한 벌만 남도록 합니다.
+    # (1MiB를 넘으면 임시 파일로 넘어가며, 호출한 쪽에서 닫아야 합니다.)
+    # ZstdCompressor는 여러 스레드에서 동시에 쓸 수 없으므로 업로드마다 새로 만듭니다. (생성 비용은 압축 비용에 비해 작음)
+    # payload는 API 서버에서 model_dump(mode="json", exclude_none=True)로 만든 딕셔너리이므로 meta/events를 그대로 기록합니다.
+    spool = tempfile.SpooledTemporaryFile(max_size=1 << 20)
+    with zstd.ZstdCompressor(level=3).stream_writer(spool, closefd=False) as zw:
+        zw.write(orjson.dumps({"type": "meta", **(payload.get("meta") or {})}) + b"\n")
+        for ev in payload.get("events") or ():
+            zw.write(orjson.dumps({"type": "event", **ev}) + b"\n")
+        # Assuming label is not part of CaptchaVerificationRequest for now, or needs to be added
+        # if payload.label:
+        #     zw.write(orjson.dumps({"type": "label", **payload.label}) + b"\n")
+    spool.seek(0)
+    return spool
+
+
+def _missing_ks3_settings() -> List[str]:
+    missing = []
+    if not settings.ENABLE_KS3:
+        missing.append("KS3_ENABLE(auto)==False")
+    if not settings.KS3_BUCKET:
+        missing.append("KS3_BUCKET")
+    if not settings.KS3_ACCESS_KEY:
+        missing.append("KS3_ACCESS_KEY")
+    if not settings.KS3_SECRET_KEY:
+        missing.append("KS3_SECRET_KEY")
+    if not settings.KS3_ENDPOINT:
+        missing.append("KS3_ENDPOINT")
+    return missing
+
+
+# KS3 설정은 프로세스 시작 시 고정되므로 업로드 가능 여부를 모듈 상수로 한 번만 계산해 둡니다.
+_KS3_READY = not _missing_ks3_settings()
+
+
+def upload_ks3_session(payload: Dict[str, Any], session_id: str):
+    if not _KS3_READY:
+        missing = _missing_ks3_settings()
         logger.warning(
             f"S3 업로드 건너뜀: 설정 누락됨: {', '.join(missing)}")
         return (None, None, f"Missing: {', '.join(missing)}")
+    body = None
     try:
-        body = _serialize_jsonl_bytes(payload)
-        gz = _gzip_bytes(body)
-        key = _make_session_key(session_id, gz=True)
+        body = _zstd_jsonl(payload)
+        size = body.seek(0, os.SEEK_END)
+        body.seek(0)
+        key = _make_session_key(session_id)
         s3 = _ks3_client()
         s3.put_object(
-            Bucket=settings.KS3_BUCKET, Key=key, Body=gz,
-            ContentType="application/json", ContentEncoding="gzip",
+            Bucket=settings.KS3_BUCKET, Key=key, Body=body,
+            ContentType="application/json", ContentEncoding="zstd",
         )
         logger.info(f"KS3 업로드 성공: s3://{settings.KS3_BUCKET}/{key}")
-        return (f"s3://{settings.KS3_BUCKET}/{key}", key, len(gz))
+        return (f"s3://{settings.KS3_BUCKET}/{key}", key, size)
     except Exception as e:
         logger.error(f"KS3 업로드 오류: {e}")
         return (None, None, f"upload error: {e}")
+    finally:
+        if body is not None:
+            body.close()
 
 
 @celery_app.task(bind=True)
@@ -169,16 +181,16 @@ def verifyCaptchaTask(self, clientToken: str, answer: str, ipAddress: str, userA
         db.close()
 
 
-@celery_app.task
+@celery_app.task(ignore_result=True)
 def uploadBehaviorDataTask(clientToken: str, request_data: Dict[str, Any]):
     """
     행동 데이터를 S3/KS3에 비동기적으로 업로드하는 Celery 작업입니다.
     """
     logger.info(f"클라이언트 토큰 {clientToken}에 대한 행동 데이터 업로드 중...")
     try:
-        # Reconstruct CaptchaVerificationRequest from dict
-        request = CaptchaVerificationRequest(**request_data)
-        upload_ks3_session(request, clientToken)
+        # API 서버에서 이미 검증하고 model_dump(mode="json", exclude_none=True)로 만든 딕셔너리이므로
+        # 모델로 다시 복원하지 않고 그대로 업로드합니다.
+        upload_ks3_session(request_data, clientToken)
         logger.info(
             f"클라이언트 토큰 {clientToken}에 대한 행동 데이터 업로드 성공")
     except Exception as e:
@@ -186,7 +198,7 @@ def uploadBehaviorDataTask(clientToken: str, request_data: Dict[str, Any]):
             f"클라이언트 토큰 {clientToken}에 대한 행동 데이터 업로드 오류: {e}")
 
 
-@celery_app.task
+@celery_app.task(ignore_result=True)
 def cleanupExpiredSessionsTask():
     """
     주기적으로 실행되어 만료된 캡챠 세션을 정리하는 작업입니다.
@@ -208,39 +220,53 @@ def cleanupExpiredSessionsTask():
             settings.TIMEZONE) - timedelta(minutes=settings.CAPTCHA_TIMEOUT_MINUTES)
 
         # 타임아웃 기준점을 지났고, 아직 로그(성공/실패/타임아웃)가 없는 세션들을 조회합니다.
+        # 로그 유무는 상관 서브쿼리(NOT EXISTS) 대신 session_id UNIQUE 인덱스를 타는 LEFT JOIN ... IS NULL로 판단합니다.
         # with_for_update(skip_locked=True)를 사용하여 여러 워커가 동시에 같은 세션을 처리하는 것을 방지합니다.
-        # 이미 다른 워커에 의해 잠긴(처리 중인) 세션은 건너뜁니다.
-        expiredSessions = db.query(CaptchaSession).filter(
+        # 이미 다른 워커에 의해 잠긴(처리 중인) 세션은 건너뛰며, 잠금 시간을 제한하기 위해 한 번에 최대 _CLEANUP_BATCH_SIZE개만 처리합니다.
+        # (남은 세션은 다음 주기에 처리됩니다.)
+        expiredSessions = db.query(CaptchaSession).outerjoin(
+            CaptchaLog, CaptchaLog.sessionId == CaptchaSession.id
+        ).filter(
             CaptchaSession.createdAt < timeoutThreshold,
-            ~CaptchaSession.captchaLog.any()
-        ).with_for_update(skip_locked=True).all()
+            CaptchaLog.id.is_(None)
+        ).with_for_update(skip_locked=True, of=CaptchaSession).limit(_CLEANUP_BATCH_SIZE).all()
 
         if expiredSessions:
             logger.info(f"{len(expiredSessions)}개의 만료된 세션 발견, 타임아웃 처리 시작")
 
-            for session in expiredSessions:
-                # 세션 생성 시간이 타임존 정보를 포함하도록 보정합니다.
-                if session.createdAt.tzinfo is None:
-                    session.createdAt = settings.TIMEZONE.localize(
-                        session.createdAt)
+            # 타임아웃 로그는 모아서 한 번에 INSERT하고,
+            # 타임아웃 통계는 (API 키, 날짜)별, 시간별 통계는 (API 키, 날짜, 시간)별로 합산한 뒤 한 번에 반영합니다.
+            logRows = []
+            statsDeltas = {}
+            hourlyStatsDeltas = {}
+            today = date.today()
+            now = datetime.now(settings.TIMEZONE)
 
+            for session in expiredSessions:
                 # 지연 시간(latency)을 계산합니다.
-                latency = datetime.now(settings.TIMEZONE) - session.createdAt
-
-                # 타임아웃 로그를 생성합니다.
-                captchaRepo.createCaptchaLog(
-                    session=session,
-                    result=CaptchaResult.TIMEOUT,
-                    latency_ms=int(latency.total_seconds() * 1000)
-                )
-                # 타임아웃 발생에 대한 사용량 통계를 업데이트합니다.
-                usageStatsRepo.incrementVerificationResult(
-                    session.keyId, CaptchaResult.TIMEOUT.value, int(
-                        latency.total_seconds() * 1000)
-                )
+                latencyMs = int((now - session.createdAt).total_seconds() * 1000)
+
+                # 타임아웃 로그 행을 모읍니다.
+                logRows.append({"keyId": session.keyId,
+                               "sessionId": session.id, "latency_ms": latencyMs})
+                # 타임아웃 발생에 대한 사용량 통계 증가분을 합산합니다.
+                if session.keyId is not None:
+                    delta = statsDeltas.setdefault((session.keyId, today), {
+                        "captchaTimeoutCount": 0, "totalLatencyMs": 0})
+                    delta["captchaTimeoutCount"] += 1
+                    delta["totalLatencyMs"] += latencyMs
+                    hourlyDelta = hourlyStatsDeltas.setdefault((session.keyId, now.date(), now.hour), {
+                        "totalCount": 0, "timeoutCount": 0})
+                    hourlyDelta["totalCount"] += 1
+                    hourlyDelta["timeoutCount"] += 1
                 logger.info(
                     f"세션 만료(TIMEOUT): [세션 ID={session.id}, 클라이언트 토큰={session.clientToken}]")
 
+            # 모은 타임아웃 로그와 합산된 타임아웃 통계를 각각 하나의 문장으로 반영합니다.
+            captchaRepo.createTimeoutLogs(logRows)
+            usageStatsRepo.applyStatsDeltas(statsDeltas)
+            usageStatsRepo.applyHourlyStatsDeltas(hourlyStatsDeltas)
+
             # 모든 변경사항을 데이터베이스에 한 번에 커밋합니다.
             db.commit()
     except Exception as e:
@@ -5,14 +5,73 @@ import os
 import sys
 import json
 import gzip
+import hashlib
 import io
+import tempfile
 import argparse
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import boto3
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
+from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 
+load_dotenv()  # .env 파일은 임포트 시점에 한 번만 로드합니다.
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+# ISA-L(python-isal)이 설치되어 있으면 SIMD 가속 gzip 해제를 사용하고, 없으면 표준 gzip을 사용합니다.
+try:
+    from isal import igzip as _gzip
+except ImportError:
+    _gzip = gzip
+
+# rapidgzip이 설치되어 있으면 큰 .gz 세션 파일은 여러 코어에서 병렬로 압축을 풉니다.
+try:
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+# 병렬 해제를 사용할 최소 압축 파일 크기 (작은 파일은 블록 색인 비용이 더 큼)
+PARALLEL_GZIP_MIN_BYTES = 2 * 1024 * 1024
+
+# API 호출에 재사용할 HTTP 세션 (keep-alive로 문제 요청/검증/결과 폴링이 같은 연결을 사용합니다.)
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_maxsize=32, max_retries=Retry(
+    total=3, backoff_factor=0.1))
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+# 8MiB 이상인 세션 파일은 여러 연결로 나누어(ranged GET) 동시에 다운로드합니다.
+DOWNLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True,
+)
+
+# 파싱된 세션을 (버킷, 키, ETag)별로 저장해 두는 로컬 캐시 디렉터리와 유효 시간(초)
+# 같은 세션을 반복해서 리플레이할 때 다운로드, 압축 해제, JSON 파싱을 모두 생략합니다.
+SESSION_CACHE_DIR = os.getenv(
+    "CAPTCHA_SESSION_CACHE_DIR", os.path.join(tempfile.gettempdir(), "captcha_sessions"))
+SESSION_CACHE_TTL_SECONDS = 3600
+
+# S3 접속에 반드시 필요한 설정 항목
+S3_REQUIRED_KEYS = ("endpoint_url", "bucket_name", "access_key", "secret_key")
+
 # --- 설정 --- #
 # 사용하실 API 키를 여기에 입력하세요.
 API_KEY = "7c1e6fed6c1fe16713965ecac0c0c130b1e53cdc95fda147c66e3ea7305d00a9"
@@ -22,15 +81,15 @@ API_KEY = "7c1e6fed6c1fe16713965ecac0c0c130b1e53cdc95fda147c66e3ea7305d00a9"
 def getenv_any(names, default=None):
     """환경 변수 목록에서 가장 먼저 발견되는 값을 반환합니다."""
     for n in names:
-        v = os.getenv(n)
-        if v is not None and str(v).strip() != "":
+        v = os.environ.get(n)
+        if v and v.strip():
             return v
     return default
 
 
+@lru_cache(maxsize=1)
 def load_s3_config():
-    """S3 접속에 필요한 환경 변수를 로드하고 딕셔너리로 반환합니다."""
-    load_dotenv()
+    """S3 접속에 필요한 환경 변수를 읽어 딕셔너리로 반환합니다. (한 번만 읽고 재사용합니다.)"""
     config = {
         "endpoint_url": getenv_any(["KS3_ENDPOINT", "S3_ENDPOINT_URL"]),
         "region_name": getenv_any(["KS3_REGION", "S3_REGION"], "ap-northeast-2"),
@@ -40,10 +99,9 @@ def load_s3_config():
         "secret_key": getenv_any(["KS3_SECRET_KEY", "S3_SECRET_KEY"]),
         "force_path_style": getenv_any(["KS3_FORCE_PATH_STYLE", "S3_FORCE_PATH_STYLE"], "1") == "1",
     }
-    required_keys = ["endpoint_url", "bucket_name", "access_key", "secret_key"]
-    if not all(config[key] for key in required_keys):
+    if not all(config[key] for key in S3_REQUIRED_KEYS):
         print("오류: S3 설정에 필요한 환경 변수가 누락되었습니다.", file=sys.stderr)
-        print(f"필수 항목: {required_keys}", file=sys.stderr)
+        print(f"필수 항목: {list(S3_REQUIRED_KEYS)}", file=sys.stderr)
         sys.exit(1)
     return config
 
@@ -64,34 +122,104 @@ def get_s3_client(config):
     return session.client("s3", endpoint_url=config["endpoint_url"], config=cfg)
 
 
-def download_and_parse_session(client, bucket, key):
+@lru_cache(maxsize=1)
+def get_s3_client_cached():
+    """S3 클라이언트를 한 번만 생성하고 재사용합니다. (서비스 모델 로딩과 커넥션 풀 생성 비용 절감)"""
+    return get_s3_client(load_s3_config())
+
+
+def _open_session_stream(body, key, content_length=0):
+    """세션 파일 확장자(.zst 또는 .gz)에 맞게 압축을 풀면서 읽는 버퍼 스트림을 반환합니다."""
+    if key.endswith(".zst"):
+        import zstandard as zstd
+        raw = zstd.ZstdDecompressor().stream_reader(body)
+    elif rapidgzip is not None and content_length >= PARALLEL_GZIP_MIN_BYTES:
+        # rapidgzip은 탐색 가능한 입력이 필요하므로 다운로드한 파일에서 바로 병렬로 해제합니다.
+        raw = rapidgzip.open(body, parallelization=os.cpu_count() or 1)
+    else:
+        raw = _gzip.GzipFile(fileobj=body, mode="rb")
+    return io.BufferedReader(raw, buffer_size=1024 * 1024)
+
+
+def _session_cache_path(bucket, key, etag):
+    """(버킷, 키, ETag)에 해당하는 로컬 캐시 파일 경로를 반환합니다."""
+    digest = hashlib.sha1(f"{bucket}/{key}@{etag}".encode("utf-8")).hexdigest()
+    return os.path.join(SESSION_CACHE_DIR, f"{digest}.json")
+
+
+def _read_session_cache(path):
+    """유효 시간이 지나지 않은 캐시 파일이 있으면 파싱된 세션을 반환합니다."""
+    try:
+        if time.time() - os.path.getmtime(path) > SESSION_CACHE_TTL_SECONDS:
+            return None
+        with open(path, "rb") as f:
+            return _json_loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_session_cache(path, session):
+    """파싱된 세션을 캐시 파일에 기록합니다. (임시 파일에 쓴 뒤 교체하여 반쯤 쓰인 파일을 읽지 않도록 합니다.)"""
+    try:
+        os.makedirs(SESSION_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=SESSION_CACHE_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_json_dumps(session))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"경고: 세션 캐시 저장 실패: {e}", file=sys.stderr)
+
+
+def download_and_parse_session(client, bucket, key, use_cache=True):
     """S3에서 세션 파일을 다운로드하고 파싱하여 meta와 events를 추출합니다."""
     try:
-        print(f"S3 버킷 '{bucket}'에서 파일 다운로드 중: {key}", file=sys.stderr)
-        response = client.get_object(Bucket=bucket, Key=key)
-        with gzip.GzipFile(fileobj=io.BytesIO(response["Body"].read()), mode="rb") as gz:
-            content = gz.read().decode("utf-8")
+        # 객체의 ETag로 로컬 캐시를 확인하고, 같은 내용이 캐시되어 있으면 다운로드와 파싱을 생략합니다.
+        cache_path = None
+        if use_cache:
+            etag = client.head_object(Bucket=bucket, Key=key)["ETag"]
+            cache_path = _session_cache_path(bucket, key, etag)
+            cached = _read_session_cache(cache_path)
+            if cached is not None:
+                print(f"로컬 캐시에서 세션 로드: {key}", file=sys.stderr)
+                return cached
 
-        lines = content.strip().split('\n')
+        print(f"S3 버킷 '{bucket}'에서 파일 다운로드 중: {key}", file=sys.stderr)
+        # 압축된 파일은 (큰 파일이면 병렬 ranged GET으로) 탐색 가능한 임시 파일에 받습니다.
+        # (8MiB를 넘으면 메모리 대신 디스크에 저장됩니다.)
+        body = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        client.download_fileobj(bucket, key, body, Config=DOWNLOAD_TRANSFER_CONFIG)
+        content_length = body.tell()
+        body.seek(0)
         meta, events = None, []
-        for line in lines:
-            try:
-                data = json.loads(line)
-                if data.get("type") == "meta":
-                    if 'type' in data:
+        events_append = events.append
+        # 압축 해제된 내용 전체를 메모리에 올리지 않고, 압축을 풀면서 한 줄씩 읽어 파싱합니다.
+        with body, _open_session_stream(body, key, content_length) as reader:
+            for line in reader:
+                if not line.strip():
+                    continue
+                try:
+                    data = _json_loads(line)
+                    kind = data.get("type")
+                    if kind == "meta":
                         del data["type"]
-                    meta = data
-                elif data.get("type") != "label":
-                    events.append(data)
-            except json.JSONDecodeError:
-                print(f"경고: JSON 파싱 실패, 라인 건너뜀: {line}", file=sys.stderr)
-                continue
+                        meta = data
+                    elif kind != "label":
+                        events_append(data)
+                except json.JSONDecodeError:
+                    print(f"경고: JSON 파싱 실패, 라인 건너뜀: {line.decode('utf-8', 'replace').rstrip()}", file=sys.stderr)
+                    continue
 
         if not meta:
             print("오류: 파일에서 'meta' 정보를 찾을 수 없습니다.", file=sys.stderr)
             return None
-        return {"meta": meta, "events": events}
-    except client.exceptions.NoSuchKey:
+        session = {"meta": meta, "events": events}
+        if cache_path:
+            _write_session_cache(cache_path, session)
+        return session
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey"):
+            print(f"파일 다운로드 또는 처리 중 오류 발생: {e}", file=sys.stderr)
+            return None
         print(
             f"오류: S3 버킷 '{bucket}'에서 파일 '{key}'를 찾을 수 없습니다.", file=sys.stderr)
         return None
@@ -105,7 +233,7 @@ def get_new_client_token(problem_url, api_key):
     try:
         print(f"'{problem_url}'에서 새로운 캡챠 문제 요청 중...", file=sys.stderr)
         headers = {"X-Api-Key": api_key}
-        response = requests.post(problem_url, headers=headers)
+        response = SESSION.post(problem_url, headers=headers)
         response.raise_for_status()
         return response.json()["clientToken"]
     except requests.exceptions.RequestException as e:
@@ -123,11 +251,15 @@ def submit_for_verification(verify_url, api_key, client_token, behavior_data):
     """/captcha/verify API를 호출하여 검증을 요청합니다."""
     try:
         print(f"'{verify_url}'로 검증 요청 전송 중...", file=sys.stderr)
-        headers = {"X-Api-Key": api_key, "X-Client-Token": client_token}
-        request_body = {"answer": "replay_test", **behavior_data}
+        headers = {"X-Api-Key": api_key, "X-Client-Token": client_token,
+                   "Content-Type": "application/json", "Content-Encoding": "gzip"}
+        # 이벤트가 많은 요청 본문은 orjson으로 미리 직렬화하여 전송합니다. (requests의 json= 는 표준 json을 사용)
+        # 전송량을 줄이기 위해 압축 속도가 가장 빠른 레벨 1의 gzip으로 압축합니다. (ISA-L이 있으면 SIMD 가속)
+        request_body = _gzip.compress(
+            _json_dumps({"answer": "replay_test", **behavior_data}), compresslevel=1)
 
-        response = requests.post(
-            verify_url, headers=headers, json=request_body)
+        response = SESSION.post(
+            verify_url, headers=headers, data=request_body)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -137,21 +269,25 @@ def submit_for_verification(verify_url, api_key, client_token, behavior_data):
         return None
 
 
-def poll_for_result(result_url_base, task_id, max_retries=30, interval=2):
-    """taskId를 사용하여 최종 검증 결과를 폴링합니다."""
+def poll_for_result(result_url_base, task_id, total_timeout=60, initial_delay=0.25, max_delay=5.0):
+    """taskId를 사용하여 최종 검증 결과를 폴링합니다. (지터를 더한 지수 백오프로 간격을 늘려 갑니다.)"""
     result_url = f"{result_url_base.strip('/')}/{task_id}"
     print(f"'{result_url}'에서 최종 결과 폴링 시작...",
           end="", flush=True, file=sys.stderr)
-    for i in range(max_retries):
+    delay = initial_delay
+    deadline = time.monotonic() + total_timeout
+    while time.monotonic() < deadline:
         try:
-            response = requests.get(result_url)
+            response = SESSION.get(result_url)
             if response.status_code == 200:
                 print("\n검증 성공! 최종 결과를 출력합니다.", file=sys.stderr)
                 return response.json()
             elif response.status_code == 202:
                 print(".", end="", flush=True, file=sys.stderr)
-                time.sleep(interval)
-                continue
+            elif response.status_code >= 500:
+                # 서버 오류 시에는 요청이 몰리지 않도록 대기 시간을 바로 두 배로 늘립니다.
+                print("!", end="", flush=True, file=sys.stderr)
+                delay *= 2
             else:
                 print(
                     f"\n오류: 결과 조회 실패 (상태 코드: {response.status_code})", file=sys.stderr)
@@ -160,10 +296,45 @@ def poll_for_result(result_url_base, task_id, max_retries=30, interval=2):
         except requests.exceptions.RequestException as e:
             print(f"\n오류: 결과 조회 API 호출 실패: {e}", file=sys.stderr)
             return None
+        delay = min(max_delay, delay)
+        time.sleep(delay + random.uniform(0, delay * 0.3))
+        delay *= 1.5
     print("\n오류: 폴링 시간 초과. 작업을 완료하지 못했습니다.", file=sys.stderr)
     return None
 
 
+def process_session(s3_client, bucket, s3_key, args):
+    """세션 파일 하나를 리플레이하여 검증 요청을 보내고 최종 결과를 반환합니다. 실패하면 None을 반환합니다."""
+    # 1~2. 서로 독립적인 clientToken 발급과 S3 행동 데이터 다운로드/파싱을 동시에 진행합니다.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        token_future = executor.submit(
+            get_new_client_token, args.problem_url, API_KEY)
+        behavior_future = executor.submit(
+            download_and_parse_session, s3_client, bucket, s3_key,
+            not args.no_cache)
+        client_token = token_future.result()
+        behavior_data = behavior_future.result()
+
+    if not client_token:
+        return None
+    print(f"새로운 Client-Token 발급 성공: {client_token}", file=sys.stderr)
+    if not behavior_data:
+        return None
+
+    # 3. API로 검증 요청 제출
+    initial_response = submit_for_verification(
+        args.verify_url, API_KEY, client_token, behavior_data)
+    if not initial_response or "taskId" not in initial_response:
+        print("오류: 검증 요청에서 taskId를 받지 못했습니다.", file=sys.stderr)
+        return None
+
+    task_id = initial_response["taskId"]
+    print(f"검증 작업 접수 성공. Task ID: {task_id}", file=sys.stderr)
+
+    # 4. 최종 결과 폴링
+    return poll_for_result(args.result_url_base, task_id)
+
+
 def main():
     """메인 실행 함수"""
     if API_KEY == "여기에_API_키를_입력하세요":
@@ -173,7 +344,7 @@ def main():
     parser = argparse.ArgumentParser(
         description="S3에서 캡챠 세션을 리플레이하고 API로 검증합니다.")
     parser.add_argument(
-        "s3_filename", help="다운로드할 S3 파일 이름 (예: 20250908-092649_yaz5q1pdlm.json.gz)")
+        "s3_filename", nargs="+", help="다운로드할 S3 파일 이름, 여러 개 지정 가능 (예: 20250908-092649_yaz5q1pdlm.json.zst 또는 .json.gz)")
     parser.add_argument(
         "--type", choices=['human', 'bot'], required=True, help="데이터 타입 (human 또는 bot)")
     parser.add_argument(
@@ -182,42 +353,33 @@ def main():
         "--verify-url", default="http://localhost:8001/api/captcha/verify", help="캡챠 검증 요청 API의 전체 URL")
     parser.add_argument(
         "--result-url-base", default="http://localhost:8001/api/captcha/verify/result", help="캡챠 결과 조회 API의 기본 URL")
+    parser.add_argument(
+        "--workers", type=int, default=8, help="여러 세션을 동시에 리플레이할 최대 스레드 수")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="로컬 세션 캐시를 사용하지 않고 항상 S3에서 다시 받습니다.")
     args = parser.parse_args()
 
     # 1. S3 설정 로드 및 클라이언트 생성
     s3_config = load_s3_config()
-    s3_client = get_s3_client(s3_config)
+    s3_client = get_s3_client_cached()
 
-    # 2. 새로운 clientToken 발급
-    client_token = get_new_client_token(args.problem_url, API_KEY)
-    if not client_token:
-        sys.exit(1)
-    print(f"새로운 Client-Token 발급 성공: {client_token}", file=sys.stderr)
-
-    # 3. S3에서 행동 데이터 다운로드 및 파싱
+    # 2. 세션 파일별 리플레이/검증을 스레드풀에서 동시에 진행합니다. (S3 클라이언트와 HTTP 세션은 공유합니다.)
     prefix = "human_data" if args.type == 'human' else "bot_data"
-    s3_key = f"{prefix}/{args.s3_filename}"
-    behavior_data = download_and_parse_session(
-        s3_client, s3_config["bucket_name"], s3_key)
-    if not behavior_data:
-        sys.exit(1)
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = [
+            executor.submit(process_session, s3_client, s3_config["bucket_name"],
+                            f"{prefix}/{filename}", args)
+            for filename in args.s3_filename
+        ]
+        final_results = [future.result() for future in futures]
 
-    # 4. API로 검증 요청 제출
-    initial_response = submit_for_verification(
-        args.verify_url, API_KEY, client_token, behavior_data)
-    if not initial_response or "taskId" not in initial_response:
-        print("오류: 검증 요청에서 taskId를 받지 못했습니다.", file=sys.stderr)
+    # 3. 입력한 순서대로 결과를 출력하고, 하나라도 실패하면 종료 코드 1로 끝냅니다.
+    for final_result in final_results:
+        if final_result:
+            print(json.dumps(final_result, indent=2, ensure_ascii=False))
+    if not all(final_results):
         sys.exit(1)
 
-    task_id = initial_response["taskId"]
-    print(f"검증 작업 접수 성공. Task ID: {task_id}", file=sys.stderr)
-
-    # 5. 최종 결과 폴링
-    final_result = poll_for_result(args.result_url_base, task_id)
-
-    if final_result:
-        print(json.dumps(final_result, indent=2, ensure_ascii=False))
-
 
 if __name__ == "__main__":
     main()
@@ -14,11 +14,24 @@ from app.core.config import settings
 DATABASE_URL = settings.DATABASE_URL
 
 # SQLAlchemy 엔진 생성
-# pool_pre_ping=True는 연결이 유효한지 확인하여 끊어진 연결 문제 방지에 도움을 줍니다.
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_size=20, max_overflow=40, pool_recycle=1800)
+# 커넥션을 꺼낼 때마다 SELECT 1을 보내는 pool_pre_ping 대신, pool_recycle로 유휴 연결이 끊기기 전에 미리 교체하여
+# 요청마다 DB 왕복 한 번을 줄입니다. (필요하면 DB_POOL_PRE_PING=1로 다시 켤 수 있습니다.)
+# pool_timeout은 풀이 모두 사용 중일 때 연결을 기다리는 최대 시간(초)입니다.
+# 반환된 커넥션은 롤백하여 열린 트랜잭션이 다음 요청으로 넘어가지 않도록 합니다.
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_reset_on_return="rollback",
+    connect_args={"connect_timeout": settings.DB_CONNECT_TIMEOUT}
+)
 
 # 세션 로컬 클래스 생성
 # 이 클래스의 인스턴스가 실제 데이터베이스 세션이 됩니다.
+# (Celery 작업, 관리자 인증, 통계 버퍼 등은 기본값인 expire_on_commit=True로 사용합니다.)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -26,8 +39,15 @@ def get_db() -> Generator:
     """
     SQLAlchemy 세션을 생성하고, 요청이 끝나면 안전하게 반환합니다.
     FastAPI Depends(get_db)로 사용.
+
+    요청마다 만드는 Session 객체는 가볍고, 실제 커넥션은 모듈 수준 engine의 풀에서 재사용됩니다.
+    동기 의존성/엔드포인트는 스레드풀의 서로 다른 스레드에서 실행될 수 있으므로,
+    스레드 로컬 scoped_session을 쓰면 동시 요청이 같은 세션을 공유할 수 있어 사용하지 않습니다.
     """
-    db = SessionLocal()
+    # 요청 경로의 세션은 커밋 후 객체 속성을 만료시키지 않아, 방금 기록한 값을 다시 읽는 SELECT(refresh)를 생략합니다.
+    # 요청 경로에서 응답에 쓰는 컬럼은 모두 Python 측에서 값을 채우므로 커밋 시점의 객체 상태가 DB와 일치합니다.
+    # 단, DB가 계산하는 ApiKey.activeAppId(생성 컬럼)는 커밋 후에도 이전 값으로 남으므로, 필요하면 refresh()로 다시 읽어야 합니다.
+    db = SessionLocal(expire_on_commit=False)
     try:
         yield db
     finally:
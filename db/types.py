@@ -0,0 +1,31 @@
+# db/types.py
+
+from sqlalchemy import DateTime
+from sqlalchemy.dialects import mysql
+from sqlalchemy.types import TypeDecorator
+
+from app.core.config import settings
+
+
+class AwareDateTime(TypeDecorator):
+    """
+    타임존 정보가 포함된 datetime으로 조회되는 DateTime 타입입니다.
+    MySQL의 DATETIME은 타임존을 저장하지 않아 드라이버가 항상 naive datetime을 반환하므로,
+    저장 시 사용한 애플리케이션 타임존(settings.TIMEZONE)을 조회 시점에 한 번 붙여 줍니다.
+    (서비스 코드에서 매번 tzinfo를 확인하고 보정할 필요가 없습니다.)
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        # 1. naive datetime이면 애플리케이션 타임존으로 지역화합니다.
+        if value is not None and value.tzinfo is None:
+            return settings.TIMEZONE.localize(value)
+        return value
+
+
+# 마이크로초까지 저장하는 DateTime 타입 (MySQL에서는 DATETIME(6))
+# 캐시 버전으로 쓰는 updated_at은 같은 초 안의 연속된 수정도 구분할 수 있어야 하므로,
+# 초 단위로 잘리는 기본 DATETIME 대신 이 타입을 사용합니다.
+MicrosecondDateTime = DateTime(timezone=True).with_variant(
+    mysql.DATETIME(fsp=6), "mysql")